@@ -1,24 +1,42 @@
-import requests
-from bs4 import BeautifulSoup
-import whois
-import pandas as pd
 import json
 from datetime import datetime
-import socket
-import dns.resolver
 import time
 import csv
 from urllib.parse import urlparse
 import os
 import ipaddress
-import concurrent.futures
-import ssl
-import subprocess
-import platform
+import threading
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from magiceye.batch import batch_main
+from magiceye.http_client import get_client
+from magiceye.geo import get_locator
+from magiceye.incremental import add_incremental_argument, count_changes, get_state, tls_ttl, write_diff
+from magiceye.latency import TCP_PORTS, probe_latency
+from magiceye.metrics import count_result_errors
+from magiceye.ports import COMMON_PORTS, parse_ports, scan_ports, service_name
+from magiceye.resolver import get_engine
+from magiceye.scheduler import StageScheduler, run_async
+from magiceye.sinks import result_record
+from magiceye.timing import Timings
+from magiceye.tls import TLS_PORTS, get_tls_info
+from magiceye.web import fetch_page
+from magiceye.whois_cache import get_whois_cache, python_whois_lookup
 
 class RexzeaHazardOsint:
-    def __init__(self):
-        self.start_time = time.time()  
+    def __init__(self, ports=None, port_concurrency=100, port_timeout=1, stage_timeout=30, scan_deadline=120, http=None, geo=None, whois_cache=None, dns_engine=None, incremental=False):
+        self.http = http or get_client()
+        self.geo = geo or get_locator('ip-api')
+        self.dns = dns_engine or get_engine(persistent=incremental)
+        self.whois_cache = whois_cache or get_whois_cache()
+        self.state = get_state() if incremental else None
+        self.ports = parse_ports(ports) if ports else list(COMMON_PORTS)
+        self.port_concurrency = port_concurrency
+        self.port_timeout = port_timeout
+        self.stage_timeout = stage_timeout
+        self.scan_deadline = scan_deadline
+        self._results_lock = threading.Lock()
         self.results = {
             'domain_info': {},
             'web_info': {},
@@ -30,6 +48,11 @@ class RexzeaHazardOsint:
             'metadata': {}
         }
 
+    def _update_section(self, section, values):
+        # stages run concurrently, so shared sections are only ever merged under the lock
+        with self._results_lock:
+            self.results[section].update(values)
+
     def save_results(self, filename):
         # save as JSON
         json_filename = f"{filename}_results.json"
@@ -57,59 +80,57 @@ class RexzeaHazardOsint:
 
     def analyze_domain(self, domain):
         try:
-            w = whois.whois(domain)
+            w, cached = self.whois_cache.fetch('python-whois', domain, python_whois_lookup)
             self.results['domain_info'] = {
-                'registrar': w.registrar,
-                'creation_date': str(w.creation_date),
-                'expiration_date': str(w.expiration_date),
-                'name_servers': w.name_servers,
-                'status': w.status,
-                'emails': w.emails,
-                'organization': w.org,
-                'registrant_country': w.registrant_country,
-                'admin_country': w.admin_country,
-                'last_updated': str(w.updated_date)
+                'registrar': w['registrar'],
+                'creation_date': w['creation_date'],
+                'expiration_date': w['expiration_date'],
+                'name_servers': w['name_servers'],
+                'status': w['status'],
+                'emails': w['emails'],
+                'organization': w['organization'],
+                'registrant_country': w['registrant_country'],
+                'admin_country': w['admin_country'],
+                'last_updated': w['last_updated']
             }
+            self._update_section('metadata', {'whois_cache': dict(self.whois_cache.stats(), hit=cached)})
         except Exception as e:
             self.results['domain_info'] = {'error': str(e)}
 
     def get_network_info(self, domain):
         try:
-            # Get all IP addresses (IPv4 and IPv6)
-            ip_info = {}
-            try:
-                ipv4_addresses = [ip.to_text() for ip in dns.resolver.resolve(domain, 'A')]
-                ip_info['ipv4_addresses'] = ipv4_addresses
-            except:
-                ip_info['ipv4_addresses'] = []
-
-            try:
-                ipv6_addresses = [ip.to_text() for ip in dns.resolver.resolve(domain, 'AAAA')]
-                ip_info['ipv6_addresses'] = ipv6_addresses
-            except:
-                ip_info['ipv6_addresses'] = []
+            # Get all IP addresses (IPv4 and IPv6) together with the other record types
+            dns_result = self.dns.resolve_sync(domain)
+            self._update_section('dns_info', dns_result)
+            ip_info = {
+                'ipv4_addresses': dns_result['records'].get('A', []),
+                'ipv6_addresses': dns_result['records'].get('AAAA', [])
+            }
 
-            #Get detailed information for each IP
-            ip_details = []
-            for ip in ip_info['ipv4_addresses']:
-                ip_data = self.get_ip_details(ip)
-                ip_details.append(ip_data)
+            #Get detailed information for each IP (one batched lookup)
+            lookups = self.geo.lookup(ip_info['ipv4_addresses'])
+            ip_details = [self._format_ip_details(ip, lookups[ip]) for ip in ip_info['ipv4_addresses']]
 
-            self.results['network_info'] = {
+            self._update_section('network_info', {
                 'ip_addresses': ip_info,
                 'ip_details': ip_details,
                 'reverse_dns': self.get_reverse_dns(ip_info['ipv4_addresses'][0]) if ip_info['ipv4_addresses'] else None
-            }
+            })
         except Exception as e:
-            self.results['network_info'] = {'error': str(e)}
+            self._update_section('network_info', {'error': str(e)})
 
     def get_ip_details(self, ip):
         try:
             # using ip api.com for ip geolocation
-            response = requests.get(f'http://ip-api.com/json/{ip}', timeout=5)
-            data = response.json()
-            
-            return {
+            return self._format_ip_details(ip, self.geo.lookup_one(ip))
+        except Exception as e:
+            return {'ip': ip, 'error': str(e)}
+
+    def _format_ip_details(self, ip, data):
+        if 'error' in data:
+            return {'ip': ip, 'error': data['error']}
+
+        return {
                 'ip': ip,
                 'country': data.get('country'),
                 'country_code': data.get('countryCode'),
@@ -124,34 +145,41 @@ class RexzeaHazardOsint:
                 'as_number': data.get('as'),
                 'as_name': data.get('asname')
             }
-        except Exception as e:
-            return {'ip': ip, 'error': str(e)}
 
     def get_ssl_info(self, domain):
         try:
-            context = ssl.create_default_context()
-            with context.wrap_socket(socket.socket(), server_hostname=domain) as sock:
-                sock.connect((domain, 443))
-                cert = sock.getpeercert()
-
-            self.results['ssl_info'] = {
-                'issuer': dict(x[0] for x in cert['issuer']),
-                'subject': dict(x[0] for x in cert['subject']),
-                'version': cert['version'],
-                'serial_number': cert['serialNumber'],
-                'not_before': cert['notBefore'],
-                'not_after': cert['notAfter'],
-                'san': cert.get('subjectAltName', []),
-                'ocsp': cert.get('OCSP', []),
-                'crl_distribution_points': cert.get('crlDistributionPoints', [])
-            }
+            # incremental scans reuse the certificate for a day (never past its expiry)
+            if self.state is not None:
+                self.results['ssl_info'], _ = self.state.fetch('tls', domain.lower(), lambda: self._load_ssl_info(domain), tls_ttl)
+            else:
+                self.results['ssl_info'] = self._load_ssl_info(domain)
         except Exception as e:
             self.results['ssl_info'] = {'error': str(e)}
 
+    def _load_ssl_info(self, domain):
+        # 443 always, the other TLS ports when the port scan found them open
+        with self._results_lock:
+            open_ports = self.results['network_info'].get('open_ports') or {}
+        ports = [port for port in TLS_PORTS if port == 443 or port in open_ports]
+        return get_tls_info(domain, self.dns.addresses_sync(domain), ports)
+
     def get_security_headers(self, url):
         try:
-            response = requests.get(url, verify=True, timeout=10)
+            # only the head is needed for the page metadata, stop reading after it
+            if self.state is not None:
+                response = self.state.fetch_page(self.http, url, fields=('title', 'meta_tags'), verify=True)
+            else:
+                response = fetch_page(self.http, url, fields=('title', 'meta_tags'), verify=True)
             headers = response.headers
+            page = response.data
+            self.results['web_info'] = {
+                'url': response.url,
+                'status_code': response.status_code,
+                'title': page['title'],
+                'meta_tags': page['meta_tags']
+            }
+            if response.cache_status:
+                self.results['web_info']['cache_status'] = response.cache_status
 
             security_headers = {
                 'Strict-Transport-Security': headers.get('Strict-Transport-Security'),
@@ -164,105 +192,95 @@ class RexzeaHazardOsint:
                 'Access-Control-Allow-Origin': headers.get('Access-Control-Allow-Origin')
             }
 
-            self.results['security_info']['headers'] = security_headers
+            self._update_section('security_info', {'headers': security_headers})
         except Exception as e:
-            self.results['security_info']['headers'] = {'error': str(e)}
+            self._update_section('security_info', {'headers': {'error': str(e)}})
 
     def get_reverse_dns(self, ip):
+        return self.dns.reverse_sync(ip)
+
+    def analyze_ports(self, domain, ports=None):
+        ports = parse_ports(ports) if ports else self.ports
         try:
-            return socket.gethostbyaddr(ip)[0]
-        except:
-            return None
+            open_ports, scan_info = run_async(self._scan_ports(domain, ports))
+            self._update_section('network_info', {'open_ports': open_ports, 'port_scan': scan_info})
+        except Exception as e:
+            self._update_section('network_info', {'open_ports': {'error': str(e)}})
 
-    def analyze_ports(self, domain):
-        common_ports = [21, 22, 23, 25, 53, 80, 110, 143, 443, 465, 587, 993, 995, 3306, 3389, 5432, 8080, 8443]
-        open_ports = {}
-        
-        for port in common_ports:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(1)
-            try:
-                result = sock.connect_ex((domain, port))
-                if result == 0:
-                    open_ports[port] = self.get_service_name(port)
-            except:
-                pass
-            finally:
-                sock.close()
-            
-        self.results['network_info']['open_ports'] = open_ports
+    async def _scan_ports(self, domain, ports):
+        # resolve once (from the shared DNS cache) instead of once per port
+        ip = (await self.dns.addresses(domain))[0]
+        return await scan_ports(ip, ports, self.port_concurrency, self.port_timeout)
 
     def get_service_name(self, port):
-        common_services = {
-            21: 'FTP',
-            22: 'SSH',
-            23: 'Telnet',
-            25: 'SMTP',
-            53: 'DNS',
-            80: 'HTTP',
-            110: 'POP3',
-            143: 'IMAP',
-            443: 'HTTPS',
-            465: 'SMTPS',
-            587: 'SMTP (Submission)',
-            993: 'IMAPS',
-            995: 'POP3S',
-            3306: 'MySQL',
-            3389: 'RDP',
-            5432: 'PostgreSQL',
-            8080: 'HTTP-Alternate',
-            8443: 'HTTPS-Alternate'
-        }
-        return common_services.get(port, 'Unknown')
+        return service_name(port)
 
     def ping_host(self, domain):
         try:
-            param = '-n' if platform.system().lower() == 'windows' else '-c'
-            command = ['ping', param, '4', domain]
-            output = subprocess.check_output(command).decode().strip()
-            self.results['network_info']['ping_test'] = output
+            # the tcp fallback prefers ports the port scan found open
+            with self._results_lock:
+                open_ports = self.results['network_info'].get('open_ports') or {}
+            ports = sorted((port for port in open_ports if isinstance(port, int)), key=lambda port: (port not in TCP_PORTS, port))
+            ping = run_async(probe_latency(self.dns.addresses_sync(domain)[0], ports=ports or TCP_PORTS))
+            self._update_section('network_info', {'ping_test': ping})
         except Exception as e:
-            self.results['network_info']['ping_test'] = str(e)
+            self._update_section('network_info', {'ping_test': {'error': str(e)}})
 
-    def generate_report(self, target):
+    def generate_report(self, target, sink=None):
         print(f"[*] Starting extended OSINT analysis for: {target}")
+        start_time = time.time()
+        timings = Timings()
         
         # parse url/domain
         parsed_url = urlparse(target)
         domain = parsed_url.netloc if parsed_url.netloc else parsed_url.path.split('/')[0]
         
         try:
-            # run all analysis
-            print("[+] Analyze domain information...")
-            self.analyze_domain(domain)
-            
-            print("[+] Collect network information...")
-            self.get_network_info(domain)
-            
-            print("[+] Analyzing SSL/TLS...")
-            self.get_ssl_info(domain)
-            
-            print("[+] Check open ports...")
-            self.analyze_ports(domain)
-            
-            print("[+] Perform a ping test...")
-            self.ping_host(domain)
-            
-            print("[+] Check security headers...")
-            self.get_security_headers(f"https://{domain}")
+            # independent stages run concurrently; each has its own timeout and the
+            # whole scan is bounded by scan_deadline
+            scheduler = StageScheduler(stage_timeout=self.stage_timeout, deadline=self.scan_deadline, timings=timings)
+            scheduler.add('domain', lambda: self.analyze_domain(domain), message="[+] Analyze domain information...")
+            scheduler.add('network', lambda: self.get_network_info(domain), message="[+] Collect network information...")
+            # after, not depends_on: the extra TLS ports come from the port scan when it
+            # finished, but a failed or timed out scan must not skip the 443 probe
+            scheduler.add('ssl', lambda: self.get_ssl_info(domain), after=('ports',), message="[+] Analyzing SSL/TLS...")
+            scheduler.add('ports', lambda: self.analyze_ports(domain), message="[+] Check open ports...")
+            scheduler.add('ping', lambda: self.ping_host(domain), depends_on=('ports',), message="[+] Perform a ping test...")
+            scheduler.add('security_headers', lambda: self.get_security_headers(f"https://{domain}"), message="[+] Check security headers...")
+            stages = scheduler.run()
             
             # metadata
-            self.results['metadata'] = {
+            self.results['metadata'].update({
                 'scan_date': datetime.now().isoformat(),
                 'target': target,
                 'domain': domain,
-                'scan_duration': time.time() - self.start_time
-            }
+                'scan_duration': time.time() - start_time,
+                'stages': stages,
+                'spans': timings.report(),
+                'dns_cache': self.dns.cache.stats()
+            })
             
-            # save result
+            # save result (timed out stages may still be writing)
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"enhanced_osint_scan_{domain}_{timestamp}"
-            self.save_results(filename)
+            with self._results_lock:
+                count_result_errors(self.results)
+                # incremental scans only write what changed since the last one
+                diff = self.state.diff('hazard', domain, self.results) if self.state is not None else None
+                if sink is not None:
+                    sink.write(result_record('hazard', target, domain, self.results, diff), self.results)
+                elif diff is None:
+                    self.save_results(filename)
+                else:
+                    write_diff(filename, diff)
+            
+            if sink is not None:
+                print(f"\n[+] Analysis complete. Results are appended to {sink.path}")
+                return True
+            if diff is not None:
+                print(f"\n[+] {count_changes(diff)} change(s) since {diff['previous_scan']} saved in:")
+                print(f"    - {filename}_diff.json")
+                return True
             
             print(f"\n[+] Analisis selesai. Hasil disimpan dalam file:")
             print(f"    - {filename}_results.json")
@@ -270,9 +288,11 @@ class RexzeaHazardOsint:
             
             # Show summary of results
             self.display_summary()
+            return True
             
         except Exception as e:
             print(f"\n[-] Error during analysis: {str(e)}")
+            return False
 
     def display_summary(self):
         print("\n=== RINGKASAN SCAN OSINT ===")
@@ -300,7 +320,17 @@ class RexzeaHazardOsint:
             print(f"HTTPS: {'Yes' if self.results.get('ssl_info') and 'error' not in self.results['ssl_info'] else 'Tidak'}")
             print(f"Security Headers: {len([h for h in headers.values() if h is not None])} installed")
 
+def scan_target(target, options=None):
+    if options is None:
+        return RexzeaHazardOsint().generate_report(target)
+    return RexzeaHazardOsint(incremental=options.incremental).generate_report(target, sink=options.sink)
+
 def main():
+    # any argument switches to non-interactive batch mode
+    if len(sys.argv) > 1:
+        batch_main(scan_target, "Run the hazard OSINT scan over a list of targets", add_arguments=add_incremental_argument)
+        return
+
     print("""
 
  ███▄ ▄███▓ ▄▄▄        ▄████  ██▓ ▄████▄     ▓█████▓██   ██▓▓█████ 
@@ -1,19 +1,36 @@
-import requests
-from bs4 import BeautifulSoup
-import whois
-import pandas as pd
 import json
 from datetime import datetime
 import socket
-import dns.resolver
 import time
 import csv
 from urllib.parse import urlparse
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from magiceye.batch import batch_main
+from magiceye.crawler import Crawler
+from magiceye.http_client import get_client
+from magiceye.extract import extract_emails
+from magiceye.incremental import add_incremental_argument, count_changes, get_state, write_diff
+from magiceye.metrics import count_result_errors
+from magiceye.sinks import JsonlSink, result_record
+from magiceye.timing import Timings
+from magiceye.web import MAX_PAGE_BYTES, fetch_page
+from magiceye.resolver import get_engine
+from magiceye.whois_cache import get_whois_cache, python_whois_lookup
 
 
 class RexzeaHunterOsint:
-    def __init__(self):
+    DOMAIN_FIELDS = ('registrar', 'creation_date', 'expiration_date', 'name_servers', 'status', 'emails', 'organization')
+    WEB_FIELDS = ('title', 'meta_tags', 'headings', 'links', 'images')
+
+    def __init__(self, http=None, whois_cache=None, dns_engine=None, max_page_bytes=MAX_PAGE_BYTES, incremental=False):
+        self.http = http or get_client()
+        self.max_page_bytes = max_page_bytes
+        self.dns = dns_engine or get_engine(persistent=incremental)
+        self.whois_cache = whois_cache or get_whois_cache()
+        self.state = get_state() if incremental else None
         self.results = {
             'domain_info': {},
             'web_info': {},
@@ -23,68 +40,81 @@ class RexzeaHunterOsint:
         
     def analyze_domain(self, domain):
         try:
-            w = whois.whois(domain)
-            self.results['domain_info'] = {
-                'registrar': w.registrar,
-                'creation_date': str(w.creation_date),
-                'expiration_date': str(w.expiration_date),
-                'name_servers': w.name_servers,
-                'status': w.status,
-                'emails': w.emails,
-                'organization': w.org
-            }
+            w, cached = self.whois_cache.fetch('python-whois', domain, python_whois_lookup, fields=self.DOMAIN_FIELDS)
+            self.results['domain_info'] = {field: w[field] for field in self.DOMAIN_FIELDS}
+            self.results['metadata']['whois_cache'] = dict(self.whois_cache.stats(), hit=cached)
         except Exception as e:
             self.results['domain_info'] = {'error': str(e)}
 
     def get_dns_info(self, domain):
         try:
-            # A record
-            a_records = dns.resolver.resolve(domain, 'A')
-            # MX record
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            # TXT record
-            txt_records = dns.resolver.resolve(domain, 'TXT')
+            # all record types at once, a failing type does not discard the others
+            dns_result = self.dns.resolve_sync(domain)
             
             self.results['dns_info'] = {
-                'a_records': [str(record) for record in a_records],
-                'mx_records': [str(record) for record in mx_records],
-                'txt_records': [str(record) for record in txt_records]
+                f"{rdtype.lower()}_records": records for rdtype, records in dns_result['records'].items()
             }
+            if dns_result['errors']:
+                self.results['dns_info']['errors'] = dns_result['errors']
         except Exception as e:
             self.results['dns_info'] = {'error': str(e)}
 
     def analyze_website(self, url):
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            response = self._fetch_page(url, max_bytes=self.max_page_bytes, fields=self.WEB_FIELDS)
+            page = response.data
             
             # Collect metadata
             metadata = {
-                'title': soup.title.string if soup.title else None,
-                'meta_description': soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else None,
-                'meta_keywords': soup.find('meta', {'name': 'keywords'})['content'] if soup.find('meta', {'name': 'keywords'}) else None,
+                'title': page['title'],
+                'meta_description': page['meta_tags'].get('description'),
+                'meta_keywords': page['meta_tags'].get('keywords'),
                 'headers': {
-                    'h1': [h1.text.strip() for h1 in soup.find_all('h1')],
-                    'h2': [h2.text.strip() for h2 in soup.find_all('h2')]
+                    'h1': [text.strip() for tag, text in page['headings'] if tag == 'h1'],
+                    'h2': [text.strip() for tag, text in page['headings'] if tag == 'h2']
                 },
-                'links': [{'text': a.text.strip(), 'href': a.get('href')} for a in soup.find_all('a', href=True)],
-                'images': [{'src': img.get('src'), 'alt': img.get('alt')} for img in soup.find_all('img')],
+                'links': [{'text': link['text'].strip(), 'href': link['href']} for link in page['links']],
+                'images': page['images'],
                 'response_headers': dict(response.headers),
                 'status_code': response.status_code
             }
+            if response.truncated:
+                metadata['truncated'] = True
+            if response.cache_status:
+                metadata['cache_status'] = response.cache_status
             
             self.results['web_info'] = metadata
             
         except Exception as e:
             self.results['web_info'] = {'error': str(e)}
 
+    def _fetch_page(self, url, **kwargs):
+        # incremental scans send conditional requests and reuse unchanged extractions
+        if self.state is not None:
+            return self.state.fetch_page(self.http, url, **kwargs)
+        return fetch_page(self.http, url, **kwargs)
+
+    def crawl_website(self, url, output_path, max_pages=100, max_depth=2, workers=4, delay=1.0):
+        # every page goes to the jsonl file as soon as it is fetched, only the
+        # crawl summary is kept in the results
+        try:
+            crawler = Crawler(
+                http=self.http,
+                max_pages=max_pages,
+                max_depth=max_depth,
+                workers=workers,
+                delay=delay,
+                max_page_bytes=self.max_page_bytes
+            )
+            with JsonlSink(output_path, mode='w') as sink:
+                summary = crawler.crawl(url, sink)
+            summary['output'] = output_path
+            self.results['web_info']['crawl'] = summary
+        except Exception as e:
+            self.results['web_info']['crawl'] = {'error': str(e)}
+
     def extract_emails(self, text):
-        import re
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        return list(set(re.findall(email_pattern, text)))
+        return extract_emails(text)
 
     def save_results(self, filename):
         # save as JSON
@@ -111,40 +141,87 @@ class RexzeaHunterOsint:
                 items.append((new_key, v))
         return dict(items)
 
-    def generate_report(self, target):
+    def generate_report(self, target, crawl=False, max_pages=100, max_depth=2, sink=None):
         print(f"[*] Starting OSINT analysis for: {target}")
         
         # Parse URL/domain
         parsed_url = urlparse(target)
         domain = parsed_url.netloc if parsed_url.netloc else target
+        url = f"http://{domain}" if not target.startswith(('http://', 'https://')) else target
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"osint_scan_{domain}_{timestamp}"
+        timings = Timings()
         
         # Run all analysis
         print("[+] Analyze domain information...")
-        self.analyze_domain(domain)
+        with timings.span('domain'):
+            self.analyze_domain(domain)
         
         print("[+] Collect DNS information...")
-        self.get_dns_info(domain)
+        with timings.span('dns'):
+            self.get_dns_info(domain)
         
         print("[+] Analyzing websites...")
-        self.analyze_website(f"http://{domain}" if not target.startswith(('http://', 'https://')) else target)
+        with timings.span('website'):
+            self.analyze_website(url)
+        
+        if crawl:
+            print(f"[+] Crawling website (max {max_pages} pages, depth {max_depth})...")
+            with timings.span('crawl'):
+                self.crawl_website(url, f"{filename}_crawl.jsonl", max_pages=max_pages, max_depth=max_depth)
         
         # metadata
-        self.results['metadata'] = {
+        self.results['metadata'].update({
             'scan_date': datetime.now().isoformat(),
             'target': target,
-            'domain': domain
-        }
+            'domain': domain,
+            'dns_cache': self.dns.cache.stats(),
+            'spans': timings.report()
+        })
+        count_result_errors(self.results)
         
-        # save rexult
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"osint_scan_{domain}_{timestamp}"
+        # save rexult (incremental scans only write what changed since the last one)
+        diff = self.state.diff('hunter', domain, self.results) if self.state is not None else None
+        if sink is not None:
+            sink.write(result_record('hunter', target, domain, self.results, diff), self.results)
+            print(f"[+] Analysis complete. Results are appended to {sink.path}")
+            return
+        if diff is not None:
+            print(f"[+] Analysis complete. {count_changes(diff)} change(s) since {diff['previous_scan']} saved in:")
+            print(f"    - {write_diff(filename, diff)}")
+            return
         self.save_results(filename)
         
         print(f"[+] Analysis complete. Results are saved in a file:")
         print(f"    - {filename}_results.json")
         print(f"    - {filename}_results.csv")
+        if crawl:
+            print(f"    - {filename}_crawl.jsonl")
+
+def add_arguments(parser):
+    add_incremental_argument(parser)
+    parser.add_argument('--crawl', action='store_true', help='follow same-domain links from the landing page')
+    parser.add_argument('--max-pages', type=int, default=100, help='pages fetched per target when crawling (default: 100)')
+    parser.add_argument('--max-depth', type=int, default=2, help='link depth followed when crawling (default: 2)')
+
+def scan_target(target, options=None):
+    if options is None:
+        RexzeaHunterOsint().generate_report(target)
+    else:
+        RexzeaHunterOsint(incremental=options.incremental).generate_report(
+            target,
+            crawl=options.crawl,
+            max_pages=options.max_pages,
+            max_depth=options.max_depth,
+            sink=options.sink
+        )
 
 def main():
+    # any argument switches to non-interactive batch mode
+    if len(sys.argv) > 1:
+        batch_main(scan_target, "Run the hunter OSINT scan over a list of targets", add_arguments=add_arguments)
+        return
+
     # example
     print("""
 
@@ -164,7 +241,8 @@ def main():
     print("=" * 50)
     osint = RexzeaHunterOsint()
     target = input("Enter the target domain (example: example.com): ")
-    osint.generate_report(target)
+    crawl = input("Crawl same-domain links as well? (y/N): ").strip().lower() == 'y'
+    osint.generate_report(target, crawl=crawl)
 
 if __name__ == "__main__":
     main()
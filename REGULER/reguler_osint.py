@@ -1,68 +1,90 @@
-import requests
-from bs4 import BeautifulSoup
-import whois
-import pandas as pd
+import csv
 from datetime import datetime
 import json
-import socket
 from urllib.parse import urlparse
 import time
 import re
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from magiceye.batch import batch_main
+from magiceye.http_client import get_client
+from magiceye.extract import extract_emails
+from magiceye.incremental import add_incremental_argument, count_changes, get_state, write_diff
+from magiceye.metrics import count_result_errors
+from magiceye.web import MAX_PAGE_BYTES, fetch_page
+from magiceye.geo import get_locator
+from magiceye.resolver import get_engine
+from magiceye.sinks import result_record
+from magiceye.timing import Timings
+from magiceye.whois_cache import get_whois_cache, python_whois_lookup
 
 class RexzeaRegulerOsint:
-    def __init__(self):
+    DOMAIN_FIELDS = ('registrar', 'creation_date', 'expiration_date', 'last_updated', 'status', 'name_servers')
+    WEB_FIELDS = ('title', 'meta_tags', 'headings', 'links', 'emails')
+
+    def __init__(self, http=None, geo=None, whois_cache=None, dns_engine=None, max_page_bytes=MAX_PAGE_BYTES, incremental=False):
+        self.http = http or get_client()
+        self.max_page_bytes = max_page_bytes
+        self.dns = dns_engine or get_engine(persistent=incremental)
+        self.geo = geo or get_locator('ip-api')
+        self.whois_cache = whois_cache or get_whois_cache()
+        self.state = get_state() if incremental else None
         self.results = {
             'domain_info': {},
             'web_info': {},
             'contact_info': {},
-            'technical_info': {}
+            'technical_info': {},
+            'metadata': {}
         }
     
     def analyze_domain(self, domain):
         try:
-            w = whois.whois(domain)
-            self.results['domain_info'] = {
-                'registrar': w.registrar,
-                'creation_date': str(w.creation_date),
-                'expiration_date': str(w.expiration_date),
-                'last_updated': str(w.updated_date),
-                'status': w.status,
-                'name_servers': w.name_servers
-            }
+            w, cached = self.whois_cache.fetch('python-whois', domain, python_whois_lookup, fields=self.DOMAIN_FIELDS)
+            self.results['domain_info'] = {field: w[field] for field in self.DOMAIN_FIELDS}
+            self.results['metadata']['whois_cache'] = dict(self.whois_cache.stats(), hit=cached)
         except Exception as e:
             self.results['domain_info'] = {'error': str(e)}
 
     def get_ip_info(self, domain):
         try:
-            ip = socket.gethostbyname(domain)
+            ip = self.dns.addresses_sync(domain)[0]
             self.results['technical_info']['ip'] = ip
+            self.results['metadata']['dns_cache'] = self.dns.cache.stats()
             
             # Getting IP geolocation information (example using ip api.com)
-            response = requests.get(f'http://ip-api.com/json/{ip}')
-            if response.status_code == 200:
-                self.results['technical_info']['ip_details'] = response.json()
+            ip_details = self.geo.lookup_one(ip)
+            if 'error' not in ip_details:
+                self.results['technical_info']['ip_details'] = ip_details
         except Exception as e:
             self.results['technical_info']['error'] = str(e)
 
     def scrape_website(self, url):
         try:
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-            response = requests.get(url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # incremental scans send conditional requests and reuse unchanged extractions
+            if self.state is not None:
+                response = self.state.fetch_page(self.http, url, max_bytes=self.max_page_bytes, fields=self.WEB_FIELDS)
+            else:
+                response = fetch_page(self.http, url, max_bytes=self.max_page_bytes, fields=self.WEB_FIELDS)
+            page = response.data
             
             self.results['web_info'] = {
-                'title': soup.title.string if soup.title else None,
-                'meta_description': soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else None,
-                'headers': [h.text for h in soup.find_all(['h1', 'h2', 'h3'])],
-                'links': [link.get('href') for link in soup.find_all('a', href=True)],
-                'emails': self._extract_emails(response.text)
+                'title': page['title'],
+                'meta_description': page['meta_tags'].get('description'),
+                'headers': [text for _, text in page['headings']],
+                'links': [link['href'] for link in page['links']],
+                'emails': page['emails']
             }
+            if response.truncated:
+                self.results['web_info']['truncated'] = True
+            if response.cache_status:
+                self.results['web_info']['cache_status'] = response.cache_status
         except Exception as e:
             self.results['web_info'] = {'error': str(e)}
 
     def _extract_emails(self, text):
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        return list(set(re.findall(email_pattern, text)))
+        return extract_emails(text)
 
     def save_results(self, filename):
         clean_filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
@@ -77,8 +99,10 @@ class RexzeaRegulerOsint:
                 for key, value in data.items():
                     flat_dict[f"{category}_{key}"] = str(value)
         
-        df = pd.DataFrame([flat_dict])
-        df.to_csv(f'{clean_filename}.csv', index=False)
+        with open(f'{clean_filename}.csv', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(flat_dict))
+            writer.writeheader()
+            writer.writerow(flat_dict)
 
 def extract_domain(url):
     url = url.strip().lower()
@@ -88,50 +112,74 @@ def extract_domain(url):
     parsed = urlparse(url)
     return parsed.netloc
 
-def main():
-    print("""
-
- ███▄ ▄███▓ ▄▄▄        ▄████  ██▓ ▄████▄     ▓█████▓██   ██▓▓█████ 
-▓██▒▀█▀ ██▒▒████▄     ██▒ ▀█▒▓██▒▒██▀ ▀█     ▓█   ▀ ▒██  ██▒▓█   ▀ 
-▓██    ▓██░▒██  ▀█▄  ▒██░▄▄▄░▒██▒▒▓█    ▄    ▒███    ▒██ ██░▒███   
-▒██    ▒██ ░██▄▄▄▄██ ░▓█  ██▓░██░▒▓▓▄ ▄██▒   ▒▓█  ▄  ░ ▐██▓░▒▓█  ▄ 
-▒██▒   ░██▒ ▓█   ▓██▒░▒▓███▀▒░██░▒ ▓███▀ ░   ░▒████▒ ░ ██▒▓░░▒████▒
-░ ▒░   ░  ░ ▒▒   ▓▒█░ ░▒   ▒ ░▓  ░ ░▒ ▒  ░   ░░ ▒░ ░  ██▒▒▒ ░░ ▒░ ░
-░  ░      ░  ▒   ▒▒ ░  ░   ░  ▒ ░  ░  ▒       ░ ░  ░▓██ ░▒░  ░ ░  ░
-░      ░     ░   ▒   ░ ░   ░  ▒ ░░              ░   ▒ ▒ ░░     ░   
-       ░         ░  ░      ░  ░  ░ ░            ░  ░░ ░        ░  ░
-                                 ░                  ░ ░            
-        """)
-    print ("cr : rexzea")
-    print("=" * 50)
-    url_input = input("Enter the target domain (example: example.com): ").strip()
-    
+def scan_domain(url_input, options=None):
     # domain to url
     domain = extract_domain(url_input)
     if not domain:
         print("Error: Invalid URL")
-        return
+        return False
     
     print(f"\n[*] Target domain: {domain}")
     print("[*] Getting started with information gathering...")
     
-    osint = RexzeaRegulerOsint()
+    osint = RexzeaRegulerOsint(incremental=options.incremental if options is not None else False)
+    timings = Timings()
     
     print("[+] Analyze domain information...")
-    osint.analyze_domain(domain)
+    with timings.span('domain'):
+        osint.analyze_domain(domain)
     
     print("[+] Collect IP information...")
-    osint.get_ip_info(domain)
+    with timings.span('ip'):
+        osint.get_ip_info(domain)
     
     print("[+] Collect website information...")
     full_url = f"https://{domain}" if not url_input.startswith(('http://', 'https://')) else url_input
-    osint.scrape_website(full_url)
+    with timings.span('website'):
+        osint.scrape_website(full_url)
+    osint.results['metadata'].update({'scan_date': datetime.now().isoformat(), 'spans': timings.report()})
+    count_result_errors(osint.results)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"osint_results_{domain}_{timestamp}"
+    
+    # incremental scans only write what changed since the last one
+    diff = osint.state.diff('reguler', domain, osint.results) if osint.state is not None else None
+    if options is not None and options.sink is not None:
+        options.sink.write(result_record('reguler', url_input, domain, osint.results, diff), osint.results)
+        print(f"\n[✓] Analysis complete! The results have been appended to {options.sink.path}")
+        return True
+    if diff is not None:
+        print(f"\n[✓] Analysis complete! {count_changes(diff)} change(s) since {diff['previous_scan']} saved in {write_diff(filename, diff)}")
+        return True
     osint.save_results(filename)
     
     print(f"\n[✓] Analysis complete! The results have been saved in {filename}.json dan {filename}.csv")
+    return True
+
+def main():
+    # any argument switches to non-interactive batch mode
+    if len(sys.argv) > 1:
+        batch_main(scan_domain, "Run the regular OSINT scan over a list of targets", add_arguments=add_incremental_argument)
+        return
+
+    print("""
+
+ ███▄ ▄███▓ ▄▄▄        ▄████  ██▓ ▄████▄     ▓█████▓██   ██▓▓█████ 
+▓██▒▀█▀ ██▒▒████▄     ██▒ ▀█▒▓██▒▒██▀ ▀█     ▓█   ▀ ▒██  ██▒▓█   ▀ 
+▓██    ▓██░▒██  ▀█▄  ▒██░▄▄▄░▒██▒▒▓█    ▄    ▒███    ▒██ ██░▒███   
+▒██    ▒██ ░██▄▄▄▄██ ░▓█  ██▓░██░▒▓▓▄ ▄██▒   ▒▓█  ▄  ░ ▐██▓░▒▓█  ▄ 
+▒██▒   ░██▒ ▓█   ▓██▒░▒▓███▀▒░██░▒ ▓███▀ ░   ░▒████▒ ░ ██▒▓░░▒████▒
+░ ▒░   ░  ░ ▒▒   ▓▒█░ ░▒   ▒ ░▓  ░ ░▒ ▒  ░   ░░ ▒░ ░  ██▒▒▒ ░░ ▒░ ░
+░  ░      ░  ▒   ▒▒ ░  ░   ░  ▒ ░  ░  ▒       ░ ░  ░▓██ ░▒░  ░ ░  ░
+░      ░     ░   ▒   ░ ░   ░  ▒ ░░              ░   ▒ ▒ ░░     ░   
+       ░         ░  ░      ░  ░  ░ ░            ░  ░░ ░        ░  ░
+                                 ░                  ░ ░            
+        """)
+    print ("cr : rexzea")
+    print("=" * 50)
+    url_input = input("Enter the target domain (example: example.com): ").strip()
+    scan_domain(url_input)
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,42 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import csv
 from datetime import datetime
 import json
-import time
 from urllib.parse import urlparse
 import socket
 import sys
 import re
-import subprocess
-import platform
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from magiceye.batch import batch_main
+from magiceye.http_client import get_client
+from magiceye.incremental import add_incremental_argument, count_changes, get_state, write_diff
+from magiceye.metrics import count_result_errors
+from magiceye.web import MAX_PAGE_BYTES, fetch_page
+from magiceye.geo import get_locator
+from magiceye.resolver import get_engine
+from magiceye.sinks import result_record
+from magiceye.timing import Timings
+from magiceye.whois_cache import get_whois_cache
+from magiceye.whois_client import get_whois_client
 
 class RexzeaSpecificOsint:
-    def __init__(self):
+    WEB_FIELDS = ('title', 'meta_tags', 'headings', 'links')
+
+    def __init__(self, http=None, geo=None, whois_cache=None, whois_client=None, dns_engine=None, max_page_bytes=MAX_PAGE_BYTES, incremental=False):
+        self.http = http or get_client()
+        self.max_page_bytes = max_page_bytes
+        self.dns = dns_engine or get_engine(persistent=incremental)
+        self.geo = geo or get_locator('ipapi.co')
+        self.whois_cache = whois_cache or get_whois_cache()
+        self.whois_client = whois_client or get_whois_client()
+        self.state = get_state() if incremental else None
         self.results = {
             'domain_info': {},
             'web_info': {},
             'ip_info': {},
-            'timestamps': {}
+            'timestamps': {},
+            'metadata': {}
         }
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -43,91 +62,29 @@ class RexzeaSpecificOsint:
 
     def get_whois_info(self, domain):
         try:
-            # extract the main domain
-            domain_match = re.search(r'([a-zA-Z0-9-]+\.[a-zA-Z]{2,})', domain)
-            if domain_match:
-                domain = domain_match.group(1)
-            
-            if platform.system() == "Windows":
-                # untuk windows
-                process = subprocess.Popen(['whois', domain], 
-                                        stdout=subprocess.PIPE, 
-                                        stderr=subprocess.PIPE,
-                                        shell=True)
-            else:
-                # untuk linux/unix
-                process = subprocess.Popen(['whois', domain], 
-                                        stdout=subprocess.PIPE, 
-                                        stderr=subprocess.PIPE)
-            
-            output, error = process.communicate()
-            
-            if error:
-                print(f"WHOIS Error: {error.decode()}")
-                return None
-                
-            whois_data = output.decode('utf-8', errors='ignore')
-            
-            # parse WHOIS output
-            whois_dict = {}
-            key_mappings = {
-                'Registrar:': 'registrar',
-                'Creation Date:': 'creation_date',
-                'Registry Expiry Date:': 'expiration_date',
-                'Name Server:': 'name_servers',
-                'Status:': 'status',
-                'Registrant Email:': 'email'
-            }
-            
-            name_servers = []
-            statuses = []
-            
-            for line in whois_data.split('\n'):
-                line = line.strip()
-                for key in key_mappings:
-                    if line.startswith(key):
-                        value = line[len(key):].strip()
-                        dict_key = key_mappings[key]
-                        
-                        if dict_key == 'name_servers':
-                            name_servers.append(value)
-                        elif dict_key == 'status':
-                            statuses.append(value)
-                        else:
-                            whois_dict[dict_key] = value
-            
-            if name_servers:
-                whois_dict['name_servers'] = name_servers
-            if statuses:
-                whois_dict['status'] = statuses
-            
-            return whois_dict
+            return self.whois_client.whois_sync(domain)
         except Exception as e:
             print(f"Error in WHOIS lookup: {str(e)}")
             return None
 
+    def get_rdap_info(self, domain):
+        return self.whois_client.rdap_sync(domain)
+
     def gather_domain_info(self, domain):
         try:
-            whois_info = self.get_whois_info(domain)
+            whois_info, cached = self.whois_cache.fetch('whois', domain, self.get_whois_info)
             
             if whois_info:
                 self.results['domain_info'] = whois_info
+                self.results['metadata']['whois_cache'] = dict(self.whois_cache.stats(), hit=cached)
                 print("Successfully gathered WHOIS information")
                 return True
             else:
-                response = requests.get(
-                    f"https://rdap.verisign.com/com/v1/domain/{domain}",
-                    headers=self.headers
-                )
+                rdap_info, cached = self.whois_cache.fetch('rdap', domain, self.get_rdap_info)
+                self.results['metadata']['whois_cache'] = dict(self.whois_cache.stats(), hit=cached)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    self.results['domain_info'] = {
-                        'registrar': data.get('entities', [{}])[0].get('vcardArray', [])[1][1][3],
-                        'status': data.get('status', []),
-                        'events': data.get('events', []),
-                        'nameservers': [ns.get('ldhName') for ns in data.get('nameservers', [])]
-                    }
+                if rdap_info:
+                    self.results['domain_info'] = rdap_info
                     print("Successfully gathered domain information from RDAP")
                     return True
                 else:
@@ -146,28 +103,27 @@ class RexzeaSpecificOsint:
 
     def gather_web_info(self, url):
         try:
-            response = requests.get(url, headers=self.headers, timeout=15, verify=True)
+            # incremental scans send conditional requests and reuse unchanged extractions
+            fetch = self.state.fetch_page if self.state is not None else fetch_page
+            response = fetch(self.http, url, max_bytes=self.max_page_bytes, fields=self.WEB_FIELDS, headers=self.headers, verify=True)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            meta_tags = {}
-            for meta in soup.find_all('meta'):
-                name = meta.get('name', meta.get('property', ''))
-                content = meta.get('content', '')
-                if name and content:
-                    meta_tags[name] = content
+            page = response.data
 
             self.results['web_info'] = {
-                'title': soup.title.string.strip() if soup.title else None,
-                'meta_tags': meta_tags,
-                'headers': [h.text.strip() for h in soup.find_all(['h1', 'h2', 'h3']) if h.text.strip()],
-                'links': list(set([link.get('href') for link in soup.find_all('a', href=True)])),
+                'title': page['title'].strip() if page['title'] else None,
+                'meta_tags': page['meta_tags'],
+                'headers': [text.strip() for _, text in page['headings'] if text.strip()],
+                'links': list(set(link['href'] for link in page['links'])),
                 'status_code': response.status_code,
                 'server': response.headers.get('Server'),
                 'content_type': response.headers.get('Content-Type'),
                 'technologies': dict(response.headers)
             }
+            if response.truncated:
+                self.results['web_info']['truncated'] = True
+            if response.cache_status:
+                self.results['web_info']['cache_status'] = response.cache_status
             return True
         except Exception as e:
             self.results['web_info'] = {
@@ -179,20 +135,22 @@ class RexzeaSpecificOsint:
         try:
             ip_addresses = []
             try:
-                ip_addresses = socket.gethostbyname_ex(domain)[2]
+                ip_addresses = self.dns.addresses_sync(domain)
             except socket.gaierror:
                 main_domain = re.search(r'([a-zA-Z0-9-]+\.[a-zA-Z]{2,}$)', domain)
                 if main_domain:
-                    ip_addresses = socket.gethostbyname_ex(main_domain.group(1))[2]
+                    ip_addresses = self.dns.addresses_sync(main_domain.group(1))
+            self.results['metadata']['dns_cache'] = self.dns.cache.stats()
 
             if not ip_addresses:
                 raise Exception("No IP addresses found")
 
+            # the locator paces ipapi.co requests itself, no fixed sleep needed
+            lookups = self.geo.lookup(ip_addresses)
             ip_info_list = []
             for ip in ip_addresses:
-                response = requests.get(f"https://ipapi.co/{ip}/json/", headers=self.headers, timeout=10)
-                if response.status_code == 200:
-                    ip_data = response.json()
+                ip_data = lookups[ip]
+                if 'error' not in ip_data:
                     ip_info_list.append({
                         'ip': ip,
                         'country': ip_data.get('country_name'),
@@ -203,7 +161,6 @@ class RexzeaSpecificOsint:
                         'latitude': ip_data.get('latitude'),
                         'longitude': ip_data.get('longitude')
                     })
-                time.sleep(1)
 
             self.results['ip_info'] = ip_info_list
             return True
@@ -229,8 +186,10 @@ class RexzeaSpecificOsint:
                     else:
                         flat_dict[category] = str(data)
                 
-                df = pd.DataFrame([flat_dict])
-                df.to_csv(f"{filename}.csv", index=False)
+                with open(f"{filename}.csv", 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=list(flat_dict))
+                    writer.writeheader()
+                    writer.writerow(flat_dict)
             
             print(f"\nResults saved to {filename}.{format}")
             return True
@@ -252,17 +211,19 @@ class RexzeaSpecificOsint:
         print("-" * 50)
 
         success = True
+        timings = Timings()
         steps = [
-            ("Gathering domain information...", lambda: self.gather_domain_info(domain)),
-            ("Gathering web information...", lambda: self.gather_web_info(url)),
-            ("Gathering IP information...", lambda: self.gather_ip_info(domain))
+            ('domain', "Gathering domain information...", lambda: self.gather_domain_info(domain)),
+            ('web', "Gathering web information...", lambda: self.gather_web_info(url)),
+            ('ip', "Gathering IP information...", lambda: self.gather_ip_info(domain))
         ]
 
         results_summary = []
-        for step_msg, step_func in steps:
+        for step_name, step_msg, step_func in steps:
             print(step_msg)
             try:
-                step_success = step_func()
+                with timings.span(step_name):
+                    step_success = step_func()
                 if not step_success:
                     print(f"Warning: {step_msg.strip('.')} completed with errors")
                     results_summary.append(f"✗ {step_msg.strip('.')}")
@@ -275,6 +236,8 @@ class RexzeaSpecificOsint:
                 results_summary.append(f"✗ {step_msg.strip('.')} (Error: {str(e)})")
                 success = False
             print("-" * 50)
+        self.results['metadata']['spans'] = timings.report()
+        count_result_errors(self.results)
 
         print("\nAnalysis Summary:")
         for result in results_summary:
@@ -282,7 +245,33 @@ class RexzeaSpecificOsint:
 
         return success
 
+def scan_target(target, options=None):
+    osint = RexzeaSpecificOsint(incremental=options.incremental if options is not None else False)
+    success = osint.analyze_target(target)
+
+    # partial results are still worth keeping in batch runs
+    clean_target = re.sub(r'[^\w\-_]', '_', target)
+    filename = f"osint_report_{clean_target}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    
+    # incremental scans only write what changed since the last one
+    _, domain = osint.clean_url(target)
+    diff = osint.state.diff('specific', domain or target, osint.results) if osint.state is not None else None
+    if options is not None and options.sink is not None:
+        osint.results['timestamps']['scan_date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        options.sink.write(result_record('specific', target, domain, osint.results, diff), osint.results)
+        print(f"\nResults appended to {options.sink.path}")
+        return success
+    if diff is not None:
+        print(f"\n{count_changes(diff)} change(s) since {diff['previous_scan']} saved to {write_diff(filename, diff)}")
+        return success
+    return osint.save_to_file(filename, 'json') and success
+
 def main():
+    # any argument switches to non-interactive batch mode
+    if len(sys.argv) > 1:
+        batch_main(scan_target, "Run the specific OSINT scan over a list of targets", add_arguments=add_incremental_argument)
+        return
+
     try:
         print("""
 
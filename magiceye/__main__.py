@@ -0,0 +1,5 @@
+import sys
+
+from magiceye.cli import main
+
+sys.exit(main())
@@ -0,0 +1,124 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from magiceye.scan import ScanContext, Scanner
+from magiceye.scheduler import AsyncStageScheduler
+from magiceye.timing import Timings
+
+# threads shared by all scans of an AsyncScanner for the collectors (and calls)
+# that only exist as blocking code: whois, web, crawl
+MAX_THREADS = 32
+
+
+async def collect(module, ctx):
+    # a collector's section: natively when the module has collect_async, otherwise
+    # its blocking collect in the scanner's thread pool
+    native = getattr(module, 'collect_async', None)
+    if native is not None:
+        return await native(ctx)
+    return await ctx.run_blocking(module.collect, ctx)
+
+
+class _Executor(concurrent.futures.ThreadPoolExecutor):
+    # keeps its unfinished futures so close() can cancel them; shutdown's
+    # cancel_futures needs python 3.9
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unfinished = set()
+        self._unfinished_lock = threading.Lock()
+
+    def submit(self, *args, **kwargs):
+        future = super().submit(*args, **kwargs)
+        with self._unfinished_lock:
+            self.unfinished.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._unfinished_lock:
+            self.unfinished.discard(future)
+
+    def cancel_all(self):
+        with self._unfinished_lock:
+            futures = list(self.unfinished)
+        for future in futures:
+            future.cancel()
+
+
+class AsyncScanner(Scanner):
+    # Scanner on an event loop: every target is a task, every stage of it a task,
+    # so thousands of targets share one loop and one bounded thread pool
+    def __init__(self, mode=None, collectors=None, stage_timeout=30, deadline=120, max_threads=MAX_THREADS, **options):
+        super().__init__(mode=mode, collectors=collectors, stage_timeout=stage_timeout, deadline=deadline, **options)
+        self.executor = _Executor(max_workers=max_threads, thread_name_prefix='magiceye-scan')
+
+    async def scan(self, target):
+        results = {module.SECTION: {} for module in self.collectors.values()}
+        ctx = ScanContext(target, self.options, results, executor=self.executor)
+        timings = Timings()
+        started = time.perf_counter()
+
+        async def run(module):
+            # a stage that timed out is cancelled here, so it never writes late
+            results[module.SECTION].update(await collect(module, ctx))
+
+        scheduler = AsyncStageScheduler(stage_timeout=self.stage_timeout, deadline=self.deadline, timings=timings)
+        for name, module in self.collectors.items():
+            scheduler.add(name, lambda module=module: run(module), depends_on=module.DEPENDS_ON, after=getattr(module, 'AFTER', ()))
+        stages = await scheduler.run()
+        self._finish(ctx, results, stages, timings, started)
+        return results
+
+    async def scan_many(self, targets, concurrency=500):
+        # yields (target, results or exception) as scans finish; targets is read
+        # lazily by concurrency workers, so only that many scans are in memory
+        targets = iter(targets)
+        # bounded, so workers wait for a slow consumer instead of piling up results
+        finished = asyncio.Queue(maxsize=concurrency)
+
+        async def worker():
+            for target in targets:
+                try:
+                    results = await self.scan(target)
+                except Exception as e:
+                    results = e
+                await finished.put((target, results))
+
+        async def run_workers():
+            # workers report failures as results, so gather only ends early when cancelled
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            await finished.put(None)
+
+        producer = asyncio.ensure_future(run_workers())
+        try:
+            while True:
+                item = await finished.get()
+                if item is None:
+                    break
+                yield item
+            await producer
+        finally:
+            producer.cancel()
+
+    def close(self):
+        # blocking collectors still running are abandoned rather than waited for
+        self.executor.cancel_all()
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+async def scan(target, stages=None, mode=None, **options):
+    # stages: collector names (default: the mode preset)
+    async with AsyncScanner(mode=mode, collectors=stages, **options) as scanner:
+        return await scanner.scan(target)
+
+
+def scan_sync(target, stages=None, mode=None, **options):
+    return asyncio.run(scan(target, stages, mode, **options))
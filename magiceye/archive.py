@@ -0,0 +1,253 @@
+import ast
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+from magiceye.sinks import RESULT_FIELDS, SECTIONS, _to_text, result_record
+from magiceye.store import KINDS, PIVOT_KEYS, SKIP_KEYS, extract_pivots, normalize
+
+# file names written by each tool's save_results / save_to_file; csv files are
+# either one row of "section_key" columns or Key,Value rows from _flatten_dict
+ARCHIVE_FILES = (
+    ('hazard', 'kv', re.compile(r'^enhanced_osint_scan_(?P<name>.+)_(?P<ts>\d{8}_\d{6})_results\.(?P<ext>json|csv)$')),
+    ('hunter', 'kv', re.compile(r'^osint_scan_(?P<name>.+)_(?P<ts>\d{8}_\d{6})_results\.(?P<ext>json|csv)$')),
+    ('reguler', 'row', re.compile(r'^osint_results_(?P<name>.+)_(?P<ts>\d{8}_\d{6})\.(?P<ext>json|csv)$')),
+    ('specific', 'row', re.compile(r'^osint_report_(?P<name>.+)_(?P<ts>\d{8}_\d{6})\.(?P<ext>json|csv)$'))
+)
+ARCHIVE_FIELDS = RESULT_FIELDS + ('source',)
+BATCH_ROWS = 1000
+
+_PIVOT_KEY_SET = {key for keys in PIVOT_KEYS.values() for key in keys}
+# sections by length, so 'web_info_x' is not taken for a shorter prefix
+_SECTION_PREFIXES = sorted(SECTIONS, key=len, reverse=True)
+
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def match_file(path):
+    # (mode, csv layout, match) or None for files the tools did not write
+    name = os.path.basename(path)
+    for mode, layout, pattern in ARCHIVE_FILES:
+        match = pattern.match(name)
+        if match:
+            return mode, layout, match
+    return None
+
+
+def _name_to_domain(mode, name):
+    # specific replaced every non-word character of the target with '_'
+    if mode != 'specific':
+        return name.lower()
+    name = re.sub(r'^https?___', '', name)
+    return name.strip('_').split('__')[0].replace('_', '.').lower()
+
+
+def _value(text):
+    # csv cells hold str() of python values
+    if text == '' or text == 'None':
+        return None
+    if text[:1] in ('[', '{', '('):
+        try:
+            return ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return text
+    return text
+
+
+def _split_key(key):
+    for section in _SECTION_PREFIXES:
+        if key.startswith(section + '_'):
+            return section, key[len(section) + 1:]
+    return None, key
+
+
+def _read_csv(path, layout):
+    # {section: {flattened key: value}}; nested keys stay joined with '_'
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if layout == 'kv' and header == ['Key', 'Value']:
+            items = ((row[0], row[1]) for row in rows if len(row) == 2)
+        else:
+            items = zip(header or (), next(rows, ()))
+        results = {}
+        for key, text in items:
+            section, rest = _split_key(key)
+            if section is not None:
+                results.setdefault(section, {})[rest] = _value(text)
+    return results
+
+
+def _flat_pivots(results):
+    # flattened keys end with the original one: network_info_ip_addresses_ipv4_addresses
+    entries = []
+    for section, data in results.items():
+        if section in SKIP_KEYS or not isinstance(data, dict):
+            continue
+        for key, value in data.items():
+            parts = key.split('_')
+            for i in range(len(parts)):
+                suffix = '_'.join(parts[i:])
+                if suffix in _PIVOT_KEY_SET:
+                    entries.append({suffix: value})
+                    break
+            else:
+                entries.append({key: value})
+    return extract_pivots(entries)
+
+
+def parse_file(path):
+    # one archive row (text columns plus a list per pivot kind), or {'source', 'error'}
+    matched = match_file(path)
+    if matched is None:
+        return {'source': path, 'error': 'unknown file name'}
+    mode, layout, match = matched
+    try:
+        if match.group('ext') == 'json':
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+            pivots = extract_pivots(results)
+        else:
+            results = _read_csv(path, layout)
+            pivots = _flat_pivots(results)
+    except (OSError, ValueError, csv.Error) as e:
+        return {'source': path, 'error': str(e)}
+
+    metadata = results.get('metadata') if isinstance(results.get('metadata'), dict) else {}
+    domain = metadata.get('domain') or _name_to_domain(mode, match.group('name'))
+    record = result_record(mode, metadata.get('target') or match.group('name'), domain, results)
+    if not record['scan_date']:
+        ts = match.group('ts')
+        record['scan_date'] = f"{ts[:4]}-{ts[4:6]}-{ts[6:8]}T{ts[9:11]}:{ts[11:13]}:{ts[13:15]}"
+
+    row = {field: _to_text(record[field]) for field in RESULT_FIELDS}
+    row['source'] = path
+    for kind in KINDS:
+        row[kind] = sorted(value for pivot_kind, value in pivots if pivot_kind == kind)
+    return row
+
+
+def find_files(paths):
+    # archive files under paths, lazily; with both a .json and a .csv of one
+    # scan only the json is read, it keeps the nesting the csv flattened
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, _, files in os.walk(path):
+            names = set(files)
+            for name in sorted(files):
+                if name.endswith('.csv') and name[:-4] + '.json' in names:
+                    continue
+                # the tools keep the csv next to the json, in database/csv and database/json
+                twin = os.path.join(os.path.dirname(root), 'json', name[:-4] + '.json')
+                if name.endswith('.csv') and os.path.basename(root) == 'csv' and os.path.exists(twin):
+                    continue
+                if match_file(name):
+                    yield os.path.join(root, name)
+
+
+def _schema(pa):
+    return pa.schema(
+        [(field, pa.string()) for field in ARCHIVE_FIELDS] + [(kind, pa.list_(pa.string())) for kind in KINDS]
+    )
+
+
+def import_archive(paths, output, workers=None, batch_rows=BATCH_ROWS):
+    # parses every archive file under paths in a process pool and writes one
+    # parquet file, batch_rows rows per row group; returns {'files', 'rows', 'errors'}
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Archive import needs pyarrow (pip install pyarrow)")
+    schema = _schema(pyarrow)
+    workers = workers or os.cpu_count() or 1
+    summary = {'files': 0, 'rows': 0, 'errors': []}
+    batch = []
+
+    def flush(writer):
+        columns = {field: [row[field] for row in batch] for field in schema.names}
+        writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+        summary['rows'] += len(batch)
+        batch.clear()
+
+    with pyarrow.parquet.ParquetWriter(output, schema, compression='zstd') as writer:
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            rows = pool.imap_unordered(parse_file, find_files(paths), chunksize=64)
+        else:
+            pool = None
+            rows = map(parse_file, find_files(paths))
+        try:
+            for row in rows:
+                summary['files'] += 1
+                if 'error' in row:
+                    summary['errors'].append(row)
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    flush(writer)
+            if batch:
+                flush(writer)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return summary
+
+
+def _conditions(where):
+    # ['ip=1.2.3.4', 'mode=hazard'] -> {column: value}, pivot values normalized
+    conditions = {}
+    for condition in where or ():
+        column, sep, value = condition.partition('=')
+        column = column.strip()
+        if not sep or column not in ARCHIVE_FIELDS + KINDS:
+            raise ValueError(f"Invalid condition '{condition}' (use column=value with one of: {', '.join(ARCHIVE_FIELDS + KINDS)})")
+        if column in KINDS:
+            value = normalize(column, value)
+            if value is None:
+                raise ValueError(f"'{condition}' is not a valid {column}")
+        conditions[column] = value
+    return conditions
+
+
+def query_archive(path, where=None, columns=None, limit=None):
+    # yields matching rows as dicts, one row group at a time; plain columns are
+    # filtered by the dataset scanner (row groups are skipped on statistics),
+    # pivot lists batch by batch
+    try:
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError("Archive queries need pyarrow (pip install pyarrow)")
+    conditions = _conditions(where)
+    columns = list(columns or ('mode', 'domain', 'scan_date', 'source'))
+    unknown = [column for column in columns if column not in ARCHIVE_FIELDS + KINDS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+    expression = None
+    for column, value in conditions.items():
+        if column not in KINDS:
+            term = ds.field(column) == value
+            expression = term if expression is None else expression & term
+    list_conditions = {column: value for column, value in conditions.items() if column in KINDS}
+    read = list(dict.fromkeys(columns + list(list_conditions)))
+
+    returned = 0
+    for batch in ds.dataset(path, format='parquet').to_batches(columns=read, filter=expression):
+        for column, value in list_conditions.items():
+            values = batch.column(column)
+            hits = pc.equal(pc.list_flatten(values), value)
+            indices = pc.unique(pc.filter(pc.list_parent_indices(values), hits))
+            batch = batch.take(indices)
+        for row in batch.select(columns).to_pylist():
+            yield row
+            returned += 1
+            if limit is not None and returned >= limit:
+                return
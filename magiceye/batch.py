@@ -0,0 +1,177 @@
+import argparse
+import concurrent.futures
+import contextlib
+import functools
+import math
+import sys
+import time
+
+from magiceye import metrics, parsing, timing
+from magiceye.sinks import open_sink
+
+
+def read_targets(source):
+    # one target per line, '-' reads from stdin; blank lines and comments are ignored
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line in stream:
+            target = line.strip()
+            if target and not target.startswith('#'):
+                yield target
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # nearest-rank percentile
+    index = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def run_batch(targets, scan_func, workers=8):
+    # scan_func gets one target and must build its own scanner, so no state is shared
+    # between targets; at most workers * 2 targets are pulled from the input at a time
+    latencies = []
+    failures = []
+    total = 0
+    started = time.perf_counter()
+    timing.reset_stage_histograms()
+
+    def timed_scan(target):
+        t0 = time.perf_counter()
+        try:
+            ok = scan_func(target) is not False
+            error = None if ok else 'scan reported errors'
+        except Exception as e:
+            ok, error = False, str(e)
+        latency = time.perf_counter() - t0
+        metrics.inc('magiceye_targets_total', status='ok' if ok else 'failed')
+        metrics.observe('magiceye_target_duration_seconds', latency)
+        return target, ok, error, latency
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for target in targets:
+            if len(in_flight) >= workers * 2:
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    total += _collect(future, latencies, failures)
+            in_flight.add(executor.submit(timed_scan, target))
+
+        for future in concurrent.futures.as_completed(in_flight):
+            total += _collect(future, latencies, failures)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'targets': total,
+        'succeeded': total - len(failures),
+        'failed': len(failures),
+        'failures': failures,
+        'workers': workers,
+        'elapsed': round(elapsed, 3),
+        'targets_per_sec': round(total / elapsed, 3) if elapsed else None,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'stages': timing.stage_histograms()
+    }
+
+
+def _collect(future, latencies, failures):
+    target, ok, error, latency = future.result()
+    latencies.append(latency)
+    if not ok:
+        failures.append({'target': target, 'error': error})
+    return 1
+
+
+def display_summary(summary, file=None):
+    def fmt(seconds):
+        return f"{seconds:.2f}s" if seconds is not None else 'N/A'
+
+    print("\n=== BATCH SUMMARY ===", file=file)
+    print(f"Targets: {summary['targets']} ({summary['succeeded']} ok, {summary['failed']} failed)", file=file)
+    print(f"Workers: {summary['workers']}", file=file)
+    print(f"Elapsed: {fmt(summary['elapsed'])}", file=file)
+    print(f"Throughput: {summary['targets_per_sec'] or 0:.2f} targets/s", file=file)
+    print(f"Latency p50: {fmt(summary['latency_p50'])}  p95: {fmt(summary['latency_p95'])}", file=file)
+    if summary.get('stages'):
+        print(f"\n{'Stage':<20} {'Count':>6} {'p50':>8} {'p95':>8} {'Max':>8} {'Total':>9}", file=file)
+        for name, stage in summary['stages'].items():
+            print(f"{name:<20} {stage['count']:>6} {fmt(stage['p50']):>8} {fmt(stage['p95']):>8} {fmt(stage['max']):>8} {fmt(stage['sum']):>9}", file=file)
+    for failure in summary['failures']:
+        print(f"[-] {failure['target']}: {failure['error']}", file=file)
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', choices=timing.PROFILE_MODES, default=timing.PROFILE, help='profile every stage: cpu writes a cProfile .prof file per stage, memory adds the top allocations to the timing spans')
+    parser.add_argument('--profile-dir', default=timing.PROFILE_DIR, help=f'directory for the cpu profiles (default: {timing.PROFILE_DIR})')
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on http://127.0.0.1:PORT/metrics during the run')
+    parser.add_argument('--metrics-file', help='keep Prometheus metrics in this file (textfile collector format), rewritten every 15s and at the end')
+
+
+def add_parse_arguments(parser):
+    parser.add_argument('--parse-workers', type=int, default=0, help='extract fetched pages in this many processes instead of the fetching threads (default: 0)')
+
+
+def start_metrics(args):
+    # starts the exporters asked for in args; returns a function that stops them
+    server = metrics.serve(args.metrics_port) if args.metrics_port else None
+    writer = metrics.TextfileWriter(args.metrics_file) if args.metrics_file else None
+
+    def stop():
+        if writer is not None:
+            writer.stop()
+        if server is not None:
+            server.shutdown()
+    return stop
+
+
+def batch_main(scan_func, description, argv=None, add_arguments=None):
+    # scan_func is called as scan_func(target, options=<parsed args>); add_arguments(parser)
+    # lets a tool register its own options, options.sink is the shared --output sink or None
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('targets', help="file with one target per line, or '-' for stdin")
+    parser.add_argument('-w', '--workers', type=int, default=8, help='maximum number of targets scanned at once (default: 8)')
+    parser.add_argument('-o', '--output', help='append every result to one .jsonl, .csv, .parquet or .sqlite (pivot store) file instead of writing files per target')
+    parser.add_argument('--batch-size', type=int, help='results buffered before each write to --output')
+    add_profile_arguments(parser)
+    add_metrics_arguments(parser)
+    add_parse_arguments(parser)
+    if add_arguments is not None:
+        add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.parse_workers < 0:
+        parser.error('--parse-workers must be 0 or more')
+    try:
+        timing.configure(args.profile, args.profile_dir)
+        parsing.configure(args.parse_workers)
+        args.sink = open_sink(args.output, args.batch_size) if args.output else None
+        stop_metrics = start_metrics(args)
+    except (ValueError, ImportError, OSError) as e:
+        parser.error(str(e))
+
+    # with the results streamed to stdout, the tools' progress lines go to stderr;
+    # the sink already holds the real stdout
+    human = contextlib.redirect_stdout(sys.stderr) if args.output == '-' else contextlib.nullcontext()
+    with human:
+        try:
+            summary = run_batch(read_targets(args.targets), functools.partial(scan_func, options=args), workers=args.workers)
+        finally:
+            if args.sink is not None:
+                args.sink.close()
+            stop_metrics()
+            parsing.shutdown()
+        display_summary(summary)
+        if args.sink is not None:
+            print(f"Results: {args.sink.count} record(s) written to {args.output}")
+    return summary
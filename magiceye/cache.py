@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.environ.get('MAGICEYE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'magiceye'))
+
+# eviction trims to this share of max_entries, so the table is counted once
+# per (1 - EVICT_TO) * max_entries writes instead of on every write
+EVICT_TO = 0.9
+# a hit only rewrites its access time when the stored one is older than this
+ACCESS_RESOLUTION = 60
+
+
+def cache_path(filename):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
+
+
+class SqliteTTLCache:
+    # JSON values keyed by (namespace, key), each with its own expiry time; when
+    # max_entries is set the least recently used rows are evicted first
+    def __init__(self, path, default_ttl=86400, max_entries=None):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires REAL NOT NULL, '
+                'accessed REAL NOT NULL DEFAULT 0, PRIMARY KEY (namespace, key))'
+            )
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(cache)')]
+            if 'accessed' not in columns:
+                self._conn.execute('ALTER TABLE cache ADD COLUMN accessed REAL NOT NULL DEFAULT 0')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            # rows written since the last count; replaced keys make it an upper bound
+            self._count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] if max_entries else 0
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires, accessed FROM cache WHERE namespace = ? AND key = ?', (namespace, key)
+            ).fetchone()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # minute precision is enough for LRU and keeps hits read-only
+            if self.max_entries and now - row[2] >= ACCESS_RESOLUTION:
+                with self._conn:
+                    self._conn.execute('UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?', (now, namespace, key))
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl=None):
+        now = time.time()
+        expires = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires, accessed) VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, json.dumps(value, default=str), expires, now)
+            )
+            self._count += 1
+            if self.max_entries and self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self.max_entries:
+            # expired rows go first, then the least recently used ones
+            count -= self._conn.execute('DELETE FROM cache WHERE expires < ?', (time.time(),)).rowcount
+            overflow = count - int(self.max_entries * EVICT_TO)
+            if overflow > 0:
+                self._conn.execute(
+                    'DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY accessed LIMIT ?)', (overflow,)
+                )
+                count -= overflow
+        self._count = count
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            purged = self._conn.execute('DELETE FROM cache WHERE expires < ?', (time.time(),)).rowcount
+            self._count = max(self._count - purged, 0)
+            return purged
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
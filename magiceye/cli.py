@@ -0,0 +1,249 @@
+import argparse
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from magiceye import parsing, timing
+from magiceye.batch import add_metrics_arguments, add_parse_arguments, add_profile_arguments, display_summary, read_targets, run_batch, start_metrics
+from magiceye.collectors import COLLECTORS
+from magiceye.scan import DEFAULT_MODE, MODES, Scanner
+from magiceye.sinks import open_sink, result_record
+from magiceye.store import KINDS, ResultStore
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='magic-eye', description='Magic Eye OSINT scanner')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help='scan one or more targets without prompts')
+    scan.add_argument('targets', nargs='*', help='domains or urls to scan')
+    scan.add_argument('-i', '--input', help="file with one target per line, or '-' for stdin")
+    scan.add_argument('-m', '--mode', choices=list(MODES), help=f'collector preset (default: {DEFAULT_MODE})')
+    scan.add_argument('-c', '--collectors', help=f"comma separated collectors to run instead of the mode preset ({', '.join(COLLECTORS)})")
+    scan.add_argument('-o', '--output', default='-', help="results file (.jsonl, .csv, .parquet, or .sqlite for a pivot store), '-' for JSON lines on stdout (default)")
+    scan.add_argument('--batch-size', type=int, help='results buffered before each write to --output')
+    scan.add_argument('-w', '--workers', type=int, default=8, help='maximum number of targets scanned at once (default: 8)')
+    scan.add_argument('--stage-timeout', type=float, default=30, help='seconds a single collector may take (default: 30)')
+    scan.add_argument('--deadline', type=float, default=120, help='seconds a whole target may take (default: 120)')
+    scan.add_argument('--incremental', action='store_true', help='reuse cached answers and record only the changes since the previous scan')
+    scan.add_argument('--ports', help='ports for the ports collector, e.g. "22,80,8000-8100"')
+    scan.add_argument('--max-pages', type=int, help='pages fetched per target by the crawl collector')
+    scan.add_argument('--max-depth', type=int, help='link depth followed by the crawl collector')
+    scan.add_argument('-s', '--subdomains', action='store_true', help='enumerate subdomains of every target, then scan each one found with the same collectors')
+    scan.add_argument('--wordlist', help='labels to brute force with the subdomains collector, one per line (default: a built-in list)')
+    add_profile_arguments(scan)
+    add_metrics_arguments(scan)
+    add_parse_arguments(scan)
+
+    commands.add_parser('collectors', help='list the collectors and mode presets')
+
+    pivot = commands.add_parser('pivot', help='list the stored domains that share a value')
+    pivot.add_argument('kind', choices=KINDS, help='what the value is')
+    pivot.add_argument('value', help='e.g. an ip, AS8075, ns1.example.com, a certificate serial')
+    pivot.add_argument('--store', help='result store (default: $MAGICEYE_STORE or results.sqlite in the cache directory)')
+    pivot.add_argument('--limit', type=int, default=100, help='maximum number of domains (default: 100)')
+
+    related = commands.add_parser('related', help="list the stored domains sharing any pivot value with a domain's latest scan")
+    related.add_argument('domain')
+    related.add_argument('--store', help='result store (default: $MAGICEYE_STORE or results.sqlite in the cache directory)')
+    related.add_argument('--kinds', help=f"comma separated pivots to follow (default: {','.join(KINDS)})")
+    related.add_argument('--limit', type=int, default=100, help='maximum number of domains per value (default: 100)')
+
+    ingest = commands.add_parser('ingest', help='add .jsonl result files (scan -o) to the result store')
+    ingest.add_argument('files', nargs='+')
+    ingest.add_argument('--store', help='result store (default: $MAGICEYE_STORE or results.sqlite in the cache directory)')
+
+    archive = commands.add_parser('archive', help="convert the tools' database/ json and csv files to parquet and query them")
+    archive_commands = archive.add_subparsers(dest='archive_command', required=True)
+    archive_import = archive_commands.add_parser('import', help='parse archive files in parallel into one parquet file')
+    archive_import.add_argument('paths', nargs='+', help='archive files or directories (searched recursively)')
+    archive_import.add_argument('-o', '--output', required=True, help='parquet file to write')
+    archive_import.add_argument('-j', '--jobs', type=int, help='parser processes (default: one per cpu)')
+    archive_query = archive_commands.add_parser('query', help='stream the rows of an imported archive that match every --where')
+    archive_query.add_argument('archive', help='parquet file (or directory of them) written by archive import')
+    archive_query.add_argument('--where', action='append', help="column=value, e.g. ip=1.2.3.4, nameserver=ns1.example.net, mode=hazard (repeatable)")
+    archive_query.add_argument('--columns', help='comma separated columns to print (default: mode,domain,scan_date,source)')
+    archive_query.add_argument('--limit', type=int, help='stop after this many rows')
+    archive_query.add_argument('--count', action='store_true', help='print the number of matching rows only')
+    return parser
+
+
+def run_scan(parser, args):
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if not args.targets and not args.input:
+        parser.error('give at least one target or --input')
+    if args.parse_workers < 0:
+        parser.error('--parse-workers must be 0 or more')
+
+    collectors = [name.strip() for name in args.collectors.split(',') if name.strip()] if args.collectors else None
+    if args.subdomains:
+        collectors = list(collectors or MODES[args.mode or DEFAULT_MODE]['collectors'])
+        if 'subdomains' not in collectors:
+            collectors.append('subdomains')
+    options = {
+        'stage_timeout': args.stage_timeout,
+        'deadline': args.deadline,
+        'incremental': args.incremental,
+        'ports': args.ports,
+        'max_pages': args.max_pages,
+        'max_depth': args.max_depth,
+        'wordlist': args.wordlist
+    }
+    try:
+        timing.configure(args.profile, args.profile_dir)
+        parsing.configure(args.parse_workers)
+        scanner = Scanner(mode=args.mode, collectors=collectors, **options)
+        # discovered names get the same collectors, without enumerating again
+        sub_scanner = None
+        if args.subdomains:
+            sub_scanner = Scanner(mode=args.mode, collectors=[name for name in collectors if name != 'subdomains'], **options)
+        sink = open_sink(args.output, args.batch_size)
+        stop_metrics = start_metrics(args)
+    except (ValueError, ImportError, OSError) as e:
+        parser.error(str(e))
+
+    label = args.mode or (','.join(collectors) if collectors else DEFAULT_MODE)
+    state = None
+    if args.incremental:
+        from magiceye.incremental import get_state
+        state = get_state()
+
+    scanned = set()
+    discovered = {}
+    lock = threading.Lock()
+
+    def scan_target(target, scanner=scanner):
+        results = scanner.scan(target)
+        domain = results['metadata']['domain']
+        diff = state.diff(f"scan:{label}", domain, results) if state is not None else None
+        sink.write(result_record(label, target, domain, results, diff), results)
+        with lock:
+            scanned.add(domain)
+            for found in results.get('dns_info', {}).get('subdomains', {}).get('found', []):
+                discovered.setdefault(found['name'], None)
+        return all(stage['status'] == 'ok' for stage in results['metadata']['stages'].values())
+
+    targets = itertools.chain(args.targets, read_targets(args.input) if args.input else ())
+    summaries = []
+    try:
+        summaries.append(run_batch(targets, scan_target, workers=args.workers))
+        names = [name for name in discovered if name not in scanned]
+        if names:
+            print(f"[+] {len(names)} subdomain(s) found, scanning them...", file=sys.stderr)
+            summaries.append(run_batch(names, functools.partial(scan_target, scanner=sub_scanner), workers=args.workers))
+    finally:
+        sink.close()
+        stop_metrics()
+        parsing.shutdown()
+    # stdout may carry the results, everything for humans goes to stderr
+    for summary in summaries:
+        display_summary(summary, file=sys.stderr)
+    return 0 if all(summary['failed'] == 0 for summary in summaries) else 1
+
+
+def list_collectors():
+    print('Collectors:')
+    for name, module in COLLECTORS.items():
+        print(f"  {name:<8} {module}")
+    print('Modes:')
+    for name, mode in MODES.items():
+        print(f"  {name:<8} {', '.join(mode['collectors'])}")
+    return 0
+
+
+def run_pivot(args):
+    with ResultStore(args.store) as store:
+        rows = store.pivot(args.kind, args.value, args.limit)
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+    print(f"[+] {len(rows)} domain(s)", file=sys.stderr)
+    return 0 if rows else 1
+
+
+def run_related(parser, args):
+    kinds = [kind.strip() for kind in args.kinds.split(',') if kind.strip()] if args.kinds else KINDS
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown:
+        parser.error(f"unknown pivot(s): {', '.join(unknown)}")
+    with ResultStore(args.store) as store:
+        related = store.related(args.domain, kinds, args.limit)
+    print(json.dumps(related, ensure_ascii=False, indent=2))
+    return 0 if related else 1
+
+
+def ingest_files(args):
+    # a file is skipped when it was ingested before, so re-running is harmless
+    with ResultStore(args.store) as store:
+        for path in args.files:
+            source = os.path.abspath(path)
+            if store.has_source(source):
+                print(f"[*] {path}: already ingested", file=sys.stderr)
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            except (OSError, ValueError) as e:
+                print(f"[-] {path}: {e}", file=sys.stderr)
+                continue
+            store.add_many(records, source=source)
+            print(f"[+] {path}: {len(records)} record(s)", file=sys.stderr)
+        stats = store.stats()
+    print(f"[+] {store.path}: {stats['scans']} scan(s) of {stats['domains']} domain(s)", file=sys.stderr)
+    return 0
+
+
+def run_archive(parser, args):
+    from magiceye.archive import import_archive, query_archive
+
+    if args.archive_command == 'import':
+        if args.jobs is not None and args.jobs < 1:
+            parser.error('--jobs must be at least 1')
+        started = time.perf_counter()
+        try:
+            summary = import_archive(args.paths, args.output, workers=args.jobs)
+        except ImportError as e:
+            parser.error(str(e))
+        elapsed = time.perf_counter() - started
+        for error in summary['errors']:
+            print(f"[-] {error['source']}: {error['error']}", file=sys.stderr)
+        print(f"[+] {summary['rows']} of {summary['files']} file(s) written to {args.output} in {elapsed:.1f}s", file=sys.stderr)
+        return 0 if not summary['errors'] else 1
+
+    columns = [column.strip() for column in args.columns.split(',') if column.strip()] if args.columns else None
+    try:
+        rows = query_archive(args.archive, args.where, columns, args.limit)
+        matched = 0
+        for row in rows:
+            matched += 1
+            if not args.count:
+                print(json.dumps(row, ensure_ascii=False))
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+    if args.count:
+        print(matched)
+    return 0 if matched else 1
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'collectors':
+        return list_collectors()
+    if args.command == 'pivot':
+        return run_pivot(args)
+    if args.command == 'related':
+        return run_related(parser, args)
+    if args.command == 'ingest':
+        return ingest_files(args)
+    if args.command == 'archive':
+        return run_archive(parser, args)
+    return run_scan(parser, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
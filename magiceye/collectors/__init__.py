@@ -0,0 +1,26 @@
+import importlib
+
+# collector name -> module; a module is only imported when its collector is
+# selected, so e.g. a dns-only sweep never loads the HTTP or WHOIS code.
+# Every module defines SECTION (the results section it fills), DEPENDS_ON and
+# collect(ctx) returning a dict that is merged into that section; an optional
+# AFTER names collectors that, when selected, must finish first (any outcome).
+# magiceye.aio runs collect_async(ctx) where a module has one, its blocking
+# collect in a thread pool otherwise
+COLLECTORS = {
+    'whois': 'magiceye.collectors.registration',
+    'dns': 'magiceye.collectors.records',
+    'ip': 'magiceye.collectors.addresses',
+    'web': 'magiceye.collectors.website',
+    'crawl': 'magiceye.collectors.crawl',
+    'tls': 'magiceye.collectors.certificate',
+    'ports': 'magiceye.collectors.ports',
+    'ping': 'magiceye.collectors.ping',
+    'subdomains': 'magiceye.collectors.subdomains'
+}
+
+
+def load_collector(name):
+    if name not in COLLECTORS:
+        raise ValueError(f"Unknown collector '{name}' (available: {', '.join(COLLECTORS)})")
+    return importlib.import_module(COLLECTORS[name])
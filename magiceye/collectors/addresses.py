@@ -0,0 +1,23 @@
+SECTION = 'ip_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    addresses = ctx.dns.addresses_sync(ctx.domain)
+    lookups = ctx.geo.lookup(addresses)
+    return {
+        'ip_addresses': addresses,
+        'geolocation': [dict(lookups[ip], ip=ip) for ip in addresses],
+        'reverse_dns': ctx.dns.reverse_sync(addresses[0]) if addresses else None
+    }
+
+
+async def collect_async(ctx):
+    addresses = await ctx.dns.addresses(ctx.domain)
+    # the locator batches lookups across threads, it has no async interface
+    lookups = await ctx.run_blocking(ctx.geo.lookup, addresses)
+    return {
+        'ip_addresses': addresses,
+        'geolocation': [dict(lookups[ip], ip=ip) for ip in addresses],
+        'reverse_dns': await ctx.dns.reverse(addresses[0]) if addresses else None
+    }
@@ -0,0 +1,23 @@
+from magiceye.incremental import tls_ttl
+from magiceye.tls import TLS_PORTS, check_tls_info, get_tls_info, probe_tls
+
+SECTION = 'ssl_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    def load():
+        return get_tls_info(ctx.domain, ctx.dns.addresses_sync(ctx.domain), ctx.options.get('tls_ports', TLS_PORTS))
+
+    # incremental scans reuse the certificates for a day (never past their expiry)
+    if ctx.state is not None:
+        return ctx.state.fetch('tls', ctx.domain.lower(), load, tls_ttl)[0]
+    return load()
+
+
+async def collect_async(ctx):
+    # the scan state is synchronous, incremental scans take the blocking path
+    if ctx.state is not None:
+        return await ctx.run_blocking(collect, ctx)
+    addresses = await ctx.dns.addresses(ctx.domain)
+    return check_tls_info(await probe_tls(ctx.domain, addresses, ctx.options.get('tls_ports', TLS_PORTS)))
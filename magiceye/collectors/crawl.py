@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from magiceye.crawler import Crawler
+from magiceye.sinks import JsonlSink
+
+SECTION = 'web_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    # pages stream to a jsonl file next to the results, only the summary is returned
+    output = ctx.options.get('crawl_output') or f"osint_crawl_{ctx.domain}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    crawler = Crawler(
+        http=ctx.http,
+        max_pages=ctx.options.get('max_pages', 100),
+        max_depth=ctx.options.get('max_depth', 2),
+        delay=ctx.options.get('crawl_delay', 1.0)
+    )
+    with JsonlSink(output, mode='w') as sink:
+        summary = crawler.crawl(ctx.url, sink)
+    summary['output'] = output
+    return {'crawl': summary}
@@ -0,0 +1,14 @@
+from magiceye.latency import TCP_PORTS, probe_latency
+from magiceye.scheduler import run_async
+
+SECTION = 'network_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    return run_async(collect_async(ctx))
+
+
+async def collect_async(ctx):
+    ip = (await ctx.dns.addresses(ctx.domain))[0]
+    return {'ping_test': await probe_latency(ip, probes=ctx.options.get('ping_count', 4), ports=ctx.options.get('ping_ports', TCP_PORTS))}
@@ -0,0 +1,18 @@
+from magiceye.ports import COMMON_PORTS, parse_ports, scan_ports
+from magiceye.scheduler import run_async
+
+SECTION = 'network_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    return run_async(collect_async(ctx))
+
+
+async def collect_async(ctx):
+    ports = parse_ports(ctx.options['ports']) if ctx.options.get('ports') else COMMON_PORTS
+    ip = (await ctx.dns.addresses(ctx.domain))[0]
+    open_ports, scan_info = await scan_ports(
+        ip, ports, ctx.options.get('port_concurrency', 100), ctx.options.get('port_timeout', 1)
+    )
+    return {'open_ports': open_ports, 'port_scan': scan_info}
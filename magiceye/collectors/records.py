@@ -0,0 +1,16 @@
+SECTION = 'dns_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    record_types = ctx.options.get('record_types')
+    if record_types:
+        return ctx.dns.resolve_sync(ctx.domain, tuple(record_types))
+    return ctx.dns.resolve_sync(ctx.domain)
+
+
+async def collect_async(ctx):
+    record_types = ctx.options.get('record_types')
+    if record_types:
+        return await ctx.dns.resolve(ctx.domain, tuple(record_types))
+    return await ctx.dns.resolve(ctx.domain)
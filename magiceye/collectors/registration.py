@@ -0,0 +1,11 @@
+from magiceye.whois_cache import python_whois_lookup
+
+SECTION = 'domain_info'
+DEPENDS_ON = ()
+
+
+def collect(ctx):
+    data, cached = ctx.whois_cache.fetch('python-whois', ctx.domain, python_whois_lookup)
+    if data is None:
+        raise LookupError(f"No WHOIS data for {ctx.domain}")
+    return dict(data, cached=cached)
@@ -0,0 +1,27 @@
+from magiceye.domains import is_ip, registrable_domain
+from magiceye.scheduler import run_async
+from magiceye.subdomains import DEFAULT_WORDLIST, SubdomainEnumerator, load_wordlist, names_from_certificates, names_from_links
+
+SECTION = 'dns_info'
+DEPENDS_ON = ()
+# when selected too, tls and web run first and their SANs and links become candidates
+AFTER = ('tls', 'web')
+
+
+def collect(ctx):
+    return run_async(collect_async(ctx))
+
+
+async def collect_async(ctx):
+    if is_ip(ctx.domain):
+        return {}
+    domain = registrable_domain(ctx.domain)
+    passive = {}
+    for name in names_from_certificates(ctx.results.get('ssl_info'), domain):
+        passive.setdefault(name, []).append('certificate')
+    for name in names_from_links(ctx.results.get('web_info', {}).get('links'), domain):
+        passive.setdefault(name, []).append('links')
+
+    wordlist = load_wordlist(ctx.options['wordlist']) if ctx.options.get('wordlist') else DEFAULT_WORDLIST
+    enumerator = SubdomainEnumerator(concurrency=ctx.options.get('subdomain_concurrency', 500))
+    return {'subdomains': await enumerator.enumerate(domain, passive, wordlist)}
@@ -0,0 +1,30 @@
+from magiceye.crawler import page_record
+from magiceye.web import MAX_PAGE_BYTES, fetch_page
+
+SECTION = 'web_info'
+DEPENDS_ON = ()
+
+SECURITY_HEADERS = (
+    'Strict-Transport-Security', 'Content-Security-Policy', 'X-Frame-Options', 'X-Content-Type-Options',
+    'X-XSS-Protection', 'Referrer-Policy', 'Permissions-Policy', 'Access-Control-Allow-Origin'
+)
+
+
+def collect(ctx):
+    fields = ctx.options.get('web_fields') or ('title', 'meta_tags', 'headings', 'links', 'images', 'emails')
+    max_bytes = ctx.options.get('max_page_bytes', MAX_PAGE_BYTES)
+    if ctx.state is not None:
+        response = ctx.state.fetch_page(ctx.http, ctx.url, max_bytes=max_bytes, fields=fields)
+    else:
+        response = fetch_page(ctx.http, ctx.url, max_bytes=max_bytes, fields=fields)
+
+    info = {'url': response.url, 'status_code': response.status_code}
+    info.update(page_record(response.data))
+    info['server'] = response.headers.get('Server')
+    info['content_type'] = response.headers.get('Content-Type')
+    info['security_headers'] = {name: response.headers.get(name) for name in SECURITY_HEADERS}
+    if response.truncated:
+        info['truncated'] = True
+    if response.cache_status:
+        info['cache_status'] = response.cache_status
+    return info
@@ -0,0 +1,194 @@
+import collections
+import concurrent.futures
+import contextvars
+import hashlib
+import threading
+import time
+from urllib.parse import urldefrag, urljoin, urlsplit, urlunsplit
+
+from magiceye.domains import registrable_domain
+from magiceye.extract import FIELDS
+from magiceye.http_client import get_client
+from magiceye.scheduler import stage_cancelled
+from magiceye.web import MAX_PAGE_BYTES, fetch_page
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url, base=None):
+    # absolute http(s) url without fragment, default port or empty path; None otherwise
+    if base:
+        url = urljoin(base, url.strip())
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower().rstrip('.')
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def _digest(url):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+
+class SeenSet:
+    # exact dedup that stores 16 byte digests instead of the urls themselves
+    def __init__(self):
+        self._digests = set()
+
+    def add(self, url):
+        digest = _digest(url)
+        if digest in self._digests:
+            return False
+        self._digests.add(digest)
+        return True
+
+    def __len__(self):
+        return len(self._digests)
+
+
+class HostThrottle:
+    # hands out per-host request slots at least delay seconds apart
+    def __init__(self, delay):
+        self.delay = delay
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if self.delay <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Crawler:
+    def __init__(self, http=None, max_pages=100, max_depth=2, workers=4, delay=1.0,
+                 max_page_bytes=MAX_PAGE_BYTES, fields=FIELDS, include_subdomains=False, seen=None):
+        self.http = http or get_client()
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.workers = workers
+        self.max_page_bytes = max_page_bytes
+        self.fields = tuple(fields) if 'links' in fields else tuple(fields) + ('links',)
+        self.include_subdomains = include_subdomains
+        self.seen = seen if seen is not None else SeenSet()
+        self.throttle = HostThrottle(delay)
+
+    def in_scope(self, url, start_hosts):
+        # start_hosts: the start url's host and the one its first page redirected to
+        host = urlsplit(url).hostname
+        if host in start_hosts:
+            return True
+        return self.include_subdomains and any(registrable_domain(host) == registrable_domain(start) for start in start_hosts)
+
+    def crawl(self, start_url, sink):
+        # pages are written to sink as they complete and then dropped, so memory
+        # depends on the frontier (bounded by max_pages), not on page bodies
+        start_url = normalize_url(start_url)
+        if start_url is None:
+            raise ValueError("Start url must be an absolute http(s) url")
+        start_hosts = {urlsplit(start_url).hostname}
+
+        frontier = collections.deque([(start_url, 0)])
+        self.seen.add(start_url)
+        scheduled = 0
+        summary = {'start_url': start_url, 'pages': 0, 'errors': 0, 'max_depth_reached': 0}
+        started = time.perf_counter()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            in_flight = {}
+            while frontier or in_flight:
+                # the scan stage timed out: finish the pages in flight, fetch no more
+                if stage_cancelled():
+                    frontier.clear()
+                while frontier and len(in_flight) < self.workers:
+                    url, depth = frontier.popleft()
+                    # workers count their requests and bytes into the caller's timing span
+                    in_flight[executor.submit(contextvars.copy_context().run, self._fetch, url, depth)] = (url, depth)
+                    scheduled += 1
+
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    record, links = future.result()
+                    # links are relative to the page that was served, after redirects
+                    base = record.get('final_url', url)
+                    if 'final_url' in record:
+                        final = normalize_url(base)
+                        if final is not None:
+                            self.seen.add(final)
+                            if depth == 0:
+                                # http -> https or www redirects keep the crawl in scope
+                                start_hosts.add(urlsplit(final).hostname)
+                    sink.write(record)
+                    summary['pages'] += 1
+                    summary['errors'] += 'error' in record
+                    summary['max_depth_reached'] = max(summary['max_depth_reached'], depth)
+
+                    if depth >= self.max_depth:
+                        continue
+                    for link in links:
+                        if scheduled + len(frontier) >= self.max_pages:
+                            break
+                        link = normalize_url(link, base=base)
+                        if link and self.in_scope(link, start_hosts) and self.seen.add(link):
+                            frontier.append((link, depth + 1))
+
+        summary['duration'] = round(time.perf_counter() - started, 3)
+        summary['pages_per_sec'] = round(summary['pages'] / summary['duration'], 3) if summary['duration'] else None
+        return summary
+
+    def _fetch(self, url, depth):
+        self.throttle.wait(urlsplit(url).hostname)
+        record = {'url': url, 'depth': depth}
+        try:
+            response = fetch_page(self.http, url, max_bytes=self.max_page_bytes, fields=self.fields, html_only=True)
+        except Exception as e:
+            record['error'] = str(e)
+            return record, []
+
+        record['status_code'] = response.status_code
+        record['content_type'] = response.headers.get('Content-Type')
+        if response.url != url:
+            record['final_url'] = response.url
+        if response.truncated:
+            record['truncated'] = True
+        if response.data is None:
+            return record, []
+
+        page = response.data
+        record.update(page_record(page))
+        return record, [link['href'] for link in page['links']]
+
+
+def page_record(page):
+    # same shape as the single page web_info of the hunter scan
+    record = {}
+    if 'title' in page:
+        record['title'] = page['title']
+    if 'meta_tags' in page:
+        record['meta_description'] = page['meta_tags'].get('description')
+        record['meta_keywords'] = page['meta_tags'].get('keywords')
+    if 'headings' in page:
+        record['headers'] = {
+            'h1': [text.strip() for tag, text in page['headings'] if tag == 'h1'],
+            'h2': [text.strip() for tag, text in page['headings'] if tag == 'h2']
+        }
+    if 'links' in page:
+        record['links'] = [{'text': link['text'].strip(), 'href': link['href']} for link in page['links']]
+    if 'images' in page:
+        record['images'] = page['images']
+    if 'emails' in page:
+        record['emails'] = page['emails']
+    return record
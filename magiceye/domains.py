@@ -0,0 +1,42 @@
+import ipaddress
+
+# second level labels under country codes that are not registrable on their own
+MULTI_LABEL_SUFFIXES = {
+    'co.id', 'or.id', 'ac.id', 'go.id', 'web.id', 'my.id', 'sch.id', 'net.id', 'biz.id',
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'co.kr', 'or.kr',
+    'com.br', 'com.cn', 'net.cn', 'org.cn', 'com.hk', 'com.tw', 'com.sg', 'com.my',
+    'co.in', 'co.nz', 'co.za', 'com.mx', 'com.tr', 'com.ar', 'com.ph', 'com.vn'
+}
+
+
+def is_ip(value):
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def strip_port(host):
+    # 'example.com:8080' -> 'example.com', '[::1]:443' -> '::1'; bare IPv6 is kept
+    host = host.strip()
+    if host.startswith('['):
+        return host[1:].split(']', 1)[0]
+    if host.count(':') == 1:
+        return host.split(':', 1)[0]
+    return host
+
+
+def registrable_domain(host):
+    host = host.strip().lower().rstrip('.')
+    if not host or is_ip(host):
+        return host
+
+    labels = host.split('.')
+    if len(labels) <= 2:
+        return host
+    if '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
@@ -0,0 +1,363 @@
+import argparse
+import codecs
+import functools
+import importlib.util
+import os
+import re
+import time
+from html.parser import HTMLParser
+
+# lxml is only imported once an extractor uses it, so the tools do not load it
+# at startup; find_spec tells whether it is there without importing it
+LXML = importlib.util.find_spec('lxml') is not None
+DEFAULT_PARSER = 'lxml' if LXML else 'html.parser'
+etree = None
+
+FIELDS = ('title', 'meta_tags', 'headings', 'links', 'images', 'emails')
+HEAD_FIELDS = frozenset(['title', 'meta_tags'])
+HEADING_TAGS = ('h1', 'h2', 'h3')
+
+EMAIL_PATTERN = re.compile(rb'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+EMAIL_DELIMITERS = (b' ', b'\n', b'<', b'>', b'"', b"'")
+MAX_EMAIL_CARRY = 512
+
+
+class EmailScanner:
+    # scans raw bytes chunk by chunk; the text after the last delimiter is kept
+    # back so an address split across two chunks is still matched whole
+    def __init__(self):
+        self.emails = {}
+        self._carry = b''
+
+    def feed(self, chunk):
+        data = self._carry + chunk
+        cut = max(data.rfind(delimiter) for delimiter in EMAIL_DELIMITERS) + 1
+        if len(data) - cut > MAX_EMAIL_CARRY:
+            cut = len(data)
+        self._scan(data[:cut])
+        self._carry = data[cut:]
+
+    def close(self):
+        self._scan(self._carry)
+        self._carry = b''
+        return list(self.emails)
+
+    def _scan(self, data):
+        for match in EMAIL_PATTERN.findall(data):
+            self.emails.setdefault(match.decode('ascii'), None)
+
+
+def _start_title(collector, tag, attrs):
+    if collector.result['title'] is None and not collector.is_capturing('title'):
+        collector.capture(tag, collector.set_title)
+
+
+def _start_meta(collector, tag, attrs):
+    key = attrs.get('name') or attrs.get('property')
+    content = attrs.get('content')
+    if key and content:
+        collector.result['meta_tags'].setdefault(key, content)
+
+
+def _start_heading(collector, tag, attrs):
+    headings = collector.result['headings']
+    collector.capture(tag, lambda text: headings.append((tag, text)))
+
+
+def _start_link(collector, tag, attrs):
+    href = attrs.get('href')
+    if href is None:
+        return
+    # nested anchors are not valid html, the open one ends here
+    collector.end('a')
+    links = collector.result['links']
+    collector.capture(tag, lambda text: links.append({'text': text, 'href': href}))
+
+
+def _start_image(collector, tag, attrs):
+    collector.result['images'].append({'src': attrs.get('src'), 'alt': attrs.get('alt')})
+
+
+def _start_body(collector, tag, attrs):
+    collector.done = True
+
+
+def _load_lxml():
+    global etree
+    if etree is None:
+        from lxml import etree
+
+
+class _Collector:
+    # parser target: gets start/end/data events and fills the requested fields
+    def __init__(self, extractor):
+        self.handlers = extractor.handlers
+        self.head_only = extractor.head_only
+        self.result = {field: factory() for field, factory in extractor.defaults.items()}
+        self.done = False
+        self._captures = []
+
+    def is_capturing(self, tag):
+        return any(capture[0] == tag for capture in self._captures)
+
+    def capture(self, tag, finish):
+        self._captures.append((tag, [], finish))
+
+    def set_title(self, text):
+        self.result['title'] = text
+
+    def start(self, tag, attrs):
+        handler = self.handlers.get(tag)
+        if handler is not None:
+            handler(self, tag, attrs)
+
+    def end(self, tag):
+        if self.head_only and tag == 'head':
+            self.done = True
+        # close the matching capture along with anything left open inside it
+        for index in range(len(self._captures) - 1, -1, -1):
+            if self._captures[index][0] == tag:
+                for _, parts, finish in reversed(self._captures[index:]):
+                    finish(''.join(parts))
+                del self._captures[index:]
+                break
+
+    def data(self, text):
+        for _, parts, _ in self._captures:
+            parts.append(text)
+
+    def close(self):
+        for _, parts, finish in reversed(self._captures):
+            finish(''.join(parts))
+        self._captures = []
+        return self.result
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, dict(attrs))
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+class ExtractionSession:
+    # incremental extraction: feed() raw chunks as they arrive, close() for the result
+    def __init__(self, extractor, encoding=None):
+        self.extractor = extractor
+        self.encoding = encoding
+        self.collector = _Collector(extractor)
+        self.emails = EmailScanner() if 'emails' in extractor.fields else None
+        self._decoder = None
+        if extractor.parser == 'lxml':
+            self._parser = etree.HTMLParser(target=self.collector, encoding=encoding)
+        else:
+            self._parser = _StdlibParser(self.collector)
+
+    @property
+    def done(self):
+        return self.collector.done
+
+    def feed(self, chunk):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+            self.encoding = self.encoding or 'utf-8'
+        if self.emails is not None:
+            self.emails.feed(chunk)
+        if self.collector.done:
+            return True
+
+        if self.extractor.parser == 'lxml':
+            self._parser.feed(chunk)
+        else:
+            if self._decoder is None:
+                self._decoder = self._make_decoder(chunk)
+            self._parser.feed(self._decoder.decode(chunk))
+        return self.collector.done
+
+    def _make_decoder(self, chunk):
+        encoding = self.encoding
+        if encoding is None:
+            match = META_CHARSET_PATTERN.search(chunk[:4096])
+            encoding = match.group(1).decode('ascii') if match else 'utf-8'
+        try:
+            return codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def close(self):
+        if self.extractor.parser == 'lxml':
+            try:
+                self._parser.close()
+            except etree.LxmlError:
+                pass
+        else:
+            if self._decoder is not None:
+                self._parser.feed(self._decoder.decode(b'', final=True))
+            self._parser.close()
+
+        result = self.collector.close()
+        if self.emails is not None:
+            result['emails'] = self.emails.close()
+        return result
+
+
+class Extractor:
+    # the requested fields are compiled once into a tag -> handler table, so
+    # parsing a page is a single event stream with a dict lookup per tag
+    def __init__(self, fields=FIELDS, parser=None):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown extraction field(s): {', '.join(sorted(unknown))}")
+        parser = parser or DEFAULT_PARSER
+        if parser == 'lxml':
+            if not LXML:
+                raise ValueError("The lxml parser is not installed")
+            _load_lxml()
+
+        self.fields = frozenset(fields)
+        self.parser = parser
+        self.head_only = self.fields <= HEAD_FIELDS
+
+        self.handlers = {}
+        self.defaults = {}
+        if 'title' in self.fields:
+            self.handlers['title'] = _start_title
+            self.defaults['title'] = lambda: None
+        if 'meta_tags' in self.fields:
+            self.handlers['meta'] = _start_meta
+            self.defaults['meta_tags'] = dict
+        if 'headings' in self.fields:
+            for tag in HEADING_TAGS:
+                self.handlers[tag] = _start_heading
+            self.defaults['headings'] = list
+        if 'links' in self.fields:
+            self.handlers['a'] = _start_link
+            self.defaults['links'] = list
+        if 'images' in self.fields:
+            self.handlers['img'] = _start_image
+            self.defaults['images'] = list
+        if self.head_only:
+            self.handlers['body'] = _start_body
+
+    def session(self, encoding=None):
+        return ExtractionSession(self, encoding)
+
+    def extract(self, body, encoding=None):
+        session = self.session(encoding)
+        session.feed(body)
+        return session.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_extractor(fields=FIELDS):
+    return Extractor(fields)
+
+
+def extract_page(body, encoding=None, fields=FIELDS):
+    return get_extractor(tuple(fields)).extract(body, encoding)
+
+
+def extract_emails(body):
+    if isinstance(body, str):
+        body = body.encode('utf-8', errors='ignore')
+    scanner = EmailScanner()
+    scanner.feed(body)
+    return scanner.close()
+
+
+def _soup_extract(body):
+    # the BeautifulSoup walk the tools did before the extractor (a find per meta
+    # field, a find_all per tag, the email regex over the whole text); the
+    # baseline of benchmark()
+    from bs4 import BeautifulSoup
+    text = body.decode('utf-8', errors='replace')
+    soup = BeautifulSoup(text, 'html.parser')
+    return {
+        'title': soup.title.string if soup.title else None,
+        'meta_description': soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else None,
+        'meta_keywords': soup.find('meta', {'name': 'keywords'})['content'] if soup.find('meta', {'name': 'keywords'}) else None,
+        'headers': {
+            'h1': [h1.text.strip() for h1 in soup.find_all('h1')],
+            'h2': [h2.text.strip() for h2 in soup.find_all('h2')]
+        },
+        'links': [{'text': a.text.strip(), 'href': a.get('href')} for a in soup.find_all('a', href=True)],
+        'images': [{'src': img.get('src'), 'alt': img.get('alt')} for img in soup.find_all('img')],
+        'emails': list(set(re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)))
+    }
+
+
+def _cpu_per_page(func, body, repeat):
+    # one untimed run first, so imports and caches are not counted
+    func(body)
+    started = time.process_time()
+    for _ in range(repeat):
+        func(body)
+    return (time.process_time() - started) / repeat
+
+
+def benchmark(pages, repeat=20):
+    # cpu ms per page for every (name, body) in pages: the old soup walk when
+    # bs4 is installed, then the extractor with each available parser
+    parsers = ['html.parser'] + (['lxml'] if LXML else [])
+    soup = importlib.util.find_spec('bs4') is not None
+
+    results = []
+    for name, body in pages:
+        result = {'page': name, 'kb': round(len(body) / 1024, 1)}
+        if soup:
+            result['soup'] = round(_cpu_per_page(_soup_extract, body, repeat) * 1000, 3)
+        for parser in parsers:
+            extractor = Extractor(FIELDS, parser)
+            result[parser] = round(_cpu_per_page(extractor.extract, body, repeat) * 1000, 3)
+        results.append(result)
+    return results
+
+
+def _read_pages(paths):
+    # (name, body) of every .html/.htm file in paths
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.html', '.htm')):
+                    yield from _read_pages([os.path.join(path, name)])
+            continue
+        with open(path, 'rb') as f:
+            yield os.path.basename(path), f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the cpu time per page of the extractor against the old BeautifulSoup walk')
+    parser.add_argument('pages', nargs='*', help='saved html files or directories of them (default: a generated page with 400 links)')
+    parser.add_argument('--repeat', type=int, default=20, help='extractions per page and parser (default: 20)')
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+
+    if args.pages:
+        pages = list(_read_pages(args.pages))
+    else:
+        from magiceye.parsing import sample_page
+        pages = [('generated', sample_page())]
+    if not pages:
+        parser.error('no html files found')
+
+    results = benchmark(pages, args.repeat)
+    columns = [column for column in ('soup', 'html.parser', 'lxml') if column in results[0]]
+    print(f"cpu ms per page, {args.repeat} runs each")
+    print(f"{'Page':<30} {'KB':>7} " + ' '.join(f"{column:>11}" for column in columns))
+    for result in results:
+        print(f"{result['page'][:30]:<30} {result['kb']:>7} " + ' '.join(f"{result[column]:>11}" for column in columns))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
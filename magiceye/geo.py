@@ -0,0 +1,137 @@
+import concurrent.futures
+import itertools
+import threading
+import time
+
+from magiceye.cache import SqliteTTLCache, cache_path
+from magiceye.http_client import get_client
+from magiceye.ratelimit import TokenBucket
+from magiceye.timing import count
+
+IP_API_FIELDS = 'status,message,country,countryCode,region,regionName,city,zip,lat,lon,timezone,isp,org,as,asname,query'
+
+# free tier limits: ip-api allows 15 batch requests and 45 single lookups a
+# minute, each counted on its own; ipapi.co only has single lookups, roughly one a second
+PROVIDERS = {
+    'ip-api': {'base_url': 'http://ip-api.com', 'batch_size': 100, 'rate': 15 / 60, 'burst': 15, 'single_rate': 45 / 60, 'single_burst': 45},
+    'ipapi.co': {'base_url': 'https://ipapi.co', 'batch_size': 1, 'rate': 1, 'burst': 1, 'single_rate': 1, 'single_burst': 1}
+}
+
+
+class GeoLocator:
+    # lookups from concurrent callers are deduplicated and coalesced into provider
+    # batch requests; successful answers are kept in an on-disk TTL cache
+    def __init__(self, provider='ip-api', http=None, cache=None, base_url=None,
+                 batch_size=None, rate=None, burst=None, single_rate=None, single_burst=None, linger=0.05):
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown geolocation provider: {provider}")
+        settings = PROVIDERS[provider]
+        self.provider = provider
+        self.http = http or get_client()
+        self.cache = cache
+        self.base_url = (base_url or settings['base_url']).rstrip('/')
+        self.batch_size = batch_size or settings['batch_size']
+        # batch requests and single lookups have separate budgets, so a one-off
+        # lookup does not wait behind the batch limit
+        self.limiter = TokenBucket(rate or settings['rate'], burst or settings['burst'])
+        self.single_limiter = TokenBucket(single_rate or settings['single_rate'], single_burst or settings['single_burst'])
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._in_flight = {}
+        self._flushing = False
+
+    def lookup_one(self, ip):
+        return self.lookup([ip])[ip]
+
+    def lookup(self, ips):
+        results = {}
+        waiting = {}
+        leader = False
+
+        with self._lock:
+            for ip in dict.fromkeys(ips):
+                cached = self.cache.get(self.provider, ip) if self.cache else None
+                if cached is not None:
+                    count('geo_cache_hits')
+                    results[ip] = cached
+                    continue
+                count('geo_lookups')
+                future = self._pending.get(ip) or self._in_flight.get(ip)
+                if future is None:
+                    future = concurrent.futures.Future()
+                    self._pending[ip] = future
+                waiting[ip] = future
+            if self._pending and not self._flushing:
+                self._flushing = True
+                leader = True
+
+        # the first caller with new misses sends the batches for everyone
+        if leader:
+            self._flush()
+
+        for ip, future in waiting.items():
+            results[ip] = future.result()
+        return results
+
+    def _flush(self):
+        if self.linger:
+            time.sleep(self.linger)
+
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._flushing = False
+                    return
+                chunk = dict(itertools.islice(self._pending.items(), self.batch_size))
+                for ip in chunk:
+                    self._in_flight[ip] = self._pending.pop(ip)
+
+            try:
+                records = self._fetch(list(chunk))
+            except Exception as e:
+                records = {ip: {'error': str(e)} for ip in chunk}
+
+            for ip, future in chunk.items():
+                record = records.get(ip) or {'error': 'No data returned'}
+                if self.cache and self._is_success(record):
+                    self.cache.set(self.provider, ip, record)
+                with self._lock:
+                    self._in_flight.pop(ip, None)
+                future.set_result(record)
+
+    def _fetch(self, ips):
+        (self.limiter if len(ips) > 1 else self.single_limiter).acquire()
+
+        if self.provider == 'ip-api':
+            if len(ips) == 1:
+                response = self.http.get(f"{self.base_url}/json/{ips[0]}", params={'fields': IP_API_FIELDS})
+                response.raise_for_status()
+                return {ips[0]: response.json()}
+
+            response = self.http.post(f"{self.base_url}/batch", params={'fields': IP_API_FIELDS}, json=ips)
+            response.raise_for_status()
+            return {record.get('query'): record for record in response.json()}
+
+        response = self.http.get(f"{self.base_url}/{ips[0]}/json/")
+        response.raise_for_status()
+        return {ips[0]: response.json()}
+
+    def _is_success(self, record):
+        if 'error' in record:
+            return False
+        if self.provider == 'ip-api':
+            return record.get('status') == 'success'
+        return True
+
+
+_locators = {}
+_locators_lock = threading.Lock()
+
+
+def get_locator(provider='ip-api'):
+    # one shared locator per provider so lookups from every target are coalesced
+    with _locators_lock:
+        if provider not in _locators:
+            _locators[provider] = GeoLocator(provider, cache=SqliteTTLCache(cache_path('geo.sqlite')))
+        return _locators[provider]
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+from magiceye import metrics
+from magiceye.resolver import get_engine
+from magiceye.timing import count
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# (connect, read) seconds, used by every call that does not pass its own timeout
+DEFAULT_TIMEOUT = (5, 15)
+
+
+class _CachedDnsConnectionMixin:
+    # connect to the addresses from the shared DNS cache, in turn until one
+    # accepts; Host and SNI still use the name. Without cached addresses the
+    # connection resolves the name itself
+    def _new_conn(self):
+        name = self._dns_host
+        try:
+            addresses = get_engine().addresses_sync(name)
+        except OSError:
+            addresses = []
+        if not addresses:
+            return super()._new_conn()
+
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as e:
+                    # NewConnectionError included
+                    error = e
+            raise error
+        finally:
+            self._dns_host = name
+
+
+class CachedDnsHTTPConnection(_CachedDnsConnectionMixin, HTTPConnection):
+    pass
+
+
+class CachedDnsHTTPSConnection(_CachedDnsConnectionMixin, HTTPSConnection):
+    pass
+
+
+class CachedDnsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDnsHTTPConnection
+
+
+class CachedDnsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDnsHTTPSConnection
+
+
+class CachedDnsAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CachedDnsHTTPConnectionPool,
+            'https': CachedDnsHTTPSConnectionPool
+        }
+
+
+class HttpClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=2, backoff_factor=0.5,
+                 pool_connections=32, pool_maxsize=32, user_agent=DEFAULT_USER_AGENT, cached_dns=True):
+        self.timeout = timeout
+
+        # retry only idempotent requests on connection errors and throttling/5xx answers
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False
+        )
+        # one keep-alive pool per host, shared by every thread using this client
+        adapter_cls = CachedDnsAdapter if cached_dns else HTTPAdapter
+        adapter = adapter_cls(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = user_agent
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        count('http_requests')
+        endpoint = metrics.endpoint(url)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as e:
+            metrics.inc('magiceye_http_requests_total', endpoint=endpoint, status=type(e).__name__)
+            raise
+        metrics.inc('magiceye_http_requests_total', endpoint=endpoint, status=response.status_code)
+        metrics.observe('magiceye_http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            count('http_retries', len(retries.history))
+        # streamed bodies are counted by whoever reads them (web.fetch_page)
+        if not kwargs.get('stream'):
+            count('http_bytes', len(response.content))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def configure(**kwargs):
+    # replace the shared client, e.g. configure(timeout=(3, 10), retries=0)
+    global _default_client
+    with _default_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = HttpClient(**kwargs)
+        return _default_client
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import ssl
+import threading
+import time
+from datetime import datetime
+
+from requests.structures import CaseInsensitiveDict
+
+from magiceye.cache import SqliteTTLCache, cache_path
+from magiceye.parsing import parse_page
+from magiceye.timing import count
+from magiceye.web import MAX_PAGE_BYTES, fetch_page, response_encoding
+
+DAY = 86400
+PAGE_TTL = 30 * DAY
+TLS_TTL = DAY
+SCAN_TTL = 365 * DAY
+
+# values that differ on every run without anything changing on the target
+VOLATILE_KEYS = frozenset([
+    'metadata', 'timestamps', 'cache_status', 'ttls', 'scan_date', 'scan_duration', 'duration', 'latency_ms',
+    'port_scan', 'ping_test', 'crawl', 'pages_per_sec', 'handshake_ms', 'expires_in_days',
+    'Date', 'Age', 'Expires', 'Set-Cookie', 'X-Request-Id', 'X-Runtime', 'CF-RAY', 'Report-To', 'NEL'
+])
+
+
+def normalize(results):
+    # the shape the results have after a JSON round trip (tuples -> lists, int keys -> str)
+    return json.loads(json.dumps(results, default=str))
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def diff_results(old, new, ignore=VOLATILE_KEYS, path=''):
+    # added/removed/changed keyed by dotted path; lists are compared as sets so a
+    # reordered list is not a change
+    changes = {'added': {}, 'removed': {}, 'changed': {}}
+    _diff(old, new, ignore, path, changes)
+    return changes
+
+
+def _diff(old, new, ignore, path, changes):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() | new.keys():
+            if key in ignore:
+                continue
+            child = f"{path}.{key}" if path else key
+            if key not in new:
+                changes['removed'][child] = old[key]
+            elif key not in old:
+                changes['added'][child] = new[key]
+            else:
+                _diff(old[key], new[key], ignore, child, changes)
+    elif isinstance(old, list) and isinstance(new, list):
+        old_items = {_canonical(item): item for item in old}
+        new_items = {_canonical(item): item for item in new}
+        added = [item for key, item in new_items.items() if key not in old_items]
+        removed = [item for key, item in old_items.items() if key not in new_items]
+        if added or removed:
+            changes['changed'][path] = {'added': added, 'removed': removed}
+    elif old != new:
+        changes['changed'][path] = {'old': old, 'new': new}
+
+
+def tls_ttl(tls_info):
+    # cached certificates are never trusted past the earliest expiry among them
+    try:
+        expiries = [ssl.cert_time_to_seconds(cert['not_after']) for cert in tls_info['certificates'].values()]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return TLS_TTL
+    if not expiries:
+        return TLS_TTL
+    return max(min(TLS_TTL, min(expiries) - time.time()), 0)
+
+
+class ScanState:
+    # what earlier runs saw: validators, body hash and extraction per url, other
+    # cacheable answers (TLS) and the last results per tool and domain
+    def __init__(self, cache=None):
+        self.cache = cache or SqliteTTLCache(cache_path('state.sqlite'), default_ttl=PAGE_TTL, max_entries=500000)
+        self.pages = {'not_modified': 0, 'unchanged': 0, 'changed': 0}
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.pages)
+
+    def fetch_page(self, http, url, max_bytes=MAX_PAGE_BYTES, fields=None, **kwargs):
+        # conditional GET with the stored ETag/Last-Modified; a 304 or a body with
+        # the same hash reuses the stored extraction instead of parsing again
+        fields = list(fields or ())
+        entry = self.cache.get('page', url)
+        if entry is not None and entry['fields'] != fields:
+            entry = None
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        response = fetch_page(http, url, max_bytes=max_bytes, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            merged = CaseInsensitiveDict(entry['headers'])
+            merged.update(response.headers)
+            response.status_code = entry['status_code']
+            response.headers = merged
+            response.truncated = entry['truncated']
+            response.data = entry['data']
+            self.cache.set('page', url, entry)
+            return self._count(response, 'not_modified')
+
+        digest = hashlib.blake2b(response.body, digest_size=16).hexdigest()
+        if entry is not None and entry['hash'] == digest:
+            data, status = entry['data'], 'unchanged'
+        else:
+            data, status = normalize(parse_page(response.body, response_encoding(response.headers), fields)), 'changed'
+
+        self.cache.set('page', url, {
+            'fields': fields,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'hash': digest,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'truncated': response.truncated,
+            'data': data
+        })
+        response.body = None
+        response.data = data
+        return self._count(response, status)
+
+    def _count(self, response, status):
+        response.cache_status = status
+        count(f"pages_{status}")
+        with self._lock:
+            self.pages[status] += 1
+        return response
+
+    def fetch(self, namespace, key, loader, ttl):
+        # returns (value, hit); ttl may be a function of the loaded value
+        value = self.cache.get(namespace, key)
+        if value is not None:
+            return value, True
+        value = loader()
+        self.cache.set(namespace, key, value, ttl=ttl(value) if callable(ttl) else ttl)
+        return value, False
+
+    def diff(self, tool, domain, results):
+        # stores results as the new baseline and returns the changes since the
+        # previous scan of this domain by the same tool, or None on the first scan
+        key = f"{tool}|{domain.lower()}"
+        results = normalize(results)
+        previous = self.cache.get('scan', key)
+        scan_date = datetime.now().isoformat()
+        self.cache.set('scan', key, {'scan_date': scan_date, 'results': results}, ttl=SCAN_TTL)
+        if previous is None:
+            return None
+        return {
+            'domain': domain,
+            'scan_date': scan_date,
+            'previous_scan': previous['scan_date'],
+            'changes': diff_results(previous['results'], results)
+        }
+
+
+def write_diff(filename, diff):
+    with open(f"{filename}_diff.json", 'w', encoding='utf-8') as f:
+        json.dump(diff, f, indent=4, ensure_ascii=False, default=str)
+    return f"{filename}_diff.json"
+
+
+def count_changes(diff):
+    return sum(len(section) for section in diff['changes'].values())
+
+
+def add_incremental_argument(parser):
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='reuse cached answers and conditional requests, write only the changes since the previous scan'
+    )
+
+
+_default_state = None
+_default_lock = threading.Lock()
+
+
+def get_state():
+    global _default_state
+    with _default_lock:
+        if _default_state is None:
+            _default_state = ScanState()
+        return _default_state
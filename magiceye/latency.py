@@ -0,0 +1,163 @@
+import asyncio
+import os
+import socket
+import statistics
+import struct
+import time
+
+from magiceye.ports import probe_port
+from magiceye.timing import count
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# tried in order when ICMP is not allowed or gets no answer
+TCP_PORTS = (443, 80)
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _echo_request(ident, seq, payload):
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, _checksum(header + payload), ident, seq) + payload
+
+
+def icmp_socket():
+    # unprivileged ping socket first (linux net.ipv4.ping_group_range, macOS), a
+    # raw socket needs root or CAP_NET_RAW; None when neither is allowed
+    for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+        try:
+            sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        if kind == socket.SOCK_RAW:
+            # every raw socket sees all icmp traffic of the host, not only its replies
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        return sock
+    return None
+
+
+async def _icmp_rtts(sock, ip, probes, timeout, interval):
+    # one rtt in seconds (None when lost) per echo request; replies are matched on
+    # a random token in the payload since ping sockets rewrite the identifier
+    loop = asyncio.get_running_loop()
+    token = os.urandom(8)
+    raw = sock.type == socket.SOCK_RAW
+    waiters = {}
+
+    def on_readable():
+        while True:
+            try:
+                data, addr = sock.recvfrom(2048)
+            except OSError:
+                return
+            if raw:
+                # raw sockets get the ip header too, and every icmp packet for the host
+                data = data[(data[0] & 0x0f) * 4:]
+            if addr[0] != ip or len(data) < 18 or data[0] != ICMP_ECHO_REPLY or data[8:16] != token:
+                continue
+            waiter = waiters.pop(struct.unpack('!H', data[16:18])[0], None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(time.perf_counter())
+
+    loop.add_reader(sock.fileno(), on_readable)
+    rtts = []
+    try:
+        for seq in range(probes):
+            if seq:
+                await asyncio.sleep(interval)
+            waiter = waiters[seq] = loop.create_future()
+            payload = token + struct.pack('!H', seq) + bytes(38)
+            sent = time.perf_counter()
+            sock.sendto(_echo_request(os.getpid() & 0xffff, seq, payload), (ip, 0))
+            try:
+                rtts.append(await asyncio.wait_for(waiter, timeout) - sent)
+            except asyncio.TimeoutError:
+                waiters.pop(seq, None)
+                rtts.append(None)
+    finally:
+        loop.remove_reader(sock.fileno())
+    return rtts
+
+
+async def _tcp_rtts(ip, port, probes, timeout, interval):
+    # connect time to port; a port that does not answer the first probe is given up
+    semaphore = asyncio.Semaphore(1)
+    rtts = []
+    for seq in range(probes):
+        if seq:
+            await asyncio.sleep(interval)
+        _, latency = await probe_port(ip, port, semaphore, timeout)
+        rtts.append(latency)
+        if latency is None and seq == 0:
+            break
+    return rtts
+
+
+def summarize(method, ip, rtts, port=None):
+    received = [rtt * 1000 for rtt in rtts if rtt is not None]
+    result = {
+        'method': method,
+        'ip': ip,
+        'port': port,
+        'sent': len(rtts),
+        'received': len(received),
+        'loss': round(100 * (1 - len(received) / len(rtts)), 1) if rtts else 100.0,
+        'min_ms': None,
+        'avg_ms': None,
+        'max_ms': None,
+        'jitter_ms': None
+    }
+    if received:
+        # jitter as the mean difference between consecutive rtts
+        deltas = [abs(b - a) for a, b in zip(received, received[1:])]
+        result.update({
+            'min_ms': round(min(received), 3),
+            'avg_ms': round(statistics.mean(received), 3),
+            'max_ms': round(max(received), 3),
+            'jitter_ms': round(statistics.mean(deltas), 3) if deltas else 0.0
+        })
+    return result
+
+
+async def probe_latency(ip, probes=4, ports=TCP_PORTS, timeout=1, interval=0.2, icmp=True):
+    # ICMP echo when the process may open an icmp socket, otherwise (or when every
+    # echo is lost, e.g. filtered) the TCP connect time to the first port that answers
+    result = None
+    sock = icmp_socket() if icmp else None
+    if sock is not None:
+        with sock:
+            try:
+                result = summarize('icmp', ip, await _icmp_rtts(sock, ip, probes, timeout, interval))
+            except OSError as e:
+                result = dict(summarize('icmp', ip, []), error=str(e))
+        count('icmp_probes', result['sent'])
+        if result['received']:
+            return result
+
+    for port in ports:
+        rtts = await _tcp_rtts(ip, port, probes, timeout, interval)
+        count('tcp_probes', len(rtts))
+        if any(rtt is not None for rtt in rtts):
+            return summarize('tcp', ip, rtts, port)
+    return result or summarize('tcp', ip, [])
+
+
+async def probe_many(ips, concurrency=200, **kwargs):
+    # {ip: probe_latency(ip)} with at most concurrency targets probed at once
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(ip):
+        async with semaphore:
+            return await probe_latency(ip, **kwargs)
+
+    ips = list(dict.fromkeys(ips))
+    return dict(zip(ips, await asyncio.gather(*(probe(ip) for ip in ips))))
@@ -0,0 +1,217 @@
+import http.server
+import os
+import tempfile
+import threading
+from urllib.parse import urlsplit
+
+# upper bounds in seconds for every duration histogram
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# third-party apis get a label of their own; every scanned host shares 'target'
+# so the number of series stays bounded however many targets a worker sees
+API_HOSTS = ('ip-api.com', 'ipapi.co', 'rdap.verisign.com')
+
+METRICS = {
+    'magiceye_targets_total': ('counter', 'Targets scanned by batch runs, by outcome'),
+    'magiceye_target_duration_seconds': ('histogram', 'Time to scan one target'),
+    'magiceye_stage_total': ('counter', 'Stages run, by outcome'),
+    'magiceye_stage_duration_seconds': ('histogram', 'Wall time of a scan stage'),
+    'magiceye_stage_events_total': ('counter', 'Requests, bytes, queries and cache hits counted inside a stage'),
+    'magiceye_result_errors_total': ('counter', "Result sections that carry an 'error' entry"),
+    'magiceye_http_requests_total': ('counter', 'HTTP requests, by endpoint and status code'),
+    'magiceye_http_request_duration_seconds': ('histogram', 'Time until the response headers arrived, by endpoint'),
+    'magiceye_lookup_duration_seconds': ('histogram', 'Uncached WHOIS/RDAP lookups, by source')
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th value (max for the last bucket)
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets + (None,), self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max) if bound is not None else self.max
+        return self.max
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'count': self.count,
+                'sum': round(self.sum, 6),
+                'max': round(self.max, 6),
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)}
+            }
+
+
+class Registry:
+    # counters and histograms keyed by metric name and label values, rendered in
+    # the Prometheus text exposition format
+    def __init__(self, metrics=METRICS):
+        self.metrics = dict(metrics)
+        self._values = {name: {} for name in self.metrics}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            histogram = values.get(key)
+            if histogram is None:
+                histogram = values[key] = Histogram()
+        histogram.observe(value)
+
+    def get(self, name):
+        with self._lock:
+            return {key: value for key, value in self._values[name].items()}
+
+    def reset(self, name):
+        with self._lock:
+            self._values[name] = {}
+
+    def render(self):
+        lines = []
+        for name, (kind, help_text) in self.metrics.items():
+            values = self.get(name)
+            if not values:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(values.items()):
+                if kind == 'counter':
+                    lines.append(f"{name}{_labels(key)} {value}")
+                    continue
+                snapshot = value.snapshot()
+                cumulative = 0
+                for bound, count in snapshot['buckets'].items():
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(key)} {snapshot['sum']}")
+                lines.append(f"{name}_count{_labels(key)} {snapshot['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(key):
+    if not key:
+        return ''
+    pairs = []
+    for label, value in key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{label}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+REGISTRY = Registry()
+
+
+def inc(name, amount=1, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    REGISTRY.observe(name, value, **labels)
+
+
+def endpoint(url):
+    host = (urlsplit(url).hostname or '').lower()
+    return host if host in API_HOSTS else 'target'
+
+
+def count_result_errors(results):
+    # the collectors report failures as {'error': ...} inside their section
+    # instead of raising; count the sections that did
+    for section, data in results.items():
+        if section != 'metadata' and isinstance(data, dict) and _has_error(data):
+            inc('magiceye_result_errors_total', section=section)
+
+
+def _has_error(data, depth=0):
+    if 'error' in data or data.get('errors') or data.get('stage_errors'):
+        return True
+    if depth >= 2:
+        return False
+    return any(isinstance(value, dict) and _has_error(value, depth + 1) for value in data.values())
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    # /metrics on a daemon thread; returns the server, shutdown() stops it
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='magiceye-metrics', daemon=True).start()
+    return server
+
+
+def write_textfile(path):
+    # written next to the target and renamed, so a collector (e.g. the node
+    # exporter textfile collector) never reads half a file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.magiceye-metrics-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(REGISTRY.render())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class TextfileWriter:
+    # rewrites path every interval seconds until stop(), which writes it once more
+    def __init__(self, path, interval=15):
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='magiceye-metrics-file', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            write_textfile(self.path)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        write_textfile(self.path)
@@ -0,0 +1,164 @@
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+import time
+
+from magiceye.extract import FIELDS, extract_page, get_extractor
+
+# raw pages waiting for or in a parser process, per worker; fetch threads
+# block past that, so a slow pool slows the fetching down instead of
+# piling bodies up in memory
+QUEUE_PER_WORKER = 4
+
+
+def _warm_up(fields):
+    # compile the extractor once per process instead of on its first page
+    get_extractor(tuple(fields))
+
+
+class ParserPool:
+    # HTML extraction in worker processes: fetch threads hand over raw bytes and
+    # get the compact extracted dict back, so parsing is not bound by the GIL
+    def __init__(self, workers=None, queue_size=None, fields=FIELDS):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or self.workers * QUEUE_PER_WORKER
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+        # spawned, not forked: the parent has http and dns threads whose locks a fork would copy
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_up, initargs=(tuple(fields),)
+        )
+
+    def submit(self, body, encoding=None, fields=FIELDS):
+        # blocks while queue_size pages are pending
+        self._slots.acquire()
+        try:
+            future = self.executor.submit(extract_page, body, encoding, tuple(fields))
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def extract(self, body, encoding=None, fields=FIELDS):
+        return self.submit(body, encoding, fields).result()
+
+    def close(self):
+        # pages not yet handed to a worker are dropped (shutdown's cancel_futures needs 3.9)
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def configure(workers=None, queue_size=None):
+    # workers > 0 sends every page extraction of the process (fetch_page, incremental
+    # fetches, crawls) to a parser pool; 0 or None parses in the fetching thread again
+    global _default_pool
+    with _default_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+            _default_pool = None
+        if workers:
+            _default_pool = ParserPool(workers, queue_size)
+        return _default_pool
+
+
+def get_pool():
+    return _default_pool
+
+
+def shutdown():
+    configure(None)
+
+
+def parse_page(body, encoding=None, fields=FIELDS):
+    # extract_page in the configured pool, or here when there is none
+    pool = _default_pool
+    if pool is None:
+        return extract_page(body, encoding, fields)
+    return pool.extract(body, encoding, fields)
+
+
+def benchmark(body, pages=2000, workers=(1, 2, 4), fields=FIELDS, fetchers=16):
+    # pages parsed per second for each worker count, fed by fetchers threads as
+    # fetch workers would; 0 workers parses in the fetching threads
+    results = []
+    for count in workers:
+        pool = ParserPool(count) if count else None
+        if pool is not None:
+            # spawn and warm up every worker before timing
+            concurrent.futures.wait([pool.submit(body, None, fields) for _ in range(count * 2)])
+        parse = pool.extract if pool is not None else extract_page
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=fetchers) as fetch:
+            list(fetch.map(lambda _: parse(body, None, fields), range(pages)))
+        elapsed = time.perf_counter() - started
+        if pool is not None:
+            pool.close()
+        results.append({'workers': count, 'pages': pages, 'seconds': round(elapsed, 3), 'pages_per_sec': round(pages / elapsed, 1)})
+    return results
+
+
+def sample_page(links=400):
+    # a large, link heavy page for benchmark()
+    items = ''.join(
+        f'<li><a href="/item/{i}">Item {i}</a> <img src="/img/{i}.png" alt="item {i}"> contact{i}@example.com</li>'
+        for i in range(links)
+    )
+    return (
+        '<html><head><title>Benchmark</title><meta name="description" content="parser benchmark">'
+        f'<meta property="og:title" content="Benchmark"></head><body><h1>Items</h1><ul>{items}</ul></body></html>'
+    ).encode('utf-8')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure page parsing throughput against the number of parser processes')
+    parser.add_argument('--workers', default='0,1,2,4', help='comma separated worker counts, 0 parses in the fetch threads (default: 0,1,2,4)')
+    parser.add_argument('--pages', type=int, default=2000, help='pages parsed per worker count (default: 2000)')
+    parser.add_argument('--page', help='html file to parse (default: a generated page with 400 links)')
+    parser.add_argument('--fields', default=','.join(FIELDS), help=f"extracted fields (default: {','.join(FIELDS)})")
+    args = parser.parse_args(argv)
+
+    try:
+        workers = [int(count) for count in args.workers.split(',')]
+    except ValueError:
+        parser.error('--workers must be comma separated numbers')
+    if args.page:
+        with open(args.page, 'rb') as f:
+            body = f.read()
+    else:
+        body = sample_page()
+    fields = tuple(field.strip() for field in args.fields.split(',') if field.strip())
+
+    print(f"{len(body) / 1024:.0f} KB page, {args.pages} pages per run, {os.cpu_count()} cpu(s)")
+    print(f"{'Workers':>8} {'Seconds':>9} {'Pages/s':>9}")
+    for result in benchmark(body, args.pages, workers, fields):
+        print(f"{result['workers']:>8} {result['seconds']:>9} {result['pages_per_sec']:>9}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import contextlib
+import socket
+import time
+
+COMMON_PORTS = [21, 22, 23, 25, 53, 80, 110, 143, 443, 465, 587, 993, 995, 3306, 3389, 5432, 8080, 8443]
+
+SERVICE_NAMES = {
+    21: 'FTP',
+    22: 'SSH',
+    23: 'Telnet',
+    25: 'SMTP',
+    53: 'DNS',
+    80: 'HTTP',
+    110: 'POP3',
+    143: 'IMAP',
+    443: 'HTTPS',
+    465: 'SMTPS',
+    587: 'SMTP (Submission)',
+    993: 'IMAPS',
+    995: 'POP3S',
+    3306: 'MySQL',
+    3389: 'RDP',
+    5432: 'PostgreSQL',
+    8080: 'HTTP-Alternate',
+    8443: 'HTTPS-Alternate'
+}
+
+
+def parse_ports(spec):
+    # accepts "22,80,8000-8100" or an iterable of port numbers
+    ports = set()
+    if isinstance(spec, str):
+        for part in spec.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, end = part.split('-', 1)
+                ports.update(range(int(start), int(end) + 1))
+            else:
+                ports.add(int(part))
+    else:
+        ports.update(int(port) for port in spec)
+
+    invalid = [port for port in ports if not 0 < port < 65536]
+    if invalid:
+        raise ValueError(f"Invalid port(s): {sorted(invalid)}")
+    return sorted(ports)
+
+
+def service_name(port):
+    return SERVICE_NAMES.get(port, 'Unknown')
+
+
+async def scan_ports(ip, ports, concurrency=100, timeout=1):
+    # TCP connect scan; returns ({port: {'service', 'latency_ms'}} for open ports, scan info)
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    probes = await asyncio.gather(*(probe_port(ip, port, semaphore, timeout) for port in ports))
+
+    open_ports = {}
+    for port, latency in probes:
+        if latency is not None:
+            open_ports[port] = {
+                'service': service_name(port),
+                'latency_ms': round(latency * 1000, 2)
+            }
+
+    scan_info = {
+        'ip': ip,
+        'ports_scanned': len(ports),
+        'concurrency': concurrency,
+        'timeout': timeout,
+        'duration': round(time.perf_counter() - start, 3)
+    }
+    return open_ports, scan_info
+
+
+async def probe_port(ip, port, semaphore, timeout):
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout=timeout)
+        except (OSError, asyncio.TimeoutError):
+            return port, None
+        latency = time.perf_counter() - start
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return port, latency
+
+
+def scan_ports_sequential(ip, ports, timeout=1):
+    # the blocking loop analyze_ports used before scan_ports, one connect after
+    # another; kept as the baseline of benchmark()
+    start = time.perf_counter()
+    open_ports = {}
+    for port in ports:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            probe_start = time.perf_counter()
+            if sock.connect_ex((ip, port)) == 0:
+                open_ports[port] = {
+                    'service': service_name(port),
+                    'latency_ms': round((time.perf_counter() - probe_start) * 1000, 2)
+                }
+        except OSError:
+            pass
+        finally:
+            sock.close()
+    return open_ports, {'ip': ip, 'ports_scanned': len(ports), 'timeout': timeout, 'duration': round(time.perf_counter() - start, 3)}
+
+
+@contextlib.contextmanager
+def local_listeners(open_count=3, filtered_count=15):
+    # loopback ports for benchmark(), yields (open ports, filtered ports). A
+    # filtered port is a listener whose accept queue is full: the kernel drops
+    # further SYNs, so a connect waits out its timeout as on a firewalled host
+    sockets = []
+    try:
+        open_ports = []
+        for _ in range(open_count):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sockets.append(server)
+            server.bind(('127.0.0.1', 0))
+            server.listen(128)
+            open_ports.append(server.getsockname()[1])
+
+        filtered_ports = []
+        for _ in range(filtered_count):
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sockets.append(server)
+            server.bind(('127.0.0.1', 0))
+            server.listen(0)
+            port = server.getsockname()[1]
+            for _ in range(4):
+                client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sockets.append(client)
+                client.setblocking(False)
+                client.connect_ex(('127.0.0.1', port))
+            filtered_ports.append(port)
+        # let the handshakes that fill the queues finish
+        time.sleep(0.1)
+        yield open_ports, filtered_ports
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def benchmark(concurrency=(1, 4, 18), timeout=0.5, open_count=3, filtered_count=15):
+    # wall time of one sweep over the local listeners: the sequential loop, then
+    # scan_ports at each concurrency
+    results = []
+    with local_listeners(open_count, filtered_count) as (open_ports, filtered_ports):
+        ports = sorted(open_ports + filtered_ports)
+        found, info = scan_ports_sequential('127.0.0.1', ports, timeout)
+        results.append({'scanner': 'sequential', 'concurrency': 1, 'seconds': info['duration'], 'open': len(found)})
+        for limit in concurrency:
+            found, info = asyncio.run(scan_ports('127.0.0.1', ports, limit, timeout))
+            results.append({'scanner': 'async', 'concurrency': limit, 'seconds': info['duration'], 'open': len(found)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure port scan wall time against concurrency on local listeners')
+    parser.add_argument('--concurrency', default='1,4,18', help='comma separated concurrency limits for the async scan (default: 1,4,18)')
+    parser.add_argument('--timeout', type=float, default=0.5, help='connect timeout in seconds (default: 0.5)')
+    parser.add_argument('--open', type=int, default=3, help='listening ports (default: 3)')
+    parser.add_argument('--filtered', type=int, default=15, help='ports that drop connections (default: 15)')
+    args = parser.parse_args(argv)
+
+    try:
+        concurrency = [int(limit) for limit in args.concurrency.split(',')]
+    except ValueError:
+        parser.error('--concurrency must be comma separated numbers')
+    if any(limit < 1 for limit in concurrency):
+        parser.error('--concurrency limits must be at least 1')
+
+    print(f"{args.open} open + {args.filtered} filtered ports, {args.timeout}s timeout")
+    print(f"{'Scanner':<12} {'Concurrency':>11} {'Seconds':>9} {'Open':>5}")
+    for result in benchmark(concurrency, args.timeout, args.open, args.filtered):
+        print(f"{result['scanner']:<12} {result['concurrency']:>11} {result['seconds']:>9} {result['open']:>5}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
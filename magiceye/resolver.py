@@ -0,0 +1,295 @@
+import asyncio
+import socket
+import threading
+import time
+
+from magiceye.cache import SqliteTTLCache, cache_path
+from magiceye.domains import is_ip, strip_port
+from magiceye.timing import count
+
+RECORD_TYPES = ('A', 'AAAA', 'MX', 'TXT', 'NS', 'CNAME', 'SOA', 'CAA')
+
+# dnspython adds ~50 ms to startup, it is only imported once an engine or a
+# persisted answer needs it
+dns = None
+
+
+def _load_dns():
+    global dns
+    if dns is None:
+        import dns.asyncresolver
+        import dns.exception
+        import dns.name
+        import dns.resolver
+        import dns.reversename
+
+
+class DnsCache:
+    # answers live for their record TTL; NXDOMAIN and empty answers are kept for
+    # negative_ttl so batch runs do not keep asking for names that do not exist;
+    # with a store (SqliteTTLCache) answers also outlive the process
+    def __init__(self, negative_ttl=300, max_ttl=86400, max_entries=100000, store=None):
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self.max_entries = max_entries
+        self.store = store
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name, rdtype):
+        return name.lower().rstrip('.'), rdtype
+
+    def get(self, name, rdtype):
+        # returns (records, remaining_ttl, error) or None
+        key = self._key(name, rdtype)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self._entries.pop(key, None)
+                entry = self._load(key, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, records, error = entry
+            if error is not None or not records:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+        return records, int(expires - now), error
+
+    def put(self, name, rdtype, records, ttl=None, error=None):
+        if ttl is None or error is not None or not records:
+            ttl = self.negative_ttl
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+        key = self._key(name, rdtype)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._purge()
+            self._entries[key] = (time.monotonic() + ttl, records, error)
+        if self.store is not None and (error is None or isinstance(error, dns.resolver.NXDOMAIN)):
+            value = {'records': records, 'expires': time.time() + ttl, 'nxdomain': error is not None}
+            self.store.set('dns', '|'.join(key), value, ttl=ttl)
+
+    def _load(self, key, now):
+        # memory miss: take the answer from the store if it is still fresh there
+        if self.store is None:
+            return None
+        value = self.store.get('dns', '|'.join(key))
+        if value is None or value['expires'] <= time.time():
+            return None
+        error = None
+        if value['nxdomain']:
+            _load_dns()
+            error = dns.resolver.NXDOMAIN(qnames=[dns.name.from_text(key[0])], responses={})
+        entry = (now + value['expires'] - time.time(), value['records'], error)
+        self._entries[key] = entry
+        return entry
+
+    def _purge(self):
+        now = time.monotonic()
+        self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+        # still full: drop the entries closest to expiry
+        if len(self._entries) >= self.max_entries:
+            ordered = sorted(self._entries.items(), key=lambda item: item[1][0])
+            self._entries = dict(ordered[len(ordered) // 2:])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'persistent': self.store is not None
+            }
+
+
+class DnsEngine:
+    # one dnspython async resolver (plus a sync twin for blocking callers) shared
+    # by every query, both in front of the same TTL cache; the number of queries
+    # in flight is bounded per event loop by max_in_flight
+    def __init__(self, max_in_flight=200, timeout=5, nameservers=None, port=None, cache=None, fallback_ttl=60):
+        self.max_in_flight = max_in_flight
+        self.cache = cache or DnsCache()
+        self.fallback_ttl = fallback_ttl
+        _load_dns()
+        self.resolver = dns.asyncresolver.Resolver()
+        self.sync_resolver = dns.resolver.Resolver()
+        for resolver in (self.resolver, self.sync_resolver):
+            resolver.lifetime = timeout
+            if nameservers:
+                resolver.nameservers = list(nameservers)
+            if port:
+                resolver.port = port
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._semaphores:
+                # drop semaphores of loops that are gone (asyncio.run per call)
+                self._semaphores = {l: s for l, s in self._semaphores.items() if not l.is_closed()}
+                self._semaphores[loop] = asyncio.Semaphore(self.max_in_flight)
+            return self._semaphores[loop]
+
+    def _from_cache(self, name, rdtype):
+        cached = self.cache.get(name, rdtype)
+        if cached is None:
+            return None
+        count('dns_cache_hits')
+        records, ttl, error = cached
+        if error is not None:
+            raise error
+        return records, ttl
+
+    def _store(self, name, rdtype, answer=None, error=None):
+        if answer is None:
+            self.cache.put(name, rdtype, [], error=error)
+            return [], None
+        records = [rdata.to_text() for rdata in answer]
+        self.cache.put(name, rdtype, records, answer.rrset.ttl)
+        return records, answer.rrset.ttl
+
+    async def query(self, name, rdtype):
+        # returns (records, ttl); an empty answer is not an error
+        cached = self._from_cache(name, rdtype)
+        if cached is not None:
+            return cached
+        count('dns_queries')
+        async with self._semaphore():
+            try:
+                answer = await self.resolver.resolve(name, rdtype)
+            except dns.resolver.NoAnswer:
+                return self._store(name, rdtype)
+            except dns.resolver.NXDOMAIN as e:
+                self._store(name, rdtype, error=e)
+                raise
+        return self._store(name, rdtype, answer)
+
+    def query_sync(self, name, rdtype):
+        cached = self._from_cache(name, rdtype)
+        if cached is not None:
+            return cached
+        count('dns_queries')
+        try:
+            answer = self.sync_resolver.resolve(name, rdtype)
+        except dns.resolver.NoAnswer:
+            return self._store(name, rdtype)
+        except dns.resolver.NXDOMAIN as e:
+            self._store(name, rdtype, error=e)
+            raise
+        return self._store(name, rdtype, answer)
+
+    async def resolve(self, name, record_types=RECORD_TYPES):
+        # every record type is queried at once and fails on its own
+        name = strip_port(name)
+        if is_ip(name):
+            return await self._resolve_ip(name, record_types)
+        result = {'records': {}, 'ttls': {}, 'errors': {}}
+        # a hostname has no reverse name; PTR is only asked for IP literals
+        if 'PTR' in record_types:
+            record_types = [rdtype for rdtype in record_types if rdtype != 'PTR']
+            result['errors']['PTR'] = 'PTR needs an IP address'
+
+        answers = await asyncio.gather(*(self.query(name, rdtype) for rdtype in record_types), return_exceptions=True)
+        for rdtype, answer in zip(record_types, answers):
+            if isinstance(answer, Exception):
+                result['errors'][rdtype] = str(answer) or type(answer).__name__
+            else:
+                result['records'][rdtype], result['ttls'][rdtype] = answer
+        return result
+
+    async def _resolve_ip(self, ip, record_types):
+        # an address needs no forward lookup, it is its own A/AAAA answer; only PTR is asked
+        result = {'records': {}, 'ttls': {}, 'errors': {}}
+        rdtype = 'AAAA' if ':' in ip else 'A'
+        if rdtype in record_types:
+            result['records'][rdtype], result['ttls'][rdtype] = [ip], None
+        if 'PTR' in record_types:
+            try:
+                result['records']['PTR'], result['ttls']['PTR'] = await self.query(dns.reversename.from_address(ip).to_text(), 'PTR')
+            except Exception as e:
+                result['errors']['PTR'] = str(e) or type(e).__name__
+        return result
+
+    async def resolve_many(self, names, record_types=RECORD_TYPES):
+        names = list(dict.fromkeys(names))
+        results = await asyncio.gather(*(self.resolve(name, record_types) for name in names))
+        return dict(zip(names, results))
+
+    async def reverse(self, ip):
+        try:
+            records, _ = await self.query(dns.reversename.from_address(ip).to_text(), 'PTR')
+        except dns.exception.DNSException:
+            return None
+        return records[0].rstrip('.') if records else None
+
+    async def addresses(self, name):
+        # IPv4 addresses to connect to; names DNS does not know (localhost,
+        # /etc/hosts entries) fall back to the system resolver
+        name = strip_port(name)
+        if is_ip(name):
+            return [name]
+        try:
+            records, _ = await self.query(name, 'A')
+        except dns.exception.DNSException:
+            records = []
+        if records:
+            return records
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(name, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        return self._store_fallback(name, infos)
+
+    def addresses_sync(self, name):
+        name = strip_port(name)
+        if is_ip(name):
+            return [name]
+        try:
+            records, _ = self.query_sync(name, 'A')
+        except dns.exception.DNSException:
+            records = []
+        if records:
+            return records
+        infos = socket.getaddrinfo(name, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        return self._store_fallback(name, infos)
+
+    def _store_fallback(self, name, infos):
+        records = list(dict.fromkeys(info[4][0] for info in infos))
+        self.cache.put(name, 'A', records, self.fallback_ttl)
+        return records
+
+    def resolve_sync(self, name, record_types=RECORD_TYPES):
+        return asyncio.run(self.resolve(name, record_types))
+
+    def resolve_many_sync(self, names, record_types=RECORD_TYPES):
+        return asyncio.run(self.resolve_many(names, record_types))
+
+    def reverse_sync(self, ip):
+        try:
+            records, _ = self.query_sync(dns.reversename.from_address(ip).to_text(), 'PTR')
+        except dns.exception.DNSException:
+            return None
+        return records[0].rstrip('.') if records else None
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def get_engine(persistent=False):
+    # persistent=True backs the shared cache with dns.sqlite, so answers are
+    # reused by later runs within their TTL (incremental re-scans)
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = DnsEngine()
+        if persistent and _default_engine.cache.store is None:
+            _default_engine.cache.store = SqliteTTLCache(cache_path('dns.sqlite'), max_entries=500000)
+        return _default_engine
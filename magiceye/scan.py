@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from magiceye import metrics
+from magiceye.collectors import COLLECTORS, load_collector
+from magiceye.scheduler import StageScheduler
+from magiceye.timing import Timings
+
+# the four tools as collector presets; options are defaults the caller can override
+MODES = {
+    'reguler': {
+        'collectors': ('whois', 'ip', 'web'),
+        'options': {'scheme': 'https', 'geo_provider': 'ip-api', 'web_fields': ('title', 'meta_tags', 'headings', 'links', 'emails')}
+    },
+    'hunter': {
+        'collectors': ('whois', 'dns', 'web'),
+        'options': {'scheme': 'http', 'web_fields': ('title', 'meta_tags', 'headings', 'links', 'images')}
+    },
+    'specific': {
+        'collectors': ('whois', 'ip', 'web'),
+        'options': {'scheme': 'https', 'geo_provider': 'ipapi.co', 'web_fields': ('title', 'meta_tags', 'headings', 'links')}
+    },
+    'hazard': {
+        'collectors': ('whois', 'dns', 'ip', 'tls', 'ports', 'ping', 'web'),
+        'options': {'scheme': 'https', 'geo_provider': 'ip-api', 'web_fields': ('title', 'meta_tags')}
+    }
+}
+DEFAULT_MODE = 'reguler'
+
+
+def parse_target(target, scheme='https'):
+    # (url, domain) for "example.com", "example.com/path" or a full url
+    target = target.strip()
+    if not target.startswith(('http://', 'https://')):
+        target = f"{scheme}://{target}"
+    parsed = urlparse(target)
+    if not parsed.netloc:
+        raise ValueError(f"Invalid target: {target}")
+    return target, parsed.hostname
+
+
+class ScanContext:
+    # what a collector gets: the target plus shared services, each created (and
+    # its module imported) only when a collector first asks for it
+    def __init__(self, target, options, results=None, executor=None):
+        self.target = target
+        self.options = options
+        # sections filled so far; read them only for collectors listed in AFTER
+        self.results = results if results is not None else {}
+        # thread pool for the blocking calls of async collectors (None: the loop's default)
+        self.executor = executor
+        self.url, self.domain = parse_target(target, options.get('scheme', 'https'))
+
+    async def run_blocking(self, func, *args):
+        # func(*args) off the event loop, inside the caller's timing span
+        import asyncio
+        import contextvars
+        import functools
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(contextvars.copy_context().run, func, *args))
+
+    @property
+    def incremental(self):
+        return bool(self.options.get('incremental'))
+
+    @property
+    def http(self):
+        from magiceye.http_client import get_client
+        return get_client()
+
+    @property
+    def dns(self):
+        from magiceye.resolver import get_engine
+        return get_engine(persistent=self.incremental)
+
+    @property
+    def geo(self):
+        from magiceye.geo import get_locator
+        return get_locator(self.options.get('geo_provider', 'ip-api'))
+
+    @property
+    def whois_cache(self):
+        from magiceye.whois_cache import get_whois_cache
+        return get_whois_cache()
+
+    @property
+    def state(self):
+        if not self.incremental:
+            return None
+        from magiceye.incremental import get_state
+        return get_state()
+
+
+class Scanner:
+    def __init__(self, mode=None, collectors=None, stage_timeout=30, deadline=120, **options):
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}' (available: {', '.join(MODES)})")
+        preset = MODES[mode or DEFAULT_MODE]
+        self.mode = mode
+        self.collectors = {name: load_collector(name) for name in (collectors or preset['collectors'])}
+        self.stage_timeout = stage_timeout
+        self.deadline = deadline
+        self.options = dict(preset['options'])
+        self.options.update((key, value) for key, value in options.items() if value is not None)
+
+    def scan(self, target):
+        results = {module.SECTION: {} for module in self.collectors.values()}
+        ctx = ScanContext(target, self.options, results)
+        timings = Timings()
+        lock = threading.Lock()
+        finished = threading.Event()
+        started = time.perf_counter()
+
+        def run(module):
+            values = module.collect(ctx)
+            # a collector that outlived its timeout must not change returned results
+            with lock:
+                if not finished.is_set():
+                    results[module.SECTION].update(values)
+
+        scheduler = StageScheduler(stage_timeout=self.stage_timeout, deadline=self.deadline, timings=timings)
+        for name, module in self.collectors.items():
+            scheduler.add(name, lambda module=module: run(module), depends_on=module.DEPENDS_ON, after=getattr(module, 'AFTER', ()))
+        stages = scheduler.run()
+
+        with lock:
+            finished.set()
+            self._finish(ctx, results, stages, timings, started)
+        return results
+
+    def _finish(self, ctx, results, stages, timings, started):
+        # stage failures go into their section under stage_errors (apart from a
+        # collector's own 'errors', e.g. the per record type ones of dns), everything
+        # about the run into metadata
+        for name, stage in stages.items():
+            if stage['status'] != 'ok':
+                section = results[self.collectors[name].SECTION]
+                section.setdefault('stage_errors', {})[name] = stage.get('error') or stage.get('reason') or stage['status']
+        results['metadata'] = {
+            'scan_date': datetime.now().isoformat(),
+            'target': ctx.target,
+            'domain': ctx.domain,
+            'mode': self.mode,
+            'collectors': list(self.collectors),
+            'scan_duration': round(time.perf_counter() - started, 3),
+            'stages': stages,
+            'spans': timings.report()
+        }
+        metrics.count_result_errors(results)
+
+
+def scan(target, mode=None, collectors=None, **options):
+    return Scanner(mode=mode, collectors=collectors, **options).scan(target)
+
+
+def list_collectors():
+    return list(COLLECTORS)
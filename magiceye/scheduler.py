@@ -0,0 +1,237 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+
+from magiceye import metrics
+
+# how often run_async checks whether its stage ran out of time
+CANCEL_POLL = 0.1
+
+_stage_cancel = contextvars.ContextVar('magiceye_stage_cancel', default=None)
+
+
+def stage_cancelled():
+    # true once the stage the calling code runs in has timed out; threads can
+    # not be stopped from outside, so long loops check this and return early
+    cancel = _stage_cancel.get()
+    return cancel is not None and cancel.is_set()
+
+
+def run_async(coro):
+    # asyncio.run for stage code: the coroutine is cancelled when its stage
+    # times out instead of running on in the abandoned thread
+    cancel = _stage_cancel.get()
+    if cancel is None:
+        return asyncio.run(coro)
+
+    async def watched():
+        task = asyncio.ensure_future(coro)
+        while not task.done():
+            await asyncio.wait([task], timeout=CANCEL_POLL)
+            if cancel.is_set() and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    raise TimeoutError("stage timed out")
+        return task.result()
+    return asyncio.run(watched())
+
+
+class StageScheduler:
+    # runs named stages concurrently once their dependencies succeeded; every stage
+    # has its own timeout and the whole run is bounded by deadline; with timings
+    # (magiceye.timing.Timings) every stage runs in a span of its own name. after
+    # only orders: the stage waits for those stages whatever their outcome
+    def __init__(self, max_workers=None, stage_timeout=None, deadline=None, timings=None):
+        self.max_workers = max_workers
+        self.stage_timeout = stage_timeout
+        self.deadline = deadline
+        self.timings = timings
+        self.stages = {}
+        self._cancels = {}
+        # stages whose span was recorded when they timed out
+        self._closed_spans = set()
+
+    def add(self, name, func, depends_on=(), message=None, timeout=None, after=()):
+        self.stages[name] = {
+            'func': func,
+            'depends_on': tuple(depends_on),
+            'after': tuple(after),
+            'message': message,
+            'timeout': timeout if timeout is not None else self.stage_timeout
+        }
+
+    def _check(self):
+        # a dependency on a missing stage or a cycle would never become ready
+        for name, stage in self.stages.items():
+            unknown = [dep for dep in stage['depends_on'] if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(unknown)}")
+
+        # depth first over depends_on and after (after names not added are ignored)
+        state = {}
+        for root in self.stages:
+            if root in state:
+                continue
+            state[root] = 'open'
+            path = [root]
+            stack = [iter(self._edges(root))]
+            while stack:
+                dep = next(stack[-1], None)
+                if dep is None:
+                    state[path.pop()] = 'done'
+                    stack.pop()
+                elif state.get(dep) == 'open':
+                    cycle = path[path.index(dep):] + [dep]
+                    raise ValueError(f"Stage dependency cycle: {' -> '.join(cycle)}")
+                elif dep not in state:
+                    state[dep] = 'open'
+                    path.append(dep)
+                    stack.append(iter(self._edges(dep)))
+
+    def _edges(self, name):
+        stage = self.stages[name]
+        return [dep for dep in stage['depends_on'] + stage['after'] if dep in self.stages]
+
+    def _ready(self, pending, report):
+        # removes and returns the pending stages that can start now; stages whose
+        # dependencies failed are reported as skipped instead
+        ready = []
+        for name, stage in list(pending.items()):
+            deps = stage['depends_on']
+            failed = [dep for dep in deps if dep in report and report[dep]['status'] != 'ok']
+            if failed:
+                report[name] = {'status': 'skipped', 'reason': f"dependency not satisfied: {', '.join(failed)}"}
+                del pending[name]
+            elif all(dep in report for dep in deps + stage['after'] if dep in self.stages):
+                if stage['message']:
+                    print(stage['message'])
+                ready.append((name, stage))
+                del pending[name]
+        return ready
+
+    def _wait_timeout(self, running, started):
+        # seconds until the nearest stage timeout or the deadline
+        wake_times = [t0 + self.stages[name]['timeout'] for name, t0 in running.values() if self.stages[name]['timeout']]
+        if self.deadline:
+            wake_times.append(started + self.deadline)
+        return max(min(wake_times) - time.monotonic(), 0) if wake_times else None
+
+    def _finish(self, done, running, pending, report, started):
+        # records finished stages, then cancels (and reports) the ones out of time
+        now = time.monotonic()
+        for future in done:
+            name, t0 = running.pop(future)
+            error = future.exception()
+            if error is None:
+                report[name] = {'status': 'ok', 'duration': round(now - t0, 3)}
+            else:
+                report[name] = {'status': 'error', 'error': str(error), 'duration': round(now - t0, 3)}
+
+        deadline_hit = self.deadline and now - started >= self.deadline
+        for future, (name, t0) in list(running.items()):
+            timeout = self.stages[name]['timeout']
+            if deadline_hit or (timeout and now - t0 >= timeout):
+                future.cancel()
+                cancel = self._cancels.pop(name, None)
+                if cancel is not None:
+                    cancel.set()
+                del running[future]
+                report[name] = {'status': 'timeout', 'duration': round(now - t0, 3)}
+                # recorded now, the span's late exit in the abandoned stage is not counted
+                if self.timings is not None and self.timings.close_span(name, 'timeout'):
+                    self._closed_spans.add(name)
+
+        if deadline_hit:
+            for name in pending:
+                report[name] = {'status': 'skipped', 'reason': 'scan deadline reached'}
+            pending.clear()
+
+    def _count_unfinished(self, report):
+        # stages that ran are counted by their timing span, timed out ones included
+        for name, stage in report.items():
+            if stage['status'] in ('timeout', 'skipped') and name not in self._closed_spans:
+                metrics.inc('magiceye_stage_total', stage=name, status=stage['status'])
+
+    def run(self):
+        self._check()
+        report = {}
+        pending = dict(self.stages)
+        running = {}
+        started = time.monotonic()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers or max(len(pending), 1))
+
+        try:
+            while pending or running:
+                for name, stage in self._ready(pending, report):
+                    self._cancels[name] = threading.Event()
+                    running[executor.submit(self._run_stage, name, stage['func'], self._cancels[name])] = (name, time.monotonic())
+                if not running:
+                    continue
+
+                # wake up on the first completion or the nearest timeout
+                done, _ = concurrent.futures.wait(
+                    running, timeout=self._wait_timeout(running, started), return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                self._finish(done, running, pending, report, started)
+        finally:
+            # stuck stages are told to stop and abandoned rather than waited for
+            for future, (name, _) in running.items():
+                future.cancel()
+                self._cancels[name].set()
+            executor.shutdown(wait=False)
+
+        self._count_unfinished(report)
+        return report
+
+    def _run_stage(self, name, func, cancel):
+        # timed out before a worker thread picked it up
+        if cancel.is_set():
+            return None
+        token = _stage_cancel.set(cancel)
+        try:
+            if self.timings is None:
+                return func()
+            with self.timings.span(name):
+                return func()
+        finally:
+            _stage_cancel.reset(token)
+
+
+class AsyncStageScheduler(StageScheduler):
+    # the same rules on the running event loop: stage funcs are coroutine
+    # functions run as tasks, and a stage out of time is really cancelled
+    async def run(self):
+        self._check()
+        report = {}
+        pending = dict(self.stages)
+        running = {}
+        started = time.monotonic()
+
+        try:
+            while pending or running:
+                for name, stage in self._ready(pending, report):
+                    running[asyncio.ensure_future(self._run_stage(name, stage['func']))] = (name, time.monotonic())
+                if not running:
+                    continue
+
+                done, _ = await asyncio.wait(
+                    running, timeout=self._wait_timeout(running, started), return_when=asyncio.FIRST_COMPLETED
+                )
+                self._finish(done, running, pending, report, started)
+        finally:
+            # the caller was cancelled: take every stage with it
+            for task in running:
+                task.cancel()
+
+        self._count_unfinished(report)
+        return report
+
+    async def _run_stage(self, name, func):
+        if self.timings is None:
+            return await func()
+        with self.timings.span(name):
+            return await func()
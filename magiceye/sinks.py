@@ -0,0 +1,183 @@
+import csv
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+# one row per scanned target, the same columns for every mode; sections a mode
+# does not produce stay empty and nested values are stored as JSON text in the
+# flat (CSV/Parquet) formats
+SECTIONS = (
+    'domain_info', 'web_info', 'dns_info', 'network_info', 'ip_info', 'ssl_info',
+    'security_info', 'geolocation_info', 'contact_info', 'technical_info', 'timestamps', 'metadata'
+)
+RESULT_FIELDS = ('mode', 'target', 'domain', 'scan_date') + SECTIONS + ('changes',)
+
+
+def result_record(mode, target, domain, results, diff=None):
+    # with a diff (incremental scans) only the changes are recorded
+    record = dict.fromkeys(RESULT_FIELDS)
+    record.update(mode=mode, target=target, domain=domain)
+    if diff is not None:
+        record['scan_date'] = diff['scan_date']
+        record['changes'] = dict(diff['changes'], previous_scan=diff['previous_scan'])
+        return record
+
+    metadata = results.get('metadata') or {}
+    # a mode that does not date its results is recorded at write time
+    record['scan_date'] = (
+        metadata.get('scan_date') or (results.get('timestamps') or {}).get('scan_date') or datetime.now().isoformat()
+    )
+    for section in SECTIONS:
+        if section in results:
+            record[section] = results[section]
+    return record
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class _BufferedSink:
+    # records are buffered and handed to _flush batch_size at a time; write() may
+    # be called from several scan threads
+    def __init__(self, path, batch_size):
+        self.path = path
+        self.batch_size = max(batch_size, 1)
+        self.count = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def write(self, record, results=None):
+        # results: the full results behind record, only used by sinks that index them
+        with self._lock:
+            self._buffer.append(self._entry(record, results))
+            self.count += 1
+            if len(self._buffer) >= self.batch_size:
+                self._flush(self._buffer)
+                self._buffer = []
+
+    def flush(self):
+        with self._lock:
+            if self._buffer:
+                self._flush(self._buffer)
+                self._buffer = []
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._close()
+
+    def _entry(self, record, results):
+        return record
+
+    def _flush(self, records):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonlSink(_BufferedSink):
+    # one JSON document per line, appended ('-' is stdout); batch_size=1 makes
+    # every record visible as soon as it is written
+    def __init__(self, path, mode='a', batch_size=1):
+        super().__init__(path, batch_size)
+        self._file = sys.stdout if path == '-' else open(path, mode, encoding='utf-8')
+
+    def _flush(self, records):
+        self._file.write(''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records))
+        self._file.flush()
+
+    def _close(self):
+        if self.path != '-':
+            self._file.close()
+
+
+class CsvSink(_BufferedSink):
+    # fixed columns, appended; the header is only written to a new or empty file
+    def __init__(self, path, fields=RESULT_FIELDS, batch_size=100):
+        super().__init__(path, batch_size)
+        self.fields = tuple(fields)
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if new:
+            self._writer.writerow(self.fields)
+            self._file.flush()
+
+    def _flush(self, records):
+        self._writer.writerows([_to_text(record.get(field)) for field in self.fields] for record in records)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(_BufferedSink):
+    # every batch becomes one row group; needs pyarrow (optional) and, as
+    # parquet files cannot be appended to, replaces an existing file
+    def __init__(self, path, fields=RESULT_FIELDS, batch_size=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow)")
+        super().__init__(path, batch_size)
+        self.fields = tuple(fields)
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([(field, pyarrow.string()) for field in self.fields])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def _flush(self, records):
+        columns = {field: [_to_text(record.get(field)) for record in records] for field in self.fields}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+class StoreSink(_BufferedSink):
+    # records go to a magiceye.store.ResultStore, indexed for pivot queries, one
+    # transaction per batch; a diff record (incremental scans) is indexed by the
+    # full results it was made from, the diff alone holds no current values
+    def __init__(self, path, batch_size=200):
+        from magiceye.store import ResultStore
+        super().__init__(path, batch_size)
+        self._store = ResultStore(path)
+
+    def _entry(self, record, results):
+        return record, results if record.get('changes') is not None else None
+
+    def _flush(self, entries):
+        records, pivot_sources = zip(*entries)
+        self._store.add_many(records, pivot_sources=pivot_sources)
+
+    def _close(self):
+        self._store.close()
+
+
+SINKS = {'.jsonl': JsonlSink, '.csv': CsvSink, '.parquet': ParquetSink, '.sqlite': StoreSink, '.db': StoreSink}
+
+
+def open_sink(path, batch_size=None):
+    # the format follows the file extension, '-' streams JSON lines to stdout
+    if path == '-':
+        return JsonlSink(path, batch_size=batch_size or 1)
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINKS:
+        raise ValueError(f"Unsupported output format '{extension}' (use {', '.join(SINKS)})")
+    if extension == '.jsonl':
+        return JsonlSink(path, batch_size=batch_size or 50)
+    if batch_size:
+        return SINKS[extension](path, batch_size=batch_size)
+    return SINKS[extension](path)
@@ -0,0 +1,68 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOLS = {
+    'reguler': os.path.join(ROOT, 'REGULER', 'reguler_osint.py'),
+    'hunter': os.path.join(ROOT, 'HUNTER', 'hunter_osint.py'),
+    'specific': os.path.join(ROOT, 'SPECIFIC', 'specific_osint.py'),
+    'hazard': os.path.join(ROOT, 'HAZARD', 'hazard_osint.py')
+}
+
+# modules that must not be imported just to start a tool; they are loaded on
+# the code path that needs them
+LAZY_MODULES = ('pandas', 'bs4', 'lxml', 'whois', 'dns', 'pyarrow')
+DEFAULT_BUDGET_MS = 400
+
+
+def import_profile(script):
+    # (total import time in ms, top level modules) of `script --help` from -X importtime
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', script, '--help'],
+        capture_output=True, text=True, timeout=60
+    )
+    total = 0
+    modules = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        modules.add(name.strip().split('.')[0])
+        # top level entries carry their nested imports in the cumulative column
+        if not name.startswith('  '):
+            total += int(parts[1])
+    return total / 1000, modules
+
+
+def check(budget_ms=DEFAULT_BUDGET_MS, runs=3):
+    # best of runs per tool, so a cold file cache does not count as a regression
+    ok = True
+    for tool, script in TOOLS.items():
+        profiles = [import_profile(script) for _ in range(runs)]
+        total = min(total for total, _ in profiles)
+        eager = sorted(set(LAZY_MODULES) & profiles[0][1])
+        status = 'ok'
+        if eager:
+            status = f"imports {', '.join(eager)} at startup"
+        elif total > budget_ms:
+            status = f"over the {budget_ms} ms budget"
+        ok = ok and status == 'ok'
+        print(f"{tool:<10} {total:8.1f} ms  {status}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the import time of every tool (python -X importtime)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help=f'maximum import time in ms (default: {DEFAULT_BUDGET_MS})')
+    parser.add_argument('--runs', type=int, default=3, help='runs per tool, the fastest one counts (default: 3)')
+    args = parser.parse_args(argv)
+    return 0 if check(args.budget, args.runs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import ipaddress
+import itertools
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+
+from magiceye.cache import cache_path
+
+# pivot kind -> result keys holding its values, in any section of any mode
+# (the tools and collectors name the same thing differently)
+PIVOT_KEYS = {
+    'ip': ('ip', 'ip_address', 'ip_addresses', 'ipv4_addresses', 'ipv6_addresses', 'a_records', 'A', 'AAAA', 'addresses', 'query'),
+    'asn': ('as', 'asn', 'as_number'),
+    'nameserver': ('name_servers', 'nameservers', 'ns_records', 'NS'),
+    'registrar': ('registrar',),
+    'email': ('email', 'emails'),
+    'cert_serial': ('serial_number',),
+    'san': ('san',)
+}
+KINDS = tuple(PIVOT_KEYS)
+_KEY_KINDS = {key: kind for kind, keys in PIVOT_KEYS.items() for key in keys}
+
+# never describe the target itself, or (links, images) are long lists that
+# would dominate the walk
+SKIP_KEYS = (
+    'metadata', 'timestamps', 'changes', 'headers', 'response_headers', 'meta_tags', 'technologies',
+    'links', 'images', 'headings'
+)
+
+# first item of a (type, value) subjectAltName entry
+SAN_TYPES = ('DNS', 'IP Address', 'email', 'URI')
+MAX_VALUE_LENGTH = 255
+_ASN = re.compile(r'AS(\d+)', re.IGNORECASE)
+
+
+def default_path():
+    return os.environ.get('MAGICEYE_STORE') or cache_path('results.sqlite')
+
+
+def normalize(kind, value):
+    # the indexed form of a value, None when it is not one; queries go through
+    # the same function so 'NS1.Example.COM.' finds 'ns1.example.com'
+    if isinstance(value, (list, tuple)):
+        # SAN entries are (type, value) pairs
+        if kind != 'san' or len(value) != 2 or value[0] not in SAN_TYPES:
+            return None
+        value = value[1]
+    if isinstance(value, int) and not isinstance(value, bool) and kind == 'asn':
+        value = f"AS{value}"
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if not value or len(value) > MAX_VALUE_LENGTH:
+        return None
+    if kind == 'ip':
+        try:
+            return str(ipaddress.ip_address(value))
+        except ValueError:
+            return None
+    if kind == 'asn':
+        match = _ASN.match(value) or (value.isdigit() and re.match(r'(\d+)', value))
+        return f"AS{match.group(1)}" if match else None
+    if kind == 'email':
+        return value.lower() if '@' in value else None
+    if kind == 'cert_serial':
+        return value.upper()
+    if kind == 'registrar':
+        return value
+    # nameserver, san
+    return value.lower().rstrip('.')
+
+
+def extract_pivots(record):
+    # {(kind, value)} found anywhere in a result record or a raw results dict
+    found = set()
+    stack = [record]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(item for item in node if isinstance(item, (dict, list, tuple)))
+            continue
+        for key, value in node.items():
+            if key in SKIP_KEYS or value is None:
+                continue
+            kind = _KEY_KINDS.get(key)
+            if kind is not None:
+                values = value if isinstance(value, (list, tuple)) else [value]
+                if kind == 'san' and len(values) == 2 and values[0] in SAN_TYPES:
+                    values = [values]
+                for item in values:
+                    normalized = normalize(kind, item)
+                    if normalized is not None:
+                        found.add((kind, normalized))
+            if isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+    return found
+
+
+def _domain(record):
+    domain = record.get('domain') or (record.get('metadata') or {}).get('domain') or record.get('target') or ''
+    return domain.lower()
+
+
+class ResultStore:
+    # every scan record once (compressed JSON) plus one index row per (kind,
+    # value, domain, scan) so pivots are index range scans, not file reads
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            if self.path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS scans ('
+                'id INTEGER PRIMARY KEY, mode TEXT, target TEXT, domain TEXT NOT NULL, scan_date TEXT, '
+                'source TEXT, record BLOB NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS scans_domain ON scans (domain, id)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS scans_source ON scans (source)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS pivots ('
+                'kind TEXT NOT NULL, value TEXT NOT NULL, domain TEXT NOT NULL, scan_id INTEGER NOT NULL, '
+                'PRIMARY KEY (kind, value, domain, scan_id)) WITHOUT ROWID'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS pivots_scan ON pivots (scan_id)')
+
+    def _insert(self, record, source, pivot_source=None):
+        domain = _domain(record)
+        cursor = self._conn.execute(
+            'INSERT INTO scans (mode, target, domain, scan_date, source, record) VALUES (?, ?, ?, ?, ?, ?)',
+            (record.get('mode'), record.get('target'), domain, record.get('scan_date'), source,
+             zlib.compress(json.dumps(record, ensure_ascii=False, default=str).encode('utf-8')))
+        )
+        scan_id = cursor.lastrowid
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO pivots (kind, value, domain, scan_id) VALUES (?, ?, ?, ?)',
+            [(kind, value, domain, scan_id) for kind, value in extract_pivots(record if pivot_source is None else pivot_source)]
+        )
+        return scan_id
+
+    def add(self, record, source=None, pivot_source=None):
+        # record: sinks.result_record() or any results dict with a domain; returns the
+        # scan id. pivot_source (the full results of a diff record) is indexed instead
+        # of record when given
+        with self._lock, self._conn:
+            return self._insert(record, source, pivot_source)
+
+    def add_many(self, records, source=None, pivot_sources=None):
+        # one transaction for the whole batch
+        pivot_sources = itertools.repeat(None) if pivot_sources is None else pivot_sources
+        with self._lock, self._conn:
+            return [self._insert(record, source, pivot_source) for record, pivot_source in zip(records, pivot_sources)]
+
+    def has_source(self, source):
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM scans WHERE source = ? LIMIT 1', (source,)).fetchone() is not None
+
+    def get(self, scan_id):
+        with self._lock:
+            row = self._conn.execute('SELECT record FROM scans WHERE id = ?', (scan_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def scans(self, domain):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, mode, target, scan_date FROM scans WHERE domain = ? ORDER BY id', (domain.lower(),)
+            ).fetchall()
+        return [{'scan_id': row[0], 'mode': row[1], 'target': row[2], 'scan_date': row[3]} for row in rows]
+
+    def pivot(self, kind, value, limit=100):
+        # domains whose scans contain value, by name; the grouping walks the covering
+        # (kind, value, domain, scan_id) key in order and stops after limit domains
+        if kind not in PIVOT_KEYS:
+            raise ValueError(f"Unknown pivot '{kind}' (use {', '.join(KINDS)})")
+        value = normalize(kind, value)
+        if value is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.domain, p.scans, s.id, s.mode, s.scan_date FROM ('
+                'SELECT domain, COUNT(*) AS scans, MAX(scan_id) AS last_id FROM pivots '
+                'WHERE kind = ? AND value = ? GROUP BY domain ORDER BY domain LIMIT ?'
+                ') p JOIN scans s ON s.id = p.last_id ORDER BY p.domain',
+                (kind, value, limit)
+            ).fetchall()
+        return [
+            {'domain': row[0], 'scans': row[1], 'last_scan_id': row[2], 'mode': row[3], 'last_scan': row[4]}
+            for row in rows
+        ]
+
+    def values(self, domain):
+        # {kind: [values]} of the latest scan of domain
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT MAX(id) FROM scans WHERE domain = ?', (domain.lower(),)
+            ).fetchone()
+            if row[0] is None:
+                return {}
+            rows = self._conn.execute(
+                'SELECT kind, value FROM pivots WHERE scan_id = ? ORDER BY kind, value', (row[0],)
+            ).fetchall()
+        result = {}
+        for kind, value in rows:
+            result.setdefault(kind, []).append(value)
+        return result
+
+    def related(self, domain, kinds=KINDS, limit=100):
+        # {kind: {value: [other domains]}} for every value of domain's latest scan
+        # that other domains share
+        domain = domain.lower()
+        result = {}
+        for kind, values in self.values(domain).items():
+            if kind not in kinds:
+                continue
+            for value in values:
+                others = [row['domain'] for row in self.pivot(kind, value, limit + 1) if row['domain'] != domain][:limit]
+                if others:
+                    result.setdefault(kind, {})[value] = others
+        return result
+
+    def stats(self):
+        with self._lock:
+            scans, domains = self._conn.execute('SELECT COUNT(*), COUNT(DISTINCT domain) FROM scans').fetchone()
+            values = dict(self._conn.execute(
+                'SELECT kind, COUNT(*) FROM (SELECT DISTINCT kind, value FROM pivots) GROUP BY kind'
+            ).fetchall())
+        return {'scans': scans, 'domains': domains, 'values': values}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
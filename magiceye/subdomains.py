@@ -0,0 +1,135 @@
+import asyncio
+import itertools
+import secrets
+import time
+from urllib.parse import urlsplit
+
+from magiceye.resolver import DnsCache, DnsEngine
+from magiceye.timing import count
+
+# small built-in list for when no wordlist file is given
+DEFAULT_WORDLIST = (
+    'www', 'mail', 'webmail', 'smtp', 'pop', 'imap', 'mx', 'ns1', 'ns2', 'dns', 'vpn', 'remote',
+    'api', 'app', 'apps', 'dev', 'test', 'staging', 'stage', 'beta', 'demo', 'uat', 'qa', 'preprod',
+    'admin', 'portal', 'dashboard', 'panel', 'cpanel', 'whm', 'login', 'sso', 'auth', 'id', 'accounts',
+    'blog', 'shop', 'store', 'news', 'forum', 'help', 'support', 'docs', 'wiki', 'status', 'kb',
+    'cdn', 'static', 'assets', 'img', 'images', 'media', 'files', 'download', 'upload', 'ftp',
+    'git', 'gitlab', 'jenkins', 'ci', 'jira', 'confluence', 'grafana', 'monitor', 'm', 'mobile',
+    'intranet', 'internal', 'corp', 'office', 'owa', 'exchange', 'autodiscover', 'db', 'sql', 'backup',
+    'old', 'new', 'v1', 'v2', 'web', 'www2', 'secure', 'pay', 'billing', 'crm', 'erp', 'hr', 'lms'
+)
+WILDCARD_PROBES = 3
+
+
+def load_wordlist(path):
+    # one label per line, read lazily so large lists never sit in memory
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            word = line.strip().lower()
+            if word and not word.startswith('#'):
+                yield word
+
+
+def _under(name, domain):
+    name = name.strip().lower().rstrip('.')
+    if name.startswith('*.'):
+        name = name[2:]
+    if name != domain and name.endswith('.' + domain):
+        return name
+    return None
+
+
+def names_from_certificates(ssl_info, domain):
+    # DNS entries of the SAN lists in ssl_info (magiceye.tls.probe_tls)
+    names = set()
+    for cert in ((ssl_info or {}).get('certificates') or {}).values():
+        for kind, value in cert.get('san', []):
+            name = _under(value, domain) if kind == 'DNS' else None
+            if name:
+                names.add(name)
+    return names
+
+
+def names_from_links(links, domain):
+    # hosts of scraped links, [{'href': ...}] or plain urls
+    names = set()
+    for link in links or []:
+        href = link.get('href') if isinstance(link, dict) else link
+        host = urlsplit(href or '').hostname
+        name = _under(host, domain) if host else None
+        if name:
+            names.add(name)
+    return names
+
+
+class SubdomainEnumerator:
+    # resolves candidate names with a fixed number of concurrent workers pulling
+    # from one lazy iterator, so memory is bounded by what is found, not by the
+    # size of the wordlist
+    def __init__(self, dns_engine=None, concurrency=500, wildcard_probes=WILDCARD_PROBES):
+        # a private engine by default: brute force answers (mostly NXDOMAIN) should
+        # neither crowd the shared cache nor go to the persistent store
+        self.dns = dns_engine or DnsEngine(max_in_flight=concurrency, cache=DnsCache(max_entries=50000))
+        self.concurrency = concurrency
+        self.wildcard_probes = wildcard_probes
+
+    async def addresses(self, name):
+        try:
+            records, _ = await self.dns.query(name, 'A')
+        except Exception:
+            return []
+        return records
+
+    async def wildcard_addresses(self, domain):
+        # what random labels resolve to; empty when the zone has no wildcard
+        probes = [f"{secrets.token_hex(8)}.{domain}" for _ in range(self.wildcard_probes)]
+        answers = await asyncio.gather(*(self.addresses(name) for name in probes))
+        return set(itertools.chain.from_iterable(answers))
+
+    async def enumerate(self, domain, passive=None, wordlist=DEFAULT_WORDLIST):
+        # passive: {name: [sources]} from certificates, links...; wordlist: labels.
+        # a wordlist hit that only resolves to the wildcard addresses is dropped,
+        # a passive name is kept and flagged
+        domain = domain.lower().rstrip('.')
+        started = time.perf_counter()
+        passive = {name: sorted(set(sources)) for name, sources in (passive or {}).items()}
+        wildcard = await self.wildcard_addresses(domain)
+
+        def candidates():
+            yield from passive.items()
+            for word in wordlist or ():
+                name = f"{word}.{domain}"
+                if name not in passive:
+                    yield name, ['wordlist']
+
+        names = candidates()
+        found = []
+        checked = 0
+
+        async def worker():
+            nonlocal checked
+            for name, sources in names:
+                addresses = await self.addresses(name)
+                checked += 1
+                if not addresses:
+                    continue
+                matches_wildcard = bool(wildcard) and set(addresses) <= wildcard
+                if matches_wildcard and sources == ['wordlist']:
+                    continue
+                found.append({'name': name, 'addresses': addresses, 'sources': sources, 'wildcard': matches_wildcard})
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        count('subdomain_candidates', checked)
+        duration = time.perf_counter() - started
+        return {
+            'domain': domain,
+            'wildcard': bool(wildcard),
+            'wildcard_addresses': sorted(wildcard),
+            'candidates': checked,
+            'found': sorted(found, key=lambda item: item['name']),
+            'duration': round(duration, 3),
+            'names_per_sec': round(checked / duration, 1) if duration else None
+        }
+
+    def enumerate_sync(self, domain, passive=None, wordlist=DEFAULT_WORDLIST):
+        return asyncio.run(self.enumerate(domain, passive, wordlist))
@@ -0,0 +1,165 @@
+import contextlib
+import contextvars
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+
+from magiceye import metrics
+
+# optional per-stage profiling: 'cpu' (cProfile, one .prof file per stage) or
+# 'memory' (tracemalloc, top allocations per stage); off by default
+PROFILE = os.environ.get('MAGICEYE_PROFILE') or None
+PROFILE_DIR = os.environ.get('MAGICEYE_PROFILE_DIR', 'profiles')
+PROFILE_MODES = ('cpu', 'memory')
+
+_current_span = contextvars.ContextVar('magiceye_span', default=None)
+
+
+def configure(profile=None, profile_dir=None):
+    global PROFILE, PROFILE_DIR
+    if profile is not None and profile not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{profile}' (use {', '.join(PROFILE_MODES)})")
+    PROFILE = profile
+    if profile_dir:
+        PROFILE_DIR = profile_dir
+
+
+def count(name, amount=1):
+    # adds to a counter of the span the calling code runs in (no-op outside a span)
+    span = _current_span.get()
+    if span is not None:
+        span.add(name, amount)
+
+
+class Span:
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        # set once the span is recorded, by its own exit or by Timings.close_span
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+
+def observe_stage(name, seconds, status='ok', counters=None):
+    metrics.observe('magiceye_stage_duration_seconds', seconds, stage=name)
+    metrics.inc('magiceye_stage_total', stage=name, status=status)
+    for event, amount in (counters or {}).items():
+        metrics.inc('magiceye_stage_events_total', amount, stage=name, event=event)
+
+
+def stage_histograms():
+    histograms = metrics.REGISTRY.get('magiceye_stage_duration_seconds')
+    return {dict(key)['stage']: histogram.snapshot() for key, histogram in sorted(histograms.items())}
+
+
+def reset_stage_histograms():
+    metrics.REGISTRY.reset('magiceye_stage_duration_seconds')
+
+
+class Timings:
+    # spans of one scan: wall and cpu time per stage plus whatever the code
+    # running inside the span counted (requests, bytes, retries, cache hits)
+    def __init__(self, profile=None, profile_dir=None):
+        self.profile = profile or PROFILE
+        self.profile_dir = profile_dir or PROFILE_DIR
+        self.started = time.perf_counter()
+        self.spans = {}
+        self._open = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name):
+        span = Span(name)
+        token = _current_span.set(span)
+        profiler = self._start_profile()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        with self._lock:
+            self._open[name] = (span, wall_start)
+        status = 'ok'
+        try:
+            yield span
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            _current_span.reset(token)
+            report = {
+                'start': round(wall_start - self.started, 3),
+                'wall': round(wall, 3),
+                'cpu': round(cpu, 3)
+            }
+            report.update(span.counters)
+            report.update(self._stop_profile(name, profiler))
+            with self._lock:
+                if self._open.get(name, (None,))[0] is span:
+                    del self._open[name]
+                closed, span.closed = span.closed, True
+                if not closed:
+                    self.spans[name] = report
+            # a span closed early (timed out) was already recorded
+            if not closed:
+                observe_stage(name, wall, status, span.counters)
+
+    def close_span(self, name, status):
+        # records a span that is still running (a timed out stage) as finished
+        # with status now; its own exit later records nothing, so the stage is
+        # counted once. False when no such span is open
+        now = time.perf_counter()
+        with self._lock:
+            span, wall_start = self._open.pop(name, (None, None))
+            if span is None or span.closed:
+                return False
+            span.closed = True
+            with span._lock:
+                counters = dict(span.counters)
+            # cpu is per thread and the stage's thread is still running
+            report = {'start': round(wall_start - self.started, 3), 'wall': round(now - wall_start, 3), 'cpu': None, 'status': status}
+            report.update(counters)
+            self.spans[name] = report
+        observe_stage(name, now - wall_start, status, counters)
+        return True
+
+    def _start_profile(self):
+        if self.profile == 'cpu':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # another stage is being profiled (one profiler at a time on 3.12+)
+                return None
+            return profiler
+        if self.profile == 'memory':
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            return tracemalloc.take_snapshot()
+        return None
+
+    def _stop_profile(self, name, profiler):
+        if profiler is None:
+            return {}
+        if self.profile == 'cpu':
+            profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{name}-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}.prof")
+            profiler.dump_stats(path)
+            return {'profile': path}
+
+        # memory: allocations that grew while the span ran (other threads included)
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        stats = snapshot.compare_to(profiler.filter_traces(ignore), 'lineno')
+        top = [str(stat) for stat in stats[:5] if stat.size_diff > 0]
+        return {'memory_top': top, 'memory_traced_kb': round(tracemalloc.get_traced_memory()[0] / 1024, 1)}
+
+    def report(self):
+        with self._lock:
+            return {name: dict(report) for name, report in self.spans.items()}
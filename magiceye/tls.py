@@ -0,0 +1,172 @@
+import asyncio
+import collections
+import hashlib
+import ssl
+import threading
+import time
+
+from magiceye.scheduler import run_async
+from magiceye.timing import count
+from magiceye.x509 import decode_certificate
+
+# implicit TLS ports from ports.COMMON_PORTS
+TLS_PORTS = (443, 8443, 465, 993, 995)
+MAX_CERTIFICATES = 10000
+
+_contexts = {}
+_contexts_lock = threading.Lock()
+
+
+def _context(verify):
+    # one context per mode for the whole process, so the trust store is loaded once
+    with _contexts_lock:
+        if verify not in _contexts:
+            context = ssl.create_default_context()
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            _contexts[verify] = context
+        return _contexts[verify]
+
+
+def parse_certificate(cert):
+    # getpeercert() of a verified handshake, or decode_certificate() of the DER
+    # certificate of one that failed verification
+    return {
+        'issuer': dict(x[0] for x in cert['issuer']),
+        'subject': dict(x[0] for x in cert['subject']),
+        'version': cert['version'],
+        'serial_number': cert['serialNumber'],
+        'not_before': cert['notBefore'],
+        'not_after': cert['notAfter'],
+        'expires_in_days': int((ssl.cert_time_to_seconds(cert['notAfter']) - time.time()) // 86400),
+        'san': cert.get('subjectAltName', []),
+        'ocsp': cert.get('OCSP', []),
+        'crl_distribution_points': cert.get('crlDistributionPoints', [])
+    }
+
+
+class CertificateStore:
+    # parsed certificates by sha256 fingerprint, shared by all probes so a
+    # certificate served by many targets (CDNs, shared hosting) is kept once
+    def __init__(self, max_entries=MAX_CERTIFICATES):
+        self.max_entries = max_entries
+        self._certificates = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, fingerprint, cert):
+        with self._lock:
+            if fingerprint in self._certificates:
+                self._certificates.move_to_end(fingerprint)
+                return self._certificates[fingerprint]
+            self._certificates[fingerprint] = cert
+            if len(self._certificates) > self.max_entries:
+                self._certificates.popitem(last=False)
+            return cert
+
+    def __len__(self):
+        return len(self._certificates)
+
+
+_default_store = CertificateStore()
+
+
+async def handshake(host, ip, port=443, timeout=5):
+    # (endpoint, parsed certificate or None); a certificate that fails verification
+    # is fetched again without it, so its fingerprint and the cipher are still known
+    endpoint = {
+        'ip': ip,
+        'port': port,
+        'protocol': None,
+        'cipher': None,
+        'bits': None,
+        'handshake_ms': None,
+        'fingerprint_sha256': None,
+        'verified': None
+    }
+    for verify in (True, False):
+        count('tls_handshakes')
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port, ssl=_context(verify), server_hostname=host), timeout
+            )
+        except ssl.SSLCertVerificationError as e:
+            endpoint['verify_error'] = e.verify_message
+            continue
+        except (OSError, asyncio.TimeoutError) as e:
+            endpoint['error'] = str(e) or type(e).__name__
+            return endpoint, None
+        latency = time.perf_counter() - started
+
+        try:
+            sslobj = writer.get_extra_info('ssl_object')
+            der = sslobj.getpeercert(binary_form=True)
+            cipher, _, bits = sslobj.cipher()
+            # without verification getpeercert() is empty, the DER form is still there
+            if verify:
+                cert = parse_certificate(sslobj.getpeercert())
+            else:
+                try:
+                    cert = parse_certificate(decode_certificate(der)) if der else None
+                except (ValueError, IndexError):
+                    cert = None
+            endpoint.update({
+                'protocol': sslobj.version(),
+                'cipher': cipher,
+                'bits': bits,
+                'handshake_ms': round(latency * 1000, 2),
+                'fingerprint_sha256': hashlib.sha256(der).hexdigest() if der else None,
+                'verified': verify
+            })
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        return endpoint, cert
+    return endpoint, None
+
+
+async def probe_tls(host, ips, ports=TLS_PORTS, timeout=5, concurrency=50, store=None, semaphore=None):
+    # every (ip, port) handshake at once with SNI for host; certificates are listed
+    # once by fingerprint and the endpoints refer to them
+    store = store or _default_store
+    semaphore = semaphore or asyncio.Semaphore(concurrency)
+
+    async def one(ip, port):
+        async with semaphore:
+            return await handshake(host, ip, port, timeout)
+
+    results = await asyncio.gather(*(one(ip, port) for port in ports for ip in ips))
+    endpoints = []
+    certificates = {}
+    for endpoint, cert in results:
+        endpoints.append(endpoint)
+        fingerprint = endpoint['fingerprint_sha256']
+        if cert is not None and fingerprint not in certificates:
+            certificates[fingerprint] = store.add(fingerprint, cert)
+    return {'host': host, 'endpoints': endpoints, 'certificates': certificates}
+
+
+async def probe_many(targets, concurrency=200, **kwargs):
+    # {host: probe_tls(host, ips)} for targets {host: ips}, sharing one handshake limit
+    semaphore = asyncio.Semaphore(concurrency)
+    hosts = list(targets)
+    results = await asyncio.gather(*(probe_tls(host, targets[host], semaphore=semaphore, **kwargs) for host in hosts))
+    return dict(zip(hosts, results))
+
+
+def check_tls_info(info):
+    # raises when no handshake produced a certificate so the failure is reported
+    # (and never cached by incremental scans)
+    if not any(endpoint['fingerprint_sha256'] for endpoint in info['endpoints']):
+        errors = [endpoint.get('error') or endpoint.get('verify_error') for endpoint in info['endpoints']]
+        raise ConnectionError(f"No TLS handshake succeeded for {info['host']}: {next((e for e in errors if e), 'unknown error')}")
+    return info
+
+
+def get_tls_info(host, ips, ports=TLS_PORTS, timeout=5):
+    # ssl_info section
+    return check_tls_info(run_async(probe_tls(host, ips, ports, timeout)))
@@ -0,0 +1,94 @@
+import re
+
+import requests
+
+from magiceye import parsing
+from magiceye.extract import get_extractor
+from magiceye.timing import count
+
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+CHARSET_PATTERN = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class Page:
+    def __init__(self, url, status_code, headers, body=None, data=None, truncated=False, cache_status=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.data = data
+        self.truncated = truncated
+        # set by incremental fetches: not_modified, unchanged or changed
+        self.cache_status = cache_status
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+def response_encoding(headers):
+    # only trust an explicit charset, otherwise the parser sniffs the document
+    match = CHARSET_PATTERN.search(headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+
+def is_html(headers):
+    content_type = headers.get('Content-Type', '').lower()
+    return not content_type or 'html' in content_type
+
+
+def fetch_page(http, url, max_bytes=MAX_PAGE_BYTES, fields=None, html_only=False, **kwargs):
+    # stream the body and stop at max_bytes; with fields the chunks go straight
+    # into the extractor (page.data) and reading stops as soon as it has what it
+    # needs, e.g. after </head> for title/meta only; without fields the raw
+    # (capped) body is returned in page.body; html_only skips non-html bodies.
+    # With a parser pool (magiceye.parsing.configure) the raw body is collected
+    # and extracted in a worker process instead
+    session = None
+    pool = parsing.get_pool() if fields is not None else None
+    head_only = pool is not None and get_extractor(tuple(fields)).head_only
+    chunks = []
+    size = 0
+    truncated = False
+
+    with http.get(url, stream=True, **kwargs) as response:
+        if html_only and not is_html(response.headers):
+            return Page(url=response.url, status_code=response.status_code, headers=response.headers)
+        if fields is not None and pool is None:
+            session = get_extractor(tuple(fields)).session(response_encoding(response.headers))
+
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if not chunk:
+                continue
+            if size + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - size]
+                truncated = True
+            size += len(chunk)
+            count('http_bytes', len(chunk))
+
+            if session is None:
+                chunks.append(chunk)
+                # title/meta only: nothing after the head is needed
+                if head_only and b'</head' in chunk.lower():
+                    break
+            elif session.feed(chunk):
+                break
+            if truncated:
+                break
+
+        body = b''.join(chunks) if session is None else None
+        if pool is not None:
+            data = pool.extract(body, response_encoding(response.headers), tuple(fields))
+            body = None
+        else:
+            data = session.close() if session is not None else None
+        return Page(
+            url=response.url,
+            status_code=response.status_code,
+            headers=response.headers,
+            body=body,
+            data=data,
+            truncated=truncated
+        )
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from magiceye import metrics
+from magiceye.cache import SqliteTTLCache, cache_path
+from magiceye.domains import registrable_domain
+from magiceye.timing import count
+
+DAY = 86400
+
+# registration facts hardly change, delegation and status data moves faster
+FIELD_TTLS = {
+    'registrar': 30 * DAY,
+    'creation_date': 90 * DAY,
+    'organization': 30 * DAY,
+    'registrant_country': 30 * DAY,
+    'admin_country': 30 * DAY,
+    'emails': 14 * DAY,
+    'email': 14 * DAY,
+    'expiration_date': 7 * DAY,
+    'last_updated': 7 * DAY,
+    'events': 7 * DAY,
+    'status': 3 * DAY,
+    'name_servers': 3 * DAY,
+    'nameservers': 3 * DAY
+}
+DEFAULT_FIELD_TTL = 3 * DAY
+
+
+def _empty(value):
+    # python-whois stringifies missing dates to 'None'
+    return value is None or value == 'None' or value == '' or value == [] or value == ()
+
+
+def has_data(data):
+    # python-whois answers a failed connection with every field unset instead of raising
+    return bool(data) and not all(_empty(value) for value in data.values())
+
+
+def python_whois_lookup(domain):
+    # superset of the fields the modes read from python-whois
+    import whois
+
+    w = whois.whois(domain)
+    data = {
+        'registrar': w.registrar,
+        'creation_date': str(w.creation_date),
+        'expiration_date': str(w.expiration_date),
+        'last_updated': str(w.updated_date),
+        'name_servers': w.name_servers,
+        'status': w.status,
+        'emails': w.emails,
+        'organization': w.org,
+        'registrant_country': w.registrant_country,
+        'admin_country': w.admin_country
+    }
+    if not has_data(data):
+        raise LookupError(f"No WHOIS data for {domain}")
+    return data
+
+
+class WhoisCache:
+    # parsed WHOIS/RDAP answers keyed by source and registrable domain; every
+    # field carries its own expiry so callers only refetch for the fields they need
+    def __init__(self, cache, field_ttls=None):
+        self.cache = cache
+        self.field_ttls = dict(FIELD_TTLS, **(field_ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, source, domain, fields=None):
+        entry = self.cache.get(source, registrable_domain(domain))
+        now = time.time()
+        if entry is not None:
+            wanted = fields or entry.keys()
+            if all(field in entry and entry[field][1] >= now for field in wanted):
+                self._count(hit=True)
+                return {field: value for field, (value, expires) in entry.items() if expires >= now}
+        self._count(hit=False)
+        return None
+
+    def set(self, source, domain, data):
+        now = time.time()
+        entry = {field: [value, now + self.field_ttls.get(field, DEFAULT_FIELD_TTL)] for field, value in data.items()}
+        ttl = max((expires for _, expires in entry.values()), default=now) - now
+        self.cache.set(source, registrable_domain(domain), entry, ttl=ttl)
+
+    def fetch(self, source, domain, loader, fields=None):
+        # returns (data, hit); loader gets the registrable domain and may return
+        # None for "no answer"; neither that nor an all-empty answer is cached
+        data = self.get(source, domain, fields)
+        if data is not None:
+            count('whois_cache_hits')
+            return data, True
+        count('whois_lookups')
+        started = time.perf_counter()
+        try:
+            data = loader(registrable_domain(domain))
+        finally:
+            metrics.observe('magiceye_lookup_duration_seconds', time.perf_counter() - started, source=source)
+        if has_data(data):
+            self.set(source, domain, data)
+        return data, False
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.cache)}
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_whois_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = WhoisCache(SqliteTTLCache(cache_path('whois.sqlite'), max_entries=200000))
+        return _default_cache
@@ -0,0 +1,247 @@
+import asyncio
+import threading
+
+from magiceye.cache import SqliteTTLCache, cache_path
+from magiceye.http_client import get_client
+from magiceye.ratelimit import TokenBucket
+from magiceye.timing import count
+
+IANA_WHOIS = 'whois.iana.org'
+RDAP_BOOTSTRAP_URL = 'https://data.iana.org/rdap/dns.json'
+BOOTSTRAP_TTL = 7 * 86400
+
+# registries throttle per client address; burst then this many queries per second
+WHOIS_RATE = 1.0
+RDAP_RATE = 5.0
+BURST = 3
+
+MAX_RESPONSE_BYTES = 256 * 1024
+
+# whois field name (lowercased, up to the first ':') -> result key; one dict
+# lookup per line instead of testing every line against every prefix
+WHOIS_FIELDS = {
+    'registrar': 'registrar',
+    'sponsoring registrar': 'registrar',
+    'creation date': 'creation_date',
+    'created': 'creation_date',
+    'registry expiry date': 'expiration_date',
+    'registrar registration expiration date': 'expiration_date',
+    'expiry date': 'expiration_date',
+    'name server': 'name_servers',
+    'nserver': 'name_servers',
+    'domain status': 'status',
+    'status': 'status',
+    'registrant email': 'email',
+    'registrar whois server': 'referral'
+}
+LIST_FIELDS = ('name_servers', 'status')
+
+
+def parse_whois(text):
+    result = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        field = WHOIS_FIELDS.get(key.strip().lower())
+        value = value.strip()
+        if field is None or not value:
+            continue
+        if field in LIST_FIELDS:
+            values = result.setdefault(field, [])
+            if value not in values:
+                values.append(value)
+        else:
+            # registries repeat some fields further down, the first one is authoritative
+            result.setdefault(field, value)
+    return result
+
+
+def parse_rdap(data):
+    registrar = None
+    for entity in data.get('entities', []):
+        if 'registrar' in entity.get('roles', []):
+            for item in (entity.get('vcardArray') or [None, []])[1]:
+                if item[0] == 'fn':
+                    registrar = item[3]
+    return {
+        'registrar': registrar,
+        'status': data.get('status', []),
+        'events': data.get('events', []),
+        'nameservers': [ns.get('ldhName') for ns in data.get('nameservers', [])]
+    }
+
+
+def _split_server(server):
+    # "host" or "host:port", so a local stand-in can take a registry's place
+    host, _, port = server.partition(':')
+    return host, int(port) if port else 43
+
+
+class WhoisClient:
+    # in-process WHOIS (port 43) and RDAP lookups; servers come from the IANA
+    # bootstrap data, cached locally, and every server has its own rate limit.
+    # servers / rdap_servers ({tld: server or base url}) override the bootstrap
+    def __init__(self, http=None, cache=None, timeout=10, whois_rate=WHOIS_RATE, rdap_rate=RDAP_RATE, servers=None, rdap_servers=None, follow_referral=True):
+        self.http = http or get_client()
+        self.cache = cache
+        self.timeout = timeout
+        self.whois_rate = whois_rate
+        self.rdap_rate = rdap_rate
+        self.servers = dict(servers or {})
+        self.rdap_servers = dict(rdap_servers or {})
+        self.follow_referral = follow_referral
+        self._buckets = {}
+        self._whois_servers = {}
+        self._rdap_bootstrap = None
+        self._lock = threading.Lock()
+
+    def _bucket(self, server, rate):
+        with self._lock:
+            if server not in self._buckets:
+                self._buckets[server] = TokenBucket(rate, BURST)
+            return self._buckets[server]
+
+    async def _throttle(self, server, rate):
+        bucket = self._bucket(server, rate)
+        while not bucket.try_acquire():
+            await asyncio.sleep(1 / bucket.rate)
+
+    async def query(self, server, name):
+        # raw answer of one whois server; the protocol allows one query per connection
+        await self._throttle(server, self.whois_rate)
+        count('whois_queries')
+        host, port = _split_server(server)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        try:
+            writer.write(f"{name}\r\n".encode('idna'))
+            await writer.drain()
+            chunks = []
+            size = 0
+            while size < MAX_RESPONSE_BYTES:
+                chunk = await asyncio.wait_for(reader.read(65536), self.timeout)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+        return b''.join(chunks).decode('utf-8', errors='ignore')
+
+    async def whois_server(self, tld):
+        if tld in self.servers:
+            return self.servers[tld]
+        if tld in self._whois_servers:
+            return self._whois_servers[tld]
+        cached = self.cache.get('whois-server', tld) if self.cache else None
+        if cached is not None and cached['server']:
+            self._whois_servers[tld] = cached['server']
+            return cached['server']
+        server = None
+        for line in (await self.query(IANA_WHOIS, tld)).splitlines():
+            key, _, value = line.partition(':')
+            if key.strip().lower() in ('whois', 'refer') and value.strip():
+                server = value.strip()
+                break
+        # an empty answer may be a hiccup at IANA, the next lookup asks again
+        if server is None:
+            return None
+        if self.cache:
+            self.cache.set('whois-server', tld, {'server': server}, ttl=BOOTSTRAP_TTL)
+        self._whois_servers[tld] = server
+        return server
+
+    async def whois(self, domain):
+        # parsed registry answer, completed by the registrar's server for thin
+        # registries (.com, .net); None when the tld has no whois server
+        server = await self.whois_server(domain.rsplit('.', 1)[-1].lower())
+        if not server:
+            return None
+        result = parse_whois(await self.query(server, domain))
+        referral = result.pop('referral', None)
+        if self.follow_referral and referral and referral.lower() != server.lower():
+            try:
+                registrar = parse_whois(await self.query(referral, domain))
+            except (OSError, asyncio.TimeoutError):
+                registrar = {}
+            registrar.pop('referral', None)
+            for field, value in registrar.items():
+                result.setdefault(field, value)
+        return result or None
+
+    def _load_rdap_bootstrap(self):
+        with self._lock:
+            if self._rdap_bootstrap is not None:
+                return self._rdap_bootstrap
+        bootstrap = self.cache.get('rdap-bootstrap', RDAP_BOOTSTRAP_URL) if self.cache else None
+        if bootstrap is None:
+            response = self.http.get(RDAP_BOOTSTRAP_URL)
+            response.raise_for_status()
+            bootstrap = {}
+            for tlds, urls in response.json().get('services', []):
+                # prefer https base urls
+                url = sorted(urls, key=lambda url: not url.startswith('https'))[0]
+                bootstrap.update((tld.lower(), url) for tld in tlds)
+            if self.cache:
+                self.cache.set('rdap-bootstrap', RDAP_BOOTSTRAP_URL, bootstrap, ttl=BOOTSTRAP_TTL)
+        with self._lock:
+            self._rdap_bootstrap = bootstrap
+        return bootstrap
+
+    async def rdap_server(self, tld):
+        if tld in self.rdap_servers:
+            return self.rdap_servers[tld]
+        loop = asyncio.get_running_loop()
+        return (await loop.run_in_executor(None, self._load_rdap_bootstrap)).get(tld)
+
+    async def rdap(self, domain):
+        # None when the tld has no rdap service or the registry does not know the domain
+        base = await self.rdap_server(domain.rsplit('.', 1)[-1].lower())
+        if not base:
+            return None
+        await self._throttle(base, self.rdap_rate)
+        count('rdap_queries')
+        url = f"{base.rstrip('/')}/domain/{domain}"
+        loop = asyncio.get_running_loop()
+        # the shared http client keeps connections to the registry alive between lookups
+        response = await loop.run_in_executor(None, lambda: self.http.get(url, headers={'Accept': 'application/rdap+json'}))
+        if response.status_code != 200:
+            return None
+        return parse_rdap(response.json())
+
+    async def lookup_many(self, domains, method='whois', concurrency=20):
+        # {domain: result or {'error': ...}}; the per-server rate limits still apply
+        semaphore = asyncio.Semaphore(concurrency)
+        lookup = self.rdap if method == 'rdap' else self.whois
+
+        async def one(domain):
+            async with semaphore:
+                try:
+                    return await lookup(domain)
+                except Exception as e:
+                    return {'error': str(e)}
+
+        domains = list(dict.fromkeys(domains))
+        return dict(zip(domains, await asyncio.gather(*(one(domain) for domain in domains))))
+
+    def whois_sync(self, domain):
+        return asyncio.run(self.whois(domain))
+
+    def rdap_sync(self, domain):
+        return asyncio.run(self.rdap(domain))
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_whois_client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = WhoisClient(cache=SqliteTTLCache(cache_path('bootstrap.sqlite')))
+        return _default_client
@@ -0,0 +1,167 @@
+# names getpeercert() uses for the attribute OIDs of issuer and subject
+NAME_OIDS = {
+    '2.5.4.3': 'commonName',
+    '2.5.4.4': 'surname',
+    '2.5.4.5': 'serialNumber',
+    '2.5.4.6': 'countryName',
+    '2.5.4.7': 'localityName',
+    '2.5.4.8': 'stateOrProvinceName',
+    '2.5.4.9': 'streetAddress',
+    '2.5.4.10': 'organizationName',
+    '2.5.4.11': 'organizationalUnitName',
+    '2.5.4.12': 'title',
+    '2.5.4.15': 'businessCategory',
+    '2.5.4.17': 'postalCode',
+    '2.5.4.42': 'givenName',
+    '2.5.4.97': 'organizationIdentifier',
+    '1.2.840.113549.1.9.1': 'emailAddress',
+    '1.3.6.1.4.1.311.60.2.1.1': 'jurisdictionLocalityName',
+    '1.3.6.1.4.1.311.60.2.1.2': 'jurisdictionStateOrProvinceName',
+    '1.3.6.1.4.1.311.60.2.1.3': 'jurisdictionCountryName',
+    '0.9.2342.19200300.100.1.25': 'domainComponent'
+}
+SAN_TAGS = {0x81: 'email', 0x82: 'DNS', 0x86: 'URI', 0x87: 'IP Address'}
+OID_SAN = '2.5.29.17'
+OID_CRL = '2.5.29.31'
+OID_AIA = '1.3.6.1.5.5.7.1.1'
+OID_OCSP = '1.3.6.1.5.5.7.48.1'
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _der(data, offset=0):
+    # (tag, value start, value end) of the DER element at offset
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7f
+        length = int.from_bytes(data[offset:offset + size], 'big')
+        offset += size
+    if offset + length > len(data):
+        raise ValueError("Truncated DER element")
+    return tag, offset, offset + length
+
+
+def _children(data, start, end):
+    while start < end:
+        tag, value_start, value_end = _der(data, start)
+        yield tag, value_start, value_end
+        start = value_end
+
+
+def _oid(value):
+    first = value[0]
+    parts = [min(first // 40, 2), first - 40 * min(first // 40, 2)]
+    number = 0
+    for byte in value[1:]:
+        number = (number << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            parts.append(number)
+            number = 0
+    return '.'.join(str(part) for part in parts)
+
+
+def _text(tag, value):
+    # BMPString is UTF-16, the other string types decode as UTF-8 / Latin-1
+    if tag == 0x1e:
+        return value.decode('utf-16-be', errors='replace')
+    try:
+        return value.decode('utf-8')
+    except UnicodeDecodeError:
+        return value.decode('latin-1')
+
+
+def _name(data, start, end):
+    # Name -> getpeercert's ((('commonName', 'x'),), ...)
+    rdns = []
+    for _, set_start, set_end in _children(data, start, end):
+        rdn = []
+        for _, attr_start, attr_end in _children(data, set_start, set_end):
+            (_, oid_start, oid_end), (tag, value_start, value_end) = list(_children(data, attr_start, attr_end))[:2]
+            oid = _oid(data[oid_start:oid_end])
+            rdn.append((NAME_OIDS.get(oid, oid), _text(tag, data[value_start:value_end])))
+        rdns.append(tuple(rdn))
+    return tuple(rdns)
+
+
+def _time(tag, value):
+    # UTCTime / GeneralizedTime -> getpeercert's 'Jan  5 12:00:00 2024 GMT'
+    text = value.decode('ascii').rstrip('Z')
+    if tag == 0x17:
+        year = int(text[:2])
+        text = str(1900 + year if year >= 50 else 2000 + year) + text[2:]
+    year, month, day = int(text[:4]), int(text[4:6]), int(text[6:8])
+    hour, minute, second = int(text[8:10]), int(text[10:12]), int(text[12:14] or 0)
+    return f"{MONTHS[month - 1]} {day:2d} {hour:02d}:{minute:02d}:{second:02d} {year} GMT"
+
+
+def _general_names(data, start, end):
+    names = []
+    for tag, value_start, value_end in _children(data, start, end):
+        value = data[value_start:value_end]
+        if tag == 0x87 and len(value) == 4:
+            names.append(('IP Address', '.'.join(str(byte) for byte in value)))
+        elif tag == 0x87 and len(value) == 16:
+            # getpeercert writes IPv6 uncompressed: 2001:DB8:0:0:0:0:0:1
+            names.append(('IP Address', ':'.join(f"{int.from_bytes(value[i:i + 2], 'big'):X}" for i in range(0, 16, 2))))
+        elif tag in SAN_TAGS:
+            names.append((SAN_TAGS[tag], value.decode('ascii', errors='replace')))
+    return names
+
+
+def _uris(data, start, end):
+    # every URI general name nested anywhere under an extension value
+    uris = []
+    for tag, value_start, value_end in _children(data, start, end):
+        if tag == 0x86:
+            uris.append(data[value_start:value_end].decode('ascii', errors='replace'))
+        elif tag & 0x20:
+            uris.extend(_uris(data, value_start, value_end))
+    return uris
+
+
+def decode_certificate(der):
+    # DER certificate -> the dict getpeercert() returns for a verified handshake,
+    # so certificates that fail verification are parsed the same way
+    _, cert_start, cert_end = _der(der)
+    _, tbs_start, tbs_end = _der(der, cert_start)
+    fields = list(_children(der, tbs_start, tbs_end))
+    version = 1
+    if fields[0][0] == 0xa0:
+        _, version_start, version_end = _der(der, fields[0][1])
+        version = int.from_bytes(der[version_start:version_end], 'big') + 1
+        fields = fields[1:]
+    serial, _, issuer, validity, subject = fields[:5]
+    not_before, not_after = list(_children(der, validity[1], validity[2]))[:2]
+
+    cert = {
+        'subject': _name(der, subject[1], subject[2]),
+        'issuer': _name(der, issuer[1], issuer[2]),
+        'version': version,
+        'serialNumber': (der[serial[1]:serial[2]].lstrip(b'\x00') or b'\x00').hex().upper(),
+        'notBefore': _time(not_before[0], der[not_before[1]:not_before[2]]),
+        'notAfter': _time(not_after[0], der[not_after[1]:not_after[2]])
+    }
+    for tag, start, end in fields[5:]:
+        if tag != 0xa3:
+            continue
+        _, extensions_start, extensions_end = _der(der, start)
+        for _, ext_start, ext_end in _children(der, extensions_start, extensions_end):
+            parts = list(_children(der, ext_start, ext_end))
+            oid = _oid(der[parts[0][1]:parts[0][2]])
+            # the value is the last part, after the optional critical flag
+            _, value_start, value_end = parts[-1]
+            _, inner_start, inner_end = _der(der, value_start)
+            if oid == OID_SAN:
+                cert['subjectAltName'] = tuple(_general_names(der, inner_start, inner_end))
+            elif oid == OID_CRL:
+                cert['crlDistributionPoints'] = tuple(_uris(der, inner_start, inner_end))
+            elif oid == OID_AIA:
+                ocsp = []
+                for _, access_start, access_end in _children(der, inner_start, inner_end):
+                    (_, method_start, method_end), (tag, location_start, location_end) = list(_children(der, access_start, access_end))[:2]
+                    if _oid(der[method_start:method_end]) == OID_OCSP and tag == 0x86:
+                        ocsp.append(der[location_start:location_end].decode('ascii', errors='replace'))
+                if ocsp:
+                    cert['OCSP'] = tuple(ocsp)
+    return cert
@@ -0,0 +1,20 @@
+import json
+
+from magiceye.batch import batch_main
+
+
+def test_stdout_output_carries_only_records(tmp_path, capsys):
+    targets = tmp_path / 'targets.txt'
+    targets.write_text('example.com\nexample.org\n')
+
+    def scan(target, options=None):
+        print(f"[*] Target domain: {target}")
+        options.sink.write({'target': target})
+
+    summary = batch_main(scan, 'test', [str(targets), '-o', '-', '-w', '1'])
+    out, err = capsys.readouterr()
+
+    assert summary['succeeded'] == 2
+    assert [json.loads(line)['target'] for line in out.splitlines()] == ['example.com', 'example.org']
+    assert '[*] Target domain: example.com' in err
+    assert 'BATCH SUMMARY' in err
@@ -0,0 +1,42 @@
+from magiceye import cache
+from magiceye.cache import SqliteTTLCache
+
+
+def test_entries_stay_under_max(tmp_path):
+    store = SqliteTTLCache(str(tmp_path / 'cache.sqlite'), max_entries=100)
+    for i in range(1000):
+        store.set('ns', f"k{i}", i)
+    assert len(store) <= 100
+    assert store.get('ns', 'k999') == 999
+
+
+def test_recently_read_entries_survive_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'ACCESS_RESOLUTION', 0)
+    store = SqliteTTLCache(str(tmp_path / 'cache.sqlite'), max_entries=10)
+    for i in range(10):
+        store.set('ns', f"k{i}", i)
+    assert store.get('ns', 'k0') == 0
+    for i in range(10, 15):
+        store.set('ns', f"k{i}", i)
+    assert store.get('ns', 'k0') == 0
+    assert store.get('ns', 'k1') is None
+
+
+def test_replacing_a_key_does_not_evict(tmp_path):
+    store = SqliteTTLCache(str(tmp_path / 'cache.sqlite'), max_entries=10)
+    for i in range(10):
+        store.set('ns', f"k{i}", i)
+    for _ in range(50):
+        store.set('ns', 'k9', 9)
+    assert len(store) == 10
+
+
+def test_count_survives_reopen(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    store = SqliteTTLCache(path, max_entries=10)
+    for i in range(10):
+        store.set('ns', f"k{i}", i)
+    store.close()
+    store = SqliteTTLCache(path, max_entries=10)
+    store.set('ns', 'k10', 10)
+    assert len(store) <= 10
@@ -0,0 +1,99 @@
+import http.server
+import threading
+
+import pytest
+import requests
+
+from magiceye.crawler import Crawler, SeenSet, normalize_url
+
+PAGES = {
+    '/d/': b'<html><body><a href="x.html">x</a></body></html>',
+    '/d/x.html': b'<html><head><title>X</title></head><body></body></html>',
+    '/start/': b'<html><body><a href="/d/">d</a></body></html>'
+}
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        host = self.headers['Host']
+        if self.path == '/d':
+            self._redirect('/d/')
+        elif self.path == '/start' and host.startswith('localhost'):
+            # another host name for the same server, like a www or https redirect
+            self._redirect(f"http://127.0.0.1:{self.server.server_port}/start/")
+        elif self.path in PAGES:
+            body = PAGES[self.path]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_error(404)
+
+    def _redirect(self, location):
+        self.send_response(301)
+        self.send_header('Location', location)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def http_session():
+    session = requests.Session()
+    session.trust_env = False
+    yield session
+    session.close()
+
+
+def crawl(http_session, url):
+    sink = ListSink()
+    Crawler(http=http_session, max_pages=10, max_depth=3, delay=0).crawl(url, sink)
+    return {record['url']: record for record in sink.records}
+
+
+def test_links_resolve_against_redirected_url(server, http_session):
+    records = crawl(http_session, f"http://127.0.0.1:{server}/d")
+
+    assert records[f"http://127.0.0.1:{server}/d"]['final_url'] == f"http://127.0.0.1:{server}/d/"
+    page = records[f"http://127.0.0.1:{server}/d/x.html"]
+    assert page['status_code'] == 200
+    assert page['title'] == 'X'
+    assert f"http://127.0.0.1:{server}/x.html" not in records
+
+
+def test_redirect_to_another_host_stays_in_scope(server, http_session):
+    records = crawl(http_session, f"http://localhost:{server}/start")
+
+    assert records[f"http://127.0.0.1:{server}/d/x.html"]['status_code'] == 200
+    # the redirect target was marked seen, not fetched a second time
+    assert f"http://127.0.0.1:{server}/start/" not in records
+
+
+def test_normalized_urls_are_seen_once():
+    seen = SeenSet()
+    assert seen.add(normalize_url('HTTP://Example.com:80#top'))
+    assert not seen.add(normalize_url('http://example.com/'))
+    assert seen.add(normalize_url('http://example.com/?q=1'))
+    assert len(seen) == 2
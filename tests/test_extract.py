@@ -0,0 +1,41 @@
+import importlib.util
+
+import pytest
+
+from magiceye.extract import FIELDS, LXML, Extractor, _soup_extract, benchmark
+
+PAGE = (
+    b'<html><head><title>Shop</title><meta name="description" content="Things">'
+    b'<meta name="keywords" content="a,b"></head><body><h1> Welcome </h1><h2>Offers</h2>'
+    b'<a href="/one">One</a><a href="https://example.com/two"> Two </a><img src="/logo.png" alt="logo">'
+    b'<p>sales@example.com, support@example.org</p></body></html>'
+)
+PARSERS = ['html.parser'] + (['lxml'] if LXML else [])
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_single_pass_extraction(parser):
+    page = Extractor(FIELDS, parser).extract(PAGE)
+    assert page['title'] == 'Shop'
+    assert page['meta_tags']['description'] == 'Things'
+    assert [href['href'] for href in page['links']] == ['/one', 'https://example.com/two']
+    assert page['images'] == [{'src': '/logo.png', 'alt': 'logo'}]
+    assert sorted(page['emails']) == ['sales@example.com', 'support@example.org']
+
+
+@pytest.mark.skipif(importlib.util.find_spec('bs4') is None, reason='bs4 not installed')
+@pytest.mark.parametrize('parser', PARSERS)
+def test_matches_the_soup_walk(parser):
+    old = _soup_extract(PAGE)
+    page = Extractor(FIELDS, parser).extract(PAGE)
+    assert page['title'] == old['title']
+    assert page['meta_tags'].get('keywords') == old['meta_keywords']
+    assert [(link['text'].strip(), link['href']) for link in page['links']] == [(link['text'], link['href']) for link in old['links']]
+    assert sorted(page['emails']) == sorted(old['emails'])
+
+
+def test_benchmark_reports_every_parser():
+    result = benchmark([('page', PAGE)], repeat=1)[0]
+    assert result['page'] == 'page'
+    for parser in PARSERS:
+        assert result[parser] >= 0
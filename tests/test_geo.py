@@ -0,0 +1,46 @@
+import time
+
+from magiceye.geo import GeoLocator
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeHttp:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None):
+        self.calls.append(('get', url))
+        return FakeResponse({'status': 'success', 'query': url.rsplit('/', 1)[-1]})
+
+    def post(self, url, params=None, json=None):
+        self.calls.append(('post', url))
+        return FakeResponse([{'status': 'success', 'query': ip} for ip in json])
+
+
+def test_single_lookup_skips_the_batch_budget():
+    http = FakeHttp()
+    # one batch request per hour: a second batch would block
+    locator = GeoLocator(http=http, rate=1 / 3600, burst=1, linger=0)
+    assert set(locator.lookup(['192.0.2.1', '192.0.2.2'])) == {'192.0.2.1', '192.0.2.2'}
+
+    started = time.monotonic()
+    assert locator.lookup_one('192.0.2.3')['status'] == 'success'
+    assert time.monotonic() - started < 1
+    assert [method for method, _ in http.calls] == ['post', 'get']
+
+
+def test_single_lookups_have_their_own_limit():
+    locator = GeoLocator(http=FakeHttp(), single_rate=1 / 3600, single_burst=1, linger=0)
+    locator.lookup_one('192.0.2.1')
+    assert not locator.single_limiter.try_acquire()
+    assert locator.limiter.try_acquire()
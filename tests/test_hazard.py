@@ -0,0 +1,44 @@
+import asyncio
+import importlib.util
+import os
+import time
+
+from magiceye.scheduler import StageScheduler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_hazard():
+    spec = importlib.util.spec_from_file_location('hazard_osint', os.path.join(ROOT, 'HAZARD', 'hazard_osint.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeDns:
+    async def addresses(self, name):
+        return ['192.0.2.1']
+
+
+def test_timed_out_port_scan_stops(monkeypatch):
+    hazard = load_hazard()
+    stopped = []
+
+    async def slow_scan(ip, ports, concurrency, timeout):
+        try:
+            await asyncio.sleep(30)
+        finally:
+            stopped.append(time.monotonic())
+    monkeypatch.setattr(hazard, 'scan_ports', slow_scan)
+
+    osint = hazard.RexzeaHazardOsint(http=object(), geo=object(), whois_cache=object(), dns_engine=FakeDns())
+    scheduler = StageScheduler(stage_timeout=0.1)
+    scheduler.add('ports', lambda: osint.analyze_ports('example.com'))
+    started = time.monotonic()
+    assert scheduler.run()['ports']['status'] == 'timeout'
+
+    # the scan is cancelled in its thread instead of running on for 30s
+    deadline = time.monotonic() + 2
+    while not stopped and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert stopped and stopped[0] - started < 1
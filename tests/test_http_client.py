@@ -0,0 +1,57 @@
+import http.server
+import threading
+
+import pytest
+
+from magiceye import http_client
+from magiceye.http_client import HttpClient
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeEngine:
+    def __init__(self, addresses):
+        self.addresses = addresses
+
+    def addresses_sync(self, name):
+        return self.addresses
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    server.server_close()
+
+
+def get(monkeypatch, addresses, url):
+    monkeypatch.setattr(http_client, 'get_engine', lambda: FakeEngine(addresses))
+    client = HttpClient(retries=0, timeout=(2, 2))
+    client.session.trust_env = False
+    try:
+        return client.get(url)
+    finally:
+        client.close()
+
+
+def test_next_address_is_tried(server, monkeypatch):
+    # nothing listens on 127.0.0.2, the second address accepts
+    response = get(monkeypatch, ['127.0.0.2', '127.0.0.1'], f"http://cached.test:{server}/")
+    assert response.text == 'ok'
+
+
+def test_no_cached_address_resolves_normally(server, monkeypatch):
+    response = get(monkeypatch, [], f"http://127.0.0.1:{server}/")
+    assert response.text == 'ok'
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from magiceye.ports import local_listeners, parse_ports, scan_ports, scan_ports_sequential
+
+
+def test_parse_ports():
+    assert parse_ports('22, 80,8000-8002') == [22, 80, 8000, 8001, 8002]
+    with pytest.raises(ValueError):
+        parse_ports('0,70000')
+
+
+def test_sweep_takes_about_one_timeout():
+    with local_listeners(open_count=2, filtered_count=4) as (open_ports, filtered_ports):
+        ports = open_ports + filtered_ports
+        found, info = asyncio.run(scan_ports('127.0.0.1', ports, concurrency=len(ports), timeout=0.3))
+
+    assert sorted(found) == sorted(open_ports)
+    assert all(port['latency_ms'] >= 0 for port in found.values())
+    assert info['duration'] < 0.6
+
+
+def test_sequential_baseline_finds_the_same_ports():
+    with local_listeners(open_count=2, filtered_count=1) as (open_ports, filtered_ports):
+        found, info = scan_ports_sequential('127.0.0.1', open_ports + filtered_ports, timeout=0.2)
+
+    assert sorted(found) == sorted(open_ports)
+    assert info['duration'] >= 0.2
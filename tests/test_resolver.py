@@ -0,0 +1,55 @@
+import pytest
+
+from magiceye.domains import strip_port
+from magiceye.resolver import DnsCache, DnsEngine
+
+
+@pytest.mark.parametrize('host, expected', [
+    ('example.com', 'example.com'),
+    ('example.com:8080', 'example.com'),
+    ('127.0.0.1:8765', '127.0.0.1'),
+    ('::1', '::1'),
+    ('[2001:db8::1]:443', '2001:db8::1')
+])
+def test_strip_port(host, expected):
+    assert strip_port(host) == expected
+
+
+@pytest.fixture
+def engine():
+    engine = DnsEngine(cache=DnsCache())
+
+    async def no_query(name, rdtype):
+        raise AssertionError(f"unexpected {rdtype} query for {name}")
+    engine.query = no_query
+    return engine
+
+
+def test_ip_literal_is_not_looked_up(engine):
+    result = engine.resolve_sync('127.0.0.1:8765')
+    assert result == {'records': {'A': ['127.0.0.1']}, 'ttls': {'A': None}, 'errors': {}}
+
+
+def test_ipv6_literal(engine):
+    result = engine.resolve_sync('[2001:db8::1]:443', ('A', 'AAAA', 'MX'))
+    assert result['records'] == {'AAAA': ['2001:db8::1']}
+    assert result['errors'] == {}
+
+
+def test_addresses_of_ip_with_port(engine):
+    assert engine.addresses_sync('127.0.0.1:8765') == ['127.0.0.1']
+
+
+def test_hostname_with_ptr_keeps_other_answers():
+    engine = DnsEngine(cache=DnsCache())
+    queries = []
+
+    async def query(name, rdtype):
+        queries.append((name, rdtype))
+        return ['192.0.2.1'], 300
+    engine.query = query
+
+    result = engine.resolve_sync('example.com', ('A', 'PTR'))
+    assert result['records'] == {'A': ['192.0.2.1']}
+    assert 'PTR' in result['errors']
+    assert queries == [('example.com', 'A')]
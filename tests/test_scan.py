@@ -0,0 +1,29 @@
+import types
+
+from magiceye.scan import Scanner, parse_target
+
+
+def collector(section, collect):
+    return types.SimpleNamespace(SECTION=section, DEPENDS_ON=(), collect=collect)
+
+
+def failing(ctx):
+    raise RuntimeError('no answer')
+
+
+def test_parse_target():
+    assert parse_target('example.com') == ('https://example.com', 'example.com')
+    assert parse_target('http://Example.com:8080/x') == ('http://Example.com:8080/x', 'example.com')
+
+
+def test_stage_errors_do_not_mix_with_collector_errors():
+    scanner = Scanner(collectors=['dns'])
+    scanner.collectors = {
+        'dns': collector('dns_info', lambda ctx: {'records': {'A': ['192.0.2.1']}, 'errors': {'MX': 'NXDOMAIN'}}),
+        'subdomains': collector('dns_info', failing)
+    }
+    results = scanner.scan('example.com')
+
+    assert results['dns_info']['errors'] == {'MX': 'NXDOMAIN'}
+    assert results['dns_info']['stage_errors'] == {'subdomains': 'no answer'}
+    assert results['metadata']['stages']['subdomains']['status'] == 'error'
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from magiceye import metrics
+from magiceye.scheduler import AsyncStageScheduler, StageScheduler, run_async, stage_cancelled
+from magiceye.timing import Timings
+
+
+def test_dependency_cycle_raises():
+    scheduler = StageScheduler()
+    scheduler.add('a', lambda: None, depends_on=('b',))
+    scheduler.add('b', lambda: None, after=('c',))
+    scheduler.add('c', lambda: None, depends_on=('a',))
+    with pytest.raises(ValueError, match='cycle'):
+        scheduler.run()
+
+
+def test_unknown_dependency_raises():
+    scheduler = StageScheduler()
+    scheduler.add('a', lambda: None, depends_on=('missing',))
+    with pytest.raises(ValueError, match='missing'):
+        scheduler.run()
+
+
+def test_after_unknown_stage_is_ignored():
+    scheduler = StageScheduler()
+    scheduler.add('a', lambda: None, after=('missing',))
+    assert scheduler.run()['a']['status'] == 'ok'
+
+
+def test_failed_dependency_skips():
+    scheduler = StageScheduler()
+    scheduler.add('a', lambda: 1 / 0)
+    scheduler.add('b', lambda: None, depends_on=('a',))
+    report = scheduler.run()
+    assert report['a']['status'] == 'error'
+    assert report['b']['status'] == 'skipped'
+
+
+def test_timed_out_stage_is_told_to_stop():
+    stopped = threading.Event()
+
+    def loop():
+        while not stage_cancelled():
+            time.sleep(0.01)
+        stopped.set()
+
+    scheduler = StageScheduler(stage_timeout=0.1)
+    scheduler.add('loop', loop)
+    assert scheduler.run()['loop']['status'] == 'timeout'
+    assert stopped.wait(1)
+
+
+def test_timed_out_coroutine_is_cancelled():
+    cancelled = threading.Event()
+
+    async def sleep():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    scheduler = StageScheduler(stage_timeout=0.1)
+    scheduler.add('sleep', lambda: run_async(sleep()))
+    assert scheduler.run()['sleep']['status'] == 'timeout'
+    assert cancelled.wait(1)
+
+
+def test_run_async_outside_a_stage():
+    async def value():
+        return 42
+
+    assert run_async(value()) == 42
+
+
+def stage_counts(name):
+    counts = metrics.REGISTRY.get('magiceye_stage_total')
+    return {dict(key)['status']: value for key, value in counts.items() if dict(key)['stage'] == name}
+
+
+def test_timed_out_stage_is_counted_once():
+    finished = threading.Event()
+
+    def slow():
+        time.sleep(0.3)
+        finished.set()
+
+    timings = Timings()
+    scheduler = StageScheduler(stage_timeout=0.1, timings=timings)
+    scheduler.add('slow_counted_once', slow)
+    assert scheduler.run()['slow_counted_once']['status'] == 'timeout'
+    assert finished.wait(1)
+    time.sleep(0.05)
+
+    assert stage_counts('slow_counted_once') == {'timeout': 1}
+    assert timings.report()['slow_counted_once']['status'] == 'timeout'
+
+
+def test_timed_out_task_is_counted_once():
+    async def slow():
+        await asyncio.sleep(30)
+
+    async def run():
+        scheduler = AsyncStageScheduler(stage_timeout=0.1, timings=Timings())
+        scheduler.add('async_counted_once', slow)
+        report = await scheduler.run()
+        # let the cancelled task unwind its span
+        await asyncio.sleep(0.05)
+        return report
+
+    assert asyncio.run(run())['async_counted_once']['status'] == 'timeout'
+    assert stage_counts('async_counted_once') == {'timeout': 1}
@@ -0,0 +1,79 @@
+import importlib.util
+import os
+import types
+
+import pytest
+
+from magiceye.incremental import diff_results
+from magiceye.sinks import RESULT_FIELDS, StoreSink, result_record
+from magiceye.store import ResultStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_tool(path):
+    spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ListSink:
+    path = 'memory'
+
+    def __init__(self):
+        self.records = []
+
+    def write(self, record, results=None):
+        self.records.append(record)
+
+
+@pytest.fixture
+def reguler(monkeypatch):
+    module = load_tool(os.path.join('REGULER', 'reguler_osint.py'))
+    for name in ('get_client', 'get_engine', 'get_locator', 'get_whois_cache'):
+        monkeypatch.setattr(module, name, lambda *args, **kwargs: object())
+    osint = module.RexzeaRegulerOsint
+
+    def analyze_domain(self, domain):
+        self.results['domain_info'] = {'registrar': 'Example Registrar'}
+    monkeypatch.setattr(osint, 'analyze_domain', analyze_domain)
+    monkeypatch.setattr(osint, 'get_ip_info', lambda self, domain: None)
+    monkeypatch.setattr(osint, 'scrape_website', lambda self, url: None)
+    return module
+
+
+def test_reguler_record_has_the_shared_schema(reguler):
+    sink = ListSink()
+    assert reguler.scan_domain('example.com', types.SimpleNamespace(incremental=False, sink=sink)) is True
+
+    record, = sink.records
+    assert tuple(record) == RESULT_FIELDS
+    assert record['mode'] == 'reguler'
+    assert record['domain'] == 'example.com'
+    assert record['scan_date']
+    assert record['domain_info'] == {'registrar': 'Example Registrar'}
+
+
+def test_undated_results_are_dated_at_write_time():
+    assert result_record('reguler', 'example.com', 'example.com', {'metadata': {}})['scan_date']
+
+
+def test_incremental_record_is_indexed_by_its_results(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    old = {'technical_info': {'ip': '192.0.2.1'}, 'domain_info': {'registrar': 'Example Registrar'}}
+    new = {'technical_info': {'ip': '192.0.2.2'}, 'domain_info': {'registrar': 'Example Registrar'}}
+    diff = {'scan_date': '2026-01-02T00:00:00', 'previous_scan': '2026-01-01T00:00:00', 'changes': diff_results(old, new)}
+
+    sink = StoreSink(path)
+    sink.write(result_record('reguler', 'example.com', 'example.com', old), old)
+    sink.write(result_record('reguler', 'example.com', 'example.com', new, diff), new)
+    sink.write(result_record('reguler', 'example.org', 'example.org', new), new)
+    sink.close()
+
+    with ResultStore(path) as store:
+        latest = store.get(store.scans('example.com')[-1]['scan_id'])
+        assert latest['changes']['changed'] == {'technical_info.ip': {'old': '192.0.2.1', 'new': '192.0.2.2'}}
+        assert latest['technical_info'] is None
+        assert store.values('example.com') == {'ip': ['192.0.2.2'], 'registrar': ['Example Registrar']}
+        assert store.related('example.com')['ip'] == {'192.0.2.2': ['example.org']}
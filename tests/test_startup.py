@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from magiceye.startup import LAZY_MODULES, ROOT, TOOLS
+
+# runs an entry point with --help, then lists the top level modules it imported
+PROBE = '''
+import json, runpy, sys
+target = sys.argv[1]
+sys.argv = [target, '--help']
+try:
+    if target.endswith('.py'):
+        runpy.run_path(target, run_name='__main__')
+    else:
+        runpy.run_module(target, run_name='__main__', alter_sys=True)
+except SystemExit:
+    pass
+sys.__stdout__.write('\\n' + json.dumps(sorted({name.split('.')[0] for name in sys.modules})))
+'''
+
+
+def startup_modules(target):
+    completed = subprocess.run([sys.executable, '-c', PROBE, target], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    return set(json.loads(completed.stdout.splitlines()[-1]))
+
+
+@pytest.mark.parametrize('target', sorted(TOOLS.values()) + ['magiceye'])
+def test_no_heavy_import_at_startup(target):
+    modules = startup_modules(target)
+    assert 'magiceye' in modules
+    assert not set(LAZY_MODULES) & modules
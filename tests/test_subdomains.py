@@ -0,0 +1,152 @@
+import socket
+import threading
+
+import dns.message
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+import dns.rrset
+import pytest
+
+from magiceye.resolver import DnsCache, DnsEngine
+from magiceye.subdomains import SubdomainEnumerator, names_from_certificates
+
+
+class FakeResolver:
+    # zone: {name: [addresses]}; wildcard: addresses every other name under domain gets
+    def __init__(self, zone, domain=None, wildcard=None):
+        self.zone = zone
+        self.domain = domain
+        self.wildcard = wildcard or []
+        self.queries = []
+
+    async def query(self, name, rdtype):
+        self.queries.append((name, rdtype))
+        if name in self.zone:
+            return self.zone[name], 300
+        if self.wildcard and name.endswith('.' + self.domain):
+            return self.wildcard, 300
+        raise LookupError(f"NXDOMAIN {name}")
+
+
+def enumerate_names(resolver, passive=None, wordlist=('www', 'mail', 'dev')):
+    enumerator = SubdomainEnumerator(dns_engine=resolver, concurrency=4)
+    return enumerator.enumerate_sync('example.com', passive, wordlist)
+
+
+def test_subdomain_hit():
+    resolver = FakeResolver({'www.example.com': ['192.0.2.10'], 'dev.example.com': ['192.0.2.20']})
+    result = enumerate_names(resolver)
+
+    assert result['wildcard'] is False
+    assert result['candidates'] == 3
+    assert [(found['name'], found['addresses'], found['sources']) for found in result['found']] == [
+        ('dev.example.com', ['192.0.2.20'], ['wordlist']),
+        ('www.example.com', ['192.0.2.10'], ['wordlist'])
+    ]
+
+
+def test_wildcard_detection():
+    resolver = FakeResolver({}, domain='example.com', wildcard=['192.0.2.99'])
+    result = enumerate_names(resolver, wordlist=())
+
+    assert result['wildcard'] is True
+    assert result['wildcard_addresses'] == ['192.0.2.99']
+    # the probes are random labels, not names from the wordlist
+    assert len(resolver.queries) == 3
+
+
+def test_wildcard_answers_are_filtered():
+    resolver = FakeResolver(
+        {'www.example.com': ['192.0.2.10'], 'mail.example.com': ['192.0.2.99']},
+        domain='example.com', wildcard=['192.0.2.99']
+    )
+    result = enumerate_names(resolver, passive={'mail.example.com': ['certificate']})
+    found = {item['name']: item for item in result['found']}
+
+    # wordlist names that only resolve to the wildcard are dropped
+    assert 'dev.example.com' not in found
+    # a real record stays, a passive name on the wildcard address is kept and flagged
+    assert found['www.example.com']['wildcard'] is False
+    assert found['mail.example.com']['wildcard'] is True
+    assert found['mail.example.com']['sources'] == ['certificate']
+
+
+def test_names_from_certificates():
+    ssl_info = {'certificates': {'f': {'san': [('DNS', '*.example.com'), ('DNS', 'api.example.com'), ('DNS', 'other.org')]}}}
+    assert names_from_certificates(ssl_info, 'example.com') == {'api.example.com'}
+
+
+class UdpDnsServer:
+    # local DNS stand-in on the wire: A answers from zone, the wildcard address
+    # for any other name under domain, NXDOMAIN otherwise
+    def __init__(self, zone, domain, wildcard=None):
+        self.zone = zone
+        self.domain = domain
+        self.wildcard = wildcard
+        self.queries = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        while True:
+            try:
+                wire, client = self.sock.recvfrom(4096)
+            except OSError:
+                return
+            query = dns.message.from_wire(wire)
+            question = query.question[0]
+            name = question.name.to_text().rstrip('.')
+            self.queries.append(name)
+            response = dns.message.make_response(query)
+            address = self.zone.get(name)
+            if address is None and self.wildcard and name.endswith('.' + self.domain):
+                address = self.wildcard
+            if address is None:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            elif question.rdtype == dns.rdatatype.A:
+                response.answer.append(dns.rrset.from_text(question.name, 300, dns.rdataclass.IN, dns.rdatatype.A, address))
+            self.sock.sendto(response.to_wire(), client)
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def dns_server():
+    servers = []
+
+    def start(zone, domain='example.com', wildcard=None):
+        servers.append(UdpDnsServer(zone, domain, wildcard))
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.close()
+
+
+def enumerate_over_the_wire(server, passive=None):
+    engine = DnsEngine(nameservers=['127.0.0.1'], port=server.port, timeout=2, cache=DnsCache())
+    return SubdomainEnumerator(dns_engine=engine, concurrency=4).enumerate_sync('example.com', passive, ('www', 'mail', 'dev'))
+
+
+def test_local_dns_server(dns_server):
+    server = dns_server({'www.example.com': '192.0.2.10', 'dev.example.com': '192.0.2.20'})
+    result = enumerate_over_the_wire(server)
+
+    assert result['wildcard'] is False
+    assert {found['name']: found['addresses'] for found in result['found']} == {
+        'www.example.com': ['192.0.2.10'], 'dev.example.com': ['192.0.2.20']
+    }
+    assert {'www.example.com', 'mail.example.com', 'dev.example.com'} <= set(server.queries)
+
+
+def test_local_dns_server_wildcard(dns_server):
+    server = dns_server({'www.example.com': '192.0.2.10'}, wildcard='192.0.2.99')
+    result = enumerate_over_the_wire(server)
+
+    assert result['wildcard'] is True
+    assert result['wildcard_addresses'] == ['192.0.2.99']
+    assert [found['name'] for found in result['found']] == ['www.example.com']
@@ -0,0 +1,64 @@
+import asyncio
+import os
+import ssl
+
+import pytest
+
+from magiceye.tls import handshake
+from magiceye.x509 import decode_certificate
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+CERT = os.path.join(DATA, 'self_signed_cert.pem')
+KEY = os.path.join(DATA, 'self_signed_key.pem')
+
+
+def der_certificate():
+    with open(CERT, 'r', encoding='ascii') as f:
+        return ssl.PEM_cert_to_DER_cert(f.read())
+
+
+def test_decode_matches_the_ssl_module():
+    # the same decoder getpeercert() uses, through CPython's test hook
+    if not hasattr(ssl._ssl, '_test_decode_cert'):
+        pytest.skip('no _test_decode_cert in this Python')
+    assert decode_certificate(der_certificate()) == ssl._ssl._test_decode_cert(CERT)
+
+
+def test_decode_fields():
+    cert = decode_certificate(der_certificate())
+    assert dict(field[0] for field in cert['subject'])['commonName'] == 'self-signed.test'
+    assert ('DNS', 'www.self-signed.test') in cert['subjectAltName']
+    assert ('IP Address', '0:0:0:0:0:0:0:1') in cert['subjectAltName']
+    assert cert['OCSP'] == ('http://ocsp.self-signed.test/',)
+    assert cert['crlDistributionPoints'] == ('http://crl.self-signed.test/ca.crl',)
+
+
+def test_decode_truncated_certificate():
+    with pytest.raises((ValueError, IndexError)):
+        decode_certificate(der_certificate()[:200])
+
+
+def test_unverified_handshake_keeps_certificate_fields():
+    async def probe():
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(CERT, KEY)
+
+        async def serve(reader, writer):
+            writer.close()
+
+        server = await asyncio.start_server(serve, '127.0.0.1', 0, ssl=context)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await handshake('self-signed.test', '127.0.0.1', port, timeout=5)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    endpoint, cert = asyncio.run(probe())
+    assert endpoint['verified'] is False
+    assert endpoint['verify_error']
+    assert endpoint['fingerprint_sha256']
+    assert cert['subject']['commonName'] == 'self-signed.test'
+    assert ('DNS', 'self-signed.test') in cert['san']
+    assert cert['serial_number'] == decode_certificate(der_certificate())['serialNumber']
+    assert cert['expires_in_days'] > 0
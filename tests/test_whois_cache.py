@@ -0,0 +1,47 @@
+import sys
+import types
+
+import pytest
+
+from magiceye.cache import SqliteTTLCache
+from magiceye.whois_cache import WhoisCache, python_whois_lookup
+
+FIELDS = ('registrar', 'creation_date', 'expiration_date', 'updated_date', 'name_servers', 'status',
+          'emails', 'org', 'registrant_country', 'admin_country')
+
+
+@pytest.fixture
+def whois_cache(tmp_path):
+    return WhoisCache(SqliteTTLCache(str(tmp_path / 'whois.sqlite')))
+
+
+def test_empty_answer_is_not_cached(whois_cache):
+    calls = []
+
+    def loader(domain):
+        calls.append(domain)
+        return {'registrar': None, 'creation_date': 'None', 'name_servers': None}
+
+    whois_cache.fetch('python-whois', 'www.example.com', loader)
+    assert whois_cache.fetch('python-whois', 'example.com', loader)[1] is False
+    assert calls == ['example.com', 'example.com']
+    assert len(whois_cache.cache) == 0
+
+
+def test_answer_is_cached(whois_cache):
+    def loader(domain):
+        return {'registrar': 'Example Registrar', 'creation_date': 'None'}
+
+    whois_cache.fetch('python-whois', 'example.com', loader)
+    data, hit = whois_cache.fetch('python-whois', 'example.com', loader)
+    assert hit is True
+    assert data['registrar'] == 'Example Registrar'
+
+
+def test_python_whois_without_answer_raises(monkeypatch):
+    # python-whois answers a failed connection with every field unset
+    module = types.ModuleType('whois')
+    module.whois = lambda domain: types.SimpleNamespace(**dict.fromkeys(FIELDS))
+    monkeypatch.setitem(sys.modules, 'whois', module)
+    with pytest.raises(LookupError):
+        python_whois_lookup('example.com')
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+from magiceye import whois_client
+from magiceye.cache import SqliteTTLCache
+from magiceye.whois_client import WhoisClient, parse_whois
+
+REGISTRY = '''Domain Name: EXAMPLE.TEST
+Registrar WHOIS Server: {referral}
+Registrar: Example Registrar
+Creation Date: 1995-08-14T04:00:00Z
+Name Server: A.IANA-SERVERS.NET
+Name Server: B.IANA-SERVERS.NET
+Domain Status: clientDeleteProhibited
+Registrar: Shadowed Registrar
+'''
+REGISTRAR = '''Domain Name: EXAMPLE.TEST
+Registrar: Registrar Answer
+Registrant Email: owner@example.test
+Name Server: C.IANA-SERVERS.NET
+'''
+
+
+async def start_whois(answers, queries):
+    # port 43 stand-in: one query line per connection, answered from answers
+    async def serve(reader, writer):
+        name = (await reader.readline()).decode('idna').strip()
+        queries.append(name)
+        writer.write(answers.get(name, 'No match\r\n').encode('utf-8'))
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(serve, '127.0.0.1', 0)
+    return server, f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+def test_parse_whois():
+    result = parse_whois(REGISTRY.format(referral='whois.example.net'))
+    assert result == {
+        'referral': 'whois.example.net',
+        'registrar': 'Example Registrar',
+        'creation_date': '1995-08-14T04:00:00Z',
+        'name_servers': ['A.IANA-SERVERS.NET', 'B.IANA-SERVERS.NET'],
+        'status': ['clientDeleteProhibited']
+    }
+
+
+def test_referral_is_followed_and_merged():
+    async def run():
+        queries = []
+        registrar, registrar_address = await start_whois({'example.test': REGISTRAR}, queries)
+        registry, registry_address = await start_whois({'example.test': REGISTRY.format(referral=registrar_address)}, queries)
+        try:
+            client = WhoisClient(http=object(), servers={'test': registry_address})
+            return await client.whois('example.test'), queries
+        finally:
+            for server in (registry, registrar):
+                server.close()
+                await server.wait_closed()
+
+    result, queries = asyncio.run(run())
+    assert queries == ['example.test', 'example.test']
+    # the registry's fields win, the registrar fills in the rest
+    assert result['registrar'] == 'Example Registrar'
+    assert result['name_servers'] == ['A.IANA-SERVERS.NET', 'B.IANA-SERVERS.NET']
+    assert result['email'] == 'owner@example.test'
+    assert 'referral' not in result
+
+
+def test_queries_are_rate_limited_per_server():
+    async def run():
+        queries = []
+        server, address = await start_whois({}, queries)
+        try:
+            client = WhoisClient(http=object(), whois_rate=10)
+            started = time.monotonic()
+            for _ in range(whois_client.BURST + 2):
+                await client.query(address, 'example.test')
+            return time.monotonic() - started, len(queries)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    elapsed, answered = asyncio.run(run())
+    assert answered == whois_client.BURST + 2
+    # the burst goes out at once, the two queries after it wait a token each
+    assert elapsed >= 0.15
+
+
+def test_empty_bootstrap_answer_is_not_cached(tmp_path, monkeypatch):
+    async def run():
+        queries = []
+        answers = {}
+        server, address = await start_whois(answers, queries)
+        monkeypatch.setattr(whois_client, 'IANA_WHOIS', address)
+        try:
+            client = WhoisClient(http=object(), cache=SqliteTTLCache(str(tmp_path / 'bootstrap.sqlite')))
+            first = await client.whois_server('test')
+            answers['test'] = 'domain: TEST\nwhois: whois.nic.test\n'
+            return first, await client.whois_server('test'), await client.whois_server('test'), queries
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    first, second, third, queries = asyncio.run(run())
+    assert first is None
+    assert second == third == 'whois.nic.test'
+    assert queries == ['test', 'test']